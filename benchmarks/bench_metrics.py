@@ -0,0 +1,78 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+"""Benchmark of the instrumentation of the rules, rules._metrics.
+
+It runs the rules for all of the files of a synthetic tree of roles with the
+instrumentation disabled and enabled, and measures the cost of the checks
+left in the code path if it's disabled.
+
+Usage::
+
+    python -m benchmarks.bench_metrics [--count 5000]
+
+"""
+import argparse
+import pathlib
+import tempfile
+import timeit
+import typing
+
+from rules import _metrics
+from rules.BlockedModules import BlockedModules
+from rules.LoopIsRecommendedRule import LoopIsRecommendedRule
+from rules.TaskHasValidNameRule import TaskHasValidNameRule
+from rules.VarsShouldNotBeUsedRule import VarsShouldNotBeUsedRule
+
+from . import bench_prefilter
+
+
+RULES = (BlockedModules, LoopIsRecommendedRule, TaskHasValidNameRule,
+         VarsShouldNotBeUsedRule)
+
+
+def make_rules(enabled: bool) -> typing.List[typing.Any]:
+    """Make the rules instrumented if ``enabled``."""
+    _metrics.ENABLED = enabled
+    return [rule_cls() for rule_cls in RULES]
+
+
+def guard_cost(number: int = 1000000) -> float:
+    """Measure the cost of the check if it's enabled in seconds."""
+    return timeit.timeit('if _metrics.ENABLED: pass',
+                         globals=dict(_metrics=_metrics),
+                         number=number) / number
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> None:
+    """Entry point."""
+    psr = argparse.ArgumentParser()
+    psr.add_argument('--count', type=int, default=5000)
+    args = psr.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        paths = bench_prefilter.make_tree(pathlib.Path(tmpdir), args.count)
+        bench_prefilter.timeit(paths, make_rules(False))  # Warm up.
+
+        results = {}
+        for name, enabled in (('disabled', False), ('enabled', True)):
+            elapsed, nerrors = bench_prefilter.timeit(paths,
+                                                      make_rules(enabled))
+            results[name] = elapsed
+            print(f'{name}: {elapsed:.3f} [s], {nerrors} errors')
+
+        _metrics.ENABLED = False
+
+    # The checks are done at most twice for each file and rule if disabled.
+    ncalls = len(paths) * len(RULES) * 2
+    cost = guard_cost() * ncalls
+    print(f'overhead if enabled: '
+          f'{(results["enabled"] / results["disabled"] - 1) * 100:.1f} [%]')
+    print(f'overhead if disabled: {cost * 1000:.3f} [ms] for {ncalls} '
+          f'checks, {cost / results["disabled"] * 100:.3f} [%]')
+
+
+if __name__ == '__main__':
+    main()
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,73 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+"""Benchmark of rules.NoEmptyDataFilesRule.yml_file_has_some_data.
+
+It compares the latency of the previous implementation loads the whole data
+with yaml.safe_load and the current one stops parsing at the first node, with
+a large vars file.
+
+Usage::
+
+    python -m benchmarks.bench_no_empty_data_files [--size-mb 50]
+
+"""
+import argparse
+import pathlib
+import tempfile
+import time
+import typing
+
+import yaml
+
+from rules import NoEmptyDataFilesRule, _content, _scan
+
+
+def make_vars_file(path: pathlib.Path, size: int) -> None:
+    """Make a vars file its size is ``size`` bytes at least."""
+    with path.open('w') as fio:
+        fio.write('---\n# Generated vars for the benchmark.\n')
+        nbytes, idx = 0, 0
+        while nbytes < size:
+            line = f'var_{idx:08d}: {{key: value_{idx}, items: [1, 2, 3]}}\n'
+            fio.write(line)
+            nbytes += len(line)
+            idx += 1
+
+
+def previous_impl(filepath: str) -> bool:
+    """The previous implementation of yml_file_has_some_data."""
+    with open(filepath) as fio:
+        return bool(yaml.safe_load(fio))
+
+
+def timeit(fun: typing.Callable[[str], bool], path: str) -> float:
+    """Measure the latency of ``fun(path)`` in seconds."""
+    _content.CACHE.clear()
+    _scan.clear()
+    start = time.perf_counter()
+    fun(path)
+    return time.perf_counter() - start
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> None:
+    """Entry point."""
+    psr = argparse.ArgumentParser()
+    psr.add_argument('--size-mb', type=int, default=50)
+    args = psr.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = pathlib.Path(tmpdir) / 'all.yml'
+        make_vars_file(path, args.size_mb * 1024 * 1024)
+
+        for name, fun in (
+            ('before (yaml.safe_load)', previous_impl),
+            ('after (streaming)', NoEmptyDataFilesRule.yml_file_has_some_data)
+        ):
+            print(f'{name}: {timeit(fun, str(path)):.3f} [s]')
+
+
+if __name__ == '__main__':
+    main()
+
+# vim:sw=4:ts=4:et:
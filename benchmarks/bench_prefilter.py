@@ -0,0 +1,103 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+"""Benchmark of the prefilter of the rules, rules._prefilter.
+
+It makes a synthetic tree of roles have many tasks files and most of them
+do not have any tokens the rules look for, and compares the latency of the
+rules run for all of the files with and without the prefilter.
+
+Usage::
+
+    python -m benchmarks.bench_prefilter [--count 20000]
+
+"""
+import argparse
+import os
+import pathlib
+import random
+import tempfile
+import time
+import typing
+
+from ansiblelint.file_utils import Lintable
+
+from rules import _content, _prefilter
+from rules.BlockedModules import BlockedModules
+from rules.LoopIsRecommendedRule import LoopIsRecommendedRule
+from rules.VarsShouldNotBeUsedRule import VarsShouldNotBeUsedRule
+
+
+TASK: str = """\
+- name: Ensure the file {idx} exists
+  file:
+    path: /tmp/{idx}
+    state: touch
+"""
+
+# The tasks match with the rules and the ratio of the files have them.
+TASKS_MATCH: typing.Tuple[typing.Tuple[str, float], ...] = (
+    ('- name: Run a command\n  shell: ls\n', 0.02),
+    ('- name: Load vars\n  include_vars: a.yml\n', 0.05),
+    ('- name: Debug items\n  debug:\n    var: item\n  with_items: [1]\n',
+     0.05),
+)
+
+
+def make_tree(topdir: pathlib.Path, count: int, seed: int = 0
+              ) -> typing.List[str]:
+    """Make a tree of roles have ``count`` tasks files in total."""
+    rnd = random.Random(seed)
+    paths = []
+    for idx in range(count):
+        path = topdir / 'roles' / f'role_{idx // 10}' / 'tasks' / \
+            f'tasks_{idx % 10}.yml'
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        tasks = [TASK.format(idx=i) for i in range(rnd.randint(1, 10))]
+        tasks.extend(t for t, ratio in TASKS_MATCH if rnd.random() < ratio)
+        path.write_text(''.join(tasks))
+        paths.append(str(path))
+
+    return paths
+
+
+def timeit(paths: typing.List[str], rules: typing.List[typing.Any]
+           ) -> typing.Tuple[float, int]:
+    """
+    Measure the latency of the rules for all files in seconds and count the
+    errors found.
+    """
+    _content.CACHE.clear()
+    files = [Lintable(path, kind='tasks') for path in paths]
+
+    nerrors = 0
+    start = time.perf_counter()
+    for file in files:
+        for rule in rules:
+            nerrors += len(rule.getmatches(file))
+    return (time.perf_counter() - start, nerrors)
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> None:
+    """Entry point."""
+    psr = argparse.ArgumentParser()
+    psr.add_argument('--count', type=int, default=20000)
+    args = psr.parse_args(argv)
+
+    rules = [BlockedModules(), LoopIsRecommendedRule(),
+             VarsShouldNotBeUsedRule()]
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        paths = make_tree(pathlib.Path(tmpdir), args.count)
+        for name, enabled in (('before (no prefilter)', '0'),
+                              ('after (prefilter)', '1')):
+            os.environ[_prefilter.E_ENABLED_VAR] = enabled
+            elapsed, nerrors = timeit(paths, rules)
+            print(f'{name}: {elapsed:.3f} [s], {nerrors} errors')
+
+
+if __name__ == '__main__':
+    main()
+
+# vim:sw=4:ts=4:et:
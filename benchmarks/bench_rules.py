@@ -0,0 +1,202 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+"""Benchmark of all of the rules with a synthetic tree.
+
+It makes a synthetic tree of playbooks and roles at the scale given with
+benchmarks.synthetic, and times every rule in rules/ run for all of the files
+individually, with the caches cleared before each rule, and then all of them
+together as ansible-lint does, sharing the caches. The costs per file and per
+task are reported for each rule.
+
+Usage::
+
+    python -m benchmarks.bench_rules [--roles 50] [--tasks 20] \\
+        [--rule task_has_valid_name ...] [--repeat 3] [--json]
+
+.. seealso:: benchmarks.synthetic
+"""
+import argparse
+import collections
+import importlib
+import json
+import pathlib
+import pkgutil
+import tempfile
+import time
+import typing
+
+import ansiblelint.skip_utils
+from ansiblelint.file_utils import Lintable
+
+import rules
+from rules import _base, _content, _memo
+
+from . import synthetic
+
+
+class Result(typing.NamedTuple):
+    """The result of a rule run for all of the files.
+    """
+    elapsed: float
+    nerrors: int
+
+
+def load_rules(ids: typing.Optional[typing.Iterable[str]] = None
+               ) -> typing.List[typing.Any]:
+    """Load the rules in rules/, or the ones of the IDs ``ids`` only."""
+    res = []
+    for info in pkgutil.iter_modules(rules.__path__):
+        if info.name.startswith('_'):
+            continue
+
+        mod = importlib.import_module(f'{rules.__name__}.{info.name}')
+        res.extend(
+            obj() for obj in vars(mod).values()
+            if isinstance(obj, type) and issubclass(obj, _base.CustomRule)
+            and obj.__module__ == mod.__name__
+        )
+
+    if ids:
+        res = [rule for rule in res if rule.id in ids]
+
+    return sorted(res, key=lambda rule: rule.id)
+
+
+def clear_caches(rules_: typing.Iterable[typing.Any]) -> None:
+    """Clear the caches of the rules and ansible-lint."""
+    _content.CACHE.clear()
+    for rule in rules_:
+        _memo.clear(rule)
+
+    for obj in vars(ansiblelint.skip_utils).values():
+        if hasattr(obj, 'cache_clear'):
+            obj.cache_clear()
+
+
+def make_files(tree: synthetic.Tree) -> typing.List[Lintable]:
+    """
+    Make the lintables of the files, again for each run because they keep
+    their content and data parsed.
+    """
+    return [Lintable(path, kind=kind) for path, kind in tree.files]
+
+
+def run_individually(tree: synthetic.Tree, rules_: typing.List[typing.Any],
+                     repeat: int = 1) -> typing.Dict[str, Result]:
+    """Run each rule for all of the files and take the best of ``repeat``.
+    """
+    res = {}
+    for rule in rules_:
+        best = None
+        for _idx in range(repeat):
+            clear_caches(rules_)
+            files = make_files(tree)
+
+            nerrors = 0
+            start = time.perf_counter()
+            for file in files:
+                nerrors += len(rule.getmatches(file))
+            elapsed = time.perf_counter() - start
+
+            if best is None or elapsed < best.elapsed:
+                best = Result(elapsed, nerrors)
+
+        res[rule.id] = typing.cast(Result, best)
+
+    return res
+
+
+def run_together(tree: synthetic.Tree, rules_: typing.List[typing.Any]
+                 ) -> typing.Dict[str, Result]:
+    """Run all of the rules for each file and time each rule."""
+    clear_caches(rules_)
+    files = make_files(tree)
+
+    elapsed: typing.Dict[str, float] = collections.defaultdict(float)
+    nerrors: typing.Dict[str, int] = collections.defaultdict(int)
+    timer = time.perf_counter
+    for file in files:
+        for rule in rules_:
+            start = timer()
+            matches = rule.getmatches(file)
+            elapsed[rule.id] += timer() - start
+            nerrors[rule.id] += len(matches)
+
+    return {rule.id: Result(elapsed[rule.id], nerrors[rule.id])
+            for rule in rules_}
+
+
+def report(results: typing.Dict[str, Result], nfiles: int, ntasks: int
+           ) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+    """Compute the costs per file and per task in micro seconds."""
+    return {
+        rid: dict(elapsed=res.elapsed, errors=res.nerrors,
+                  per_file_us=res.elapsed / max(nfiles, 1) * 1e6,
+                  per_task_us=res.elapsed / max(ntasks, 1) * 1e6)
+        for rid, res in results.items()
+    }
+
+
+def print_report(title: str, data: typing.Dict[str, typing.Dict[str, float]]
+                 ) -> None:
+    """Print the report as a table."""
+    width = max(len(rid) for rid in data)
+    print(f'{title}:')
+    print(f'  {"rule":<{width}}  {"total [s]":>10}  {"file [us]":>10}  '
+          f'{"task [us]":>10}  {"errors":>7}')
+    for rid, row in sorted(data.items(), key=lambda kv: -kv[1]['elapsed']):
+        print(f'  {rid:<{width}}  {row["elapsed"]:>10.3f}  '
+              f'{row["per_file_us"]:>10.1f}  {row["per_task_us"]:>10.1f}  '
+              f'{row["errors"]:>7}')
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> None:
+    """Entry point."""
+    psr = argparse.ArgumentParser()
+    for field, default in synthetic.Scale._field_defaults.items():
+        psr.add_argument(f'--{field.replace("_", "-")}', type=type(default),
+                         default=default)
+    psr.add_argument('--seed', type=int, default=0)
+    psr.add_argument('--rule', action='append', dest='rules',
+                     help='The IDs of the rules to run, all by default')
+    psr.add_argument('--repeat', type=int, default=3,
+                     help='Take the best of N runs of each rule')
+    psr.add_argument('--json', action='store_true',
+                     help='Print the results as JSON')
+    args = psr.parse_args(argv)
+
+    scale = synthetic.Scale(**{f: getattr(args, f)
+                               for f in synthetic.Scale._fields})
+    rules_ = load_rules(args.rules)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tree = synthetic.make_tree(pathlib.Path(tmpdir), scale, args.seed)
+        nfiles = len(tree.files)
+
+        run_together(tree, rules_)  # Warm up.
+        individual = report(run_individually(tree, rules_, args.repeat),
+                            nfiles, tree.ntasks)
+        together = report(run_together(tree, rules_), nfiles, tree.ntasks)
+
+    total = sum(row['elapsed'] for row in together.values())
+    summary = dict(scale=scale._asdict(), files=nfiles, ntasks=tree.ntasks,
+                   total=total,
+                   per_file_us=total / max(nfiles, 1) * 1e6,
+                   per_task_us=total / max(tree.ntasks, 1) * 1e6)
+    if args.json:
+        print(json.dumps(dict(summary, individual=individual,
+                              together=together), indent=2))
+        return
+
+    print(f'{nfiles} files, {tree.ntasks} tasks, scale: {scale}')
+    print_report('Each rule individually', individual)
+    print_report('All of the rules together', together)
+    print(f'Total: {total:.3f} [s], {summary["per_file_us"]:.1f} [us] per '
+          f'file, {summary["per_task_us"]:.1f} [us] per task')
+
+
+if __name__ == '__main__':
+    main()
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,69 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+"""Benchmark of the default check of rules.TaskHasValidNameRule.
+
+It compares the latency of the previous implementation matches task names
+with the large alternation regex made from the verbs and the current one
+looks up the first words of names in the index of the verbs.
+
+Usage::
+
+    python -m benchmarks.bench_task_names [--count 100000]
+
+"""
+import argparse
+import random
+import time
+import typing
+
+from rules import TaskHasValidNameRule
+
+
+def make_names(count: int, seed: int = 0) -> typing.List[str]:
+    """Make task names, some of them are valid and others are not."""
+    rnd = random.Random(seed)
+    verbs = TaskHasValidNameRule.VERBS_ALL
+    words = 'foo bar baz config service package file'.split()
+
+    names = []
+    for idx in range(count):
+        first = rnd.choice(verbs) if idx % 4 else rnd.choice(words)
+        rest = ' '.join(rnd.choice(words) for _ in range(rnd.randint(0, 5)))
+        names.append(f'{first} {rest}'.rstrip())
+
+    return names
+
+
+def previous_impl(name: str) -> bool:
+    """The previous implementation of the default check."""
+    return TaskHasValidNameRule.DEFAULT_NAME_RE.match(name) is not None
+
+
+def timeit(fun: typing.Callable[[str], bool], names: typing.List[str]
+           ) -> float:
+    """Measure the latency of ``fun`` for all names in seconds."""
+    start = time.perf_counter()
+    for name in names:
+        fun(name)
+    return time.perf_counter() - start
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> None:
+    """Entry point."""
+    psr = argparse.ArgumentParser()
+    psr.add_argument('--count', type=int, default=100000)
+    args = psr.parse_args(argv)
+
+    names = make_names(args.count)
+    for name, fun in (
+        ('before (regex)', previous_impl),
+        ('after (verb index)', TaskHasValidNameRule.starts_with_verb)
+    ):
+        print(f'{name}: {timeit(fun, names):.3f} [s]')
+
+
+if __name__ == '__main__':
+    main()
+
+# vim:sw=4:ts=4:et:
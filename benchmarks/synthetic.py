@@ -0,0 +1,317 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+"""Generator of synthetic trees of Ansible playbooks and roles.
+
+It makes a tree looks like real ones at the scale given, that is, a playbook
+uses all of the roles, the roles have tasks, handlers, defaults, vars and
+meta, and the inventory has group_vars and host_vars. The tasks use various
+modules, loops, conditions and nested blocks, and some of them and the vars
+files violate the rules at the rate given.
+
+Usage::
+
+    python -m benchmarks.synthetic [--roles 10] [--tasks-files 3] \\
+        [--tasks 10] [--vars-keys 20] [--depth 2] [--lines 0] OUTDIR
+
+.. seealso:: benchmarks.bench_rules
+"""
+import argparse
+import pathlib
+import random
+import typing
+
+
+class Scale(typing.NamedTuple):
+    """The scale of the tree to make.
+
+    - roles: The number of the roles
+    - tasks_files: The number of the tasks files in each role other than
+      tasks/main.yml
+    - tasks: The number of the tasks in each tasks file
+    - vars_keys: The number of the keys in each vars file
+    - depth: The max depth of the nested blocks and the values of vars
+    - lines: The min number of the lines of each tasks file, padded with
+      comments if the tasks are not enough
+    - error_rate: The rate of the tasks and the files violate the rules
+    """
+    roles: int = 10
+    tasks_files: int = 3
+    tasks: int = 10
+    vars_keys: int = 20
+    depth: int = 2
+    lines: int = 0
+    error_rate: float = 0.05
+
+
+class Tree(typing.NamedTuple):
+    """The tree made.
+
+    - files: The list of the paths and the kinds of the files
+    - ntasks: The number of the tasks in the tree, including the handlers
+    """
+    files: typing.List[typing.Tuple[str, str]]
+    ntasks: int
+
+
+# The tasks of various modules to format with the index.
+TASKS: typing.Tuple[str, ...] = (
+    """\
+- name: Install the package pkg_{idx}
+  package:
+    name: pkg_{idx}
+    state: present
+""",
+    """\
+- name: Deploy the config file of the service {idx}
+  template:
+    src: svc_{idx}.conf.j2
+    dest: /etc/svc_{idx}.conf
+    mode: "0644"
+  notify: Restart svc
+""",
+    """\
+- name: Ensure the dirs of {idx} exist
+  file:
+    path: "/var/lib/app_{idx}/{{{{ item }}}}"
+    state: directory
+  loop:
+    - data
+    - logs
+""",
+    """\
+- name: Configure the line {idx}
+  lineinfile:
+    path: /etc/app.conf
+    regexp: "^key_{idx}="
+    line: "key_{idx}={{{{ app_value_{idx} }}}}"
+  when: app_enabled | bool
+""",
+    """\
+- name: Start the service svc_{idx}
+  service:
+    name: svc_{idx}
+    state: started
+    enabled: true
+""",
+    """\
+- name: Check the status {idx}
+  command: /usr/bin/app-status --id {idx}
+  register: app_status_{idx}
+  changed_when: false
+""",
+)
+
+# The tasks violate the rules.
+BAD_TASKS: typing.Tuple[str, ...] = (
+    """\
+- name: Run a command {idx}
+  shell: ls /tmp/{idx} | wc -l
+""",
+    """\
+- name: x{idx}
+  ping:
+""",
+    """\
+- name: Show the items {idx}
+  debug:
+    var: item
+  with_items: [1, 2, 3]
+""",
+    """\
+- name: Load the vars {idx}
+  include_vars: vars_{idx}.yml
+""",
+)
+
+HANDLERS: str = """\
+- name: Restart svc
+  service:
+    name: svc
+    state: restarted
+"""
+
+META: str = """\
+galaxy_info:
+  author: benchmark
+  description: Synthetic role {idx}
+  license: MIT
+  min_ansible_version: "2.9"
+  platforms:
+    - name: EL
+      versions: ["8"]
+dependencies: []
+"""
+
+
+def indent(text: str, level: int) -> str:
+    """
+    Indent the text.
+
+    >>> indent('a\\n b\\n', 1)
+    '    a\\n     b\\n'
+    """
+    pad = '    ' * level
+    return ''.join(pad + line if line.strip() else line
+                   for line in text.splitlines(True))
+
+
+class Generator:
+    """Generator of the content of the files.
+    """
+    def __init__(self, scale: Scale, seed: int = 0):
+        """Initialize."""
+        self.scale = scale
+        self.rnd = random.Random(seed)
+        self.ntasks = 0
+
+    def task(self) -> str:
+        """Make a task."""
+        self.ntasks += 1
+        idx = self.ntasks
+        if self.rnd.random() < self.scale.error_rate:
+            return self.rnd.choice(BAD_TASKS).format(idx=idx)
+
+        return self.rnd.choice(TASKS).format(idx=idx)
+
+    def tasks(self, count: int, depth: int = 0) -> str:
+        """Make the tasks may be in nested blocks."""
+        res = []
+        while count > 0:
+            if depth < self.scale.depth and count > 2 and \
+                    self.rnd.random() < 0.1:
+                nested = self.rnd.randint(1, count - 1)
+                res.append(f'- name: Run the block {self.ntasks}\n'
+                           f'  when: run_block_{self.ntasks} | bool\n'
+                           f'  block:\n')
+                res.append(indent(self.tasks(nested, depth + 1), 1))
+                count -= nested
+                continue
+
+            res.append(self.task())
+            count -= 1
+
+        return ''.join(res)
+
+    def tasks_file(self, count: int) -> str:
+        """Make the content of a tasks file."""
+        content = '---\n' + self.tasks(count)
+        nlines = content.count('\n')
+        if nlines < self.scale.lines:
+            content += ''.join(f'# Padding comment line {i}\n'
+                               for i in range(self.scale.lines - nlines))
+        return content
+
+    def value(self, depth: int) -> typing.Any:
+        """Make a value of a var may be nested."""
+        kind = self.rnd.random()
+        if depth >= self.scale.depth or kind < 0.5:
+            return self.rnd.choice(
+                (f'value_{self.rnd.randint(0, 1000)}',
+                 self.rnd.randint(0, 65535), True, '{{ other_var }}')
+            )
+        if kind < 0.75:
+            return [self.value(depth + 1) for _ in range(3)]
+
+        return {f'key_{i}': self.value(depth + 1) for i in range(3)}
+
+    def vars_file(self, prefix: str) -> str:
+        """Make the content of a vars file."""
+        if self.rnd.random() < self.scale.error_rate:
+            return '---\n# Empty vars file.\n'
+
+        lines = ['---']
+        for idx in range(self.scale.vars_keys):
+            name = f'{prefix}_var_{idx}'
+            if self.rnd.random() < self.scale.error_rate:
+                name = f'{prefix}-Var-{idx}'  # Invalid name.
+            lines.append(f'{name}: {to_flow(self.value(0))}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def to_flow(value: typing.Any) -> str:
+    """
+    Convert a value to the YAML flow style.
+
+    >>> to_flow({'a': [1, 'b', True]})
+    '{a: [1, "b", true]}'
+    """
+    if isinstance(value, dict):
+        return '{' + ', '.join(f'{k}: {to_flow(v)}'
+                               for k, v in value.items()) + '}'
+    if isinstance(value, list):
+        return '[' + ', '.join(to_flow(v) for v in value) + ']'
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, str):
+        return f'"{value}"'
+    return str(value)
+
+
+def make_tree(topdir: pathlib.Path, scale: Scale = Scale(), seed: int = 0
+              ) -> Tree:
+    """Make a tree at the scale ``scale`` under the dir ``topdir``."""
+    gen = Generator(scale, seed)
+    files: typing.List[typing.Tuple[str, str]] = []
+
+    def write(relpath: str, content: str, kind: str) -> None:
+        path = topdir / relpath
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+        files.append((str(path), kind))
+
+    roles = [f'role_{idx}' for idx in range(scale.roles)]
+    for idx, role in enumerate(roles):
+        rdir = f'roles/{role}'
+        includes = ''.join(
+            f'- name: Include the tasks {i}\n'
+            f'  include_tasks: tasks_{i}.yml\n'
+            for i in range(scale.tasks_files)
+        )
+        gen.ntasks += scale.tasks_files
+        write(f'{rdir}/tasks/main.yml',
+              gen.tasks_file(scale.tasks) + includes, 'tasks')
+        for tidx in range(scale.tasks_files):
+            write(f'{rdir}/tasks/tasks_{tidx}.yml',
+                  gen.tasks_file(scale.tasks), 'tasks')
+
+        gen.ntasks += 1
+        write(f'{rdir}/handlers/main.yml', '---\n' + HANDLERS, 'handlers')
+        write(f'{rdir}/defaults/main.yml', gen.vars_file(f'r{idx}'), 'vars')
+        write(f'{rdir}/vars/main.yml', gen.vars_file(f'r{idx}x'), 'vars')
+        write(f'{rdir}/meta/main.yml', META.format(idx=idx), 'meta')
+
+    write('inventories/group_vars/all.yml', gen.vars_file('all'), 'vars')
+    write('inventories/host_vars/localhost.yml', gen.vars_file('host'),
+          'vars')
+
+    play_vars = ''
+    if gen.rnd.random() < scale.error_rate * 10:
+        play_vars = '  vars:\n    play_var: 1\n'
+    write('site.yml',
+          '---\n- hosts: all\n' + play_vars + '  roles:\n' +
+          ''.join(f'    - {role}\n' for role in roles), 'playbook')
+
+    return Tree(files, gen.ntasks)
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> None:
+    """Entry point."""
+    psr = argparse.ArgumentParser()
+    for field, default in Scale._field_defaults.items():
+        psr.add_argument(f'--{field.replace("_", "-")}', type=type(default),
+                         default=default)
+    psr.add_argument('--seed', type=int, default=0)
+    psr.add_argument('outdir', type=pathlib.Path)
+    args = psr.parse_args(argv)
+
+    scale = Scale(**{f: getattr(args, f) for f in Scale._fields})
+    tree = make_tree(args.outdir, scale, args.seed)
+    print(f'{len(tree.files)} files, {tree.ntasks} tasks in {args.outdir}')
+
+
+if __name__ == '__main__':
+    main()
+
+# vim:sw=4:ts=4:et:
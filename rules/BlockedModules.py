@@ -6,10 +6,17 @@
 r"""
 Lint rule class to test if some blocked modules were used.
 """
-import functools
+import os
+import re
+import site
 import typing
+import warnings
 
-import ansiblelint.rules
+if __package__:
+    from . import _base, _modules
+else:  # Loaded as a top-level module by ansiblelint.rules.load_plugins.
+    site.addsitedir(os.path.dirname(os.path.abspath(__file__)))
+    from _ansiblelint_custom_rules_ex import _base, _modules  # type: ignore
 
 if typing.TYPE_CHECKING:
     from typing import Optional
@@ -18,12 +25,18 @@ if typing.TYPE_CHECKING:
 
 ID: str = 'blocked_modules'
 C_BLOCKED_MODULES: str = 'blocked'
+C_BLOCKED_ARGS: str = 'blocked_args'
 
-DESC: str = """Rule to check if some blocked modules were used in tasks.
+DESC: str = r"""Rule to check if some blocked modules were used in tasks.
 
 - Options
 
-  - ``blocked`` lists the modules blocked to use
+  - ``blocked`` lists the modules blocked to use. Modules are blocked with
+    any of their names, e.g. ``shell``, ``ansible.builtin.shell`` and
+    ``ansible.legacy.shell``, and the names redirected to them.
+    .. seealso:: rules._modules
+  - ``blocked_args`` maps modules to the lists of the patterns (regexp) of
+    the arguments blocked to give them, or a pattern.
 
 - Configuration
 
@@ -35,6 +48,18 @@ DESC: str = """Rule to check if some blocked modules were used in tasks.
         - shell
         - include
 
+  .. code-block:: yaml
+
+  rules:
+    blocked_modules:
+      blocked:
+        - include
+      blocked_args:
+        shell:
+          - 'rm\s+-rf'
+        command:
+          - 'curl\s.*\|\s*(ba)?sh'
+
 .. seealso:: :class:`~ansiblielint.rules.DeprecatedModuleRule`
 """
 
@@ -44,7 +69,123 @@ include
 """.split())
 
 
-class BlockedModules(ansiblelint.rules.AnsibleLintRule):
+# The prefix of the names of groups in the combined patterns.
+_GROUP_PREFIX: str = '_blocked_arg_'
+
+# Numbered references to groups, which refer to the other groups once the
+# patterns are combined into one.
+_NUMBERED_GROUP_REF_RE: typing.Pattern = re.compile(r'\\[1-9]|\(\?\(\d')
+
+_DEFAULT_FLAGS: int = re.compile('').flags
+
+
+class ArgsMatcher(typing.NamedTuple):
+    """A namedtuple object to match the arguments with all of the patterns.
+    """
+    # The combined regex or None if the patterns cannot be combined.
+    regex: typing.Optional[typing.Pattern]
+    patterns: typing.Tuple[str, ...]
+    regexes: typing.Tuple[typing.Pattern, ...]
+
+    def search(self, text: str) -> typing.Optional[str]:
+        """
+        Search the patterns in the text ``text`` and return the pattern
+        matched first.
+
+        >>> matcher = make_args_matcher(['a+b', 'c'])
+        >>> matcher.search('xyc'), matcher.search('aab'), matcher.search('x')
+        ('c', 'a+b', None)
+        """
+        if self.regex is None:
+            for pattern, regex in zip(self.patterns, self.regexes):
+                if regex.search(text):
+                    return pattern
+            return None
+
+        match = self.regex.search(text)
+        if match is None:
+            return None
+
+        group = str(match.lastgroup)
+        return self.patterns[int(group[len(_GROUP_PREFIX):])]
+
+
+def is_combinable(pattern: str, regex: typing.Pattern) -> bool:
+    r"""
+    Test if the pattern keeps its meaning in the combined regex, that is, it
+    does not have global inline flags like '(?i)' apply to all of the
+    patterns, or numbered references to groups.
+
+    >>> is_combinable(r'rm\s+-rf', re.compile(r'rm\s+-rf'))
+    True
+    >>> is_combinable('(?i)rm', re.compile('(?i)rm'))
+    False
+    >>> is_combinable(r'(a)\1', re.compile(r'(a)\1'))
+    False
+    """
+    return (regex.flags == _DEFAULT_FLAGS and
+            not _NUMBERED_GROUP_REF_RE.search(pattern))
+
+
+def make_args_matcher(patterns: typing.Iterable[str]
+                      ) -> typing.Optional[ArgsMatcher]:
+    """
+    Compile the patterns into one combined regex to find all of them in one
+    pass. Invalid patterns are ignored with warnings, and the patterns are
+    searched one by one if they cannot be combined.
+    """
+    valid = []
+    regexes = []
+    for pattern in patterns:
+        try:
+            regexes.append(re.compile(pattern))
+            valid.append(str(pattern))
+        except (re.error, TypeError):
+            warnings.warn(f'Invalid pattern "{pattern}"')
+
+    if not valid:
+        return None
+
+    regex = None
+    if all(is_combinable(p, r) for p, r in zip(valid, regexes)):
+        combined = '|'.join(f'(?P<{_GROUP_PREFIX}{idx}>{pattern})'
+                            for idx, pattern in enumerate(valid))
+        try:
+            regex = re.compile(combined)
+        except re.error:  # e.g. The same group names in the patterns.
+            pass
+
+    return ArgsMatcher(regex, tuple(valid), tuple(regexes))
+
+
+def get_args_text(action: typing.Dict[str, typing.Any]) -> str:
+    """Get the text of the arguments of the task's action to scan.
+
+    .. seealso:: ansiblelint.utils.normalize_task_v2
+    """
+    # The free-form arguments split by ansible-lint.
+    texts = [' '.join(str(a) for a in action.get('__ansible_arguments__', []))]
+    texts.extend(
+        str(val) for key, val in action.items()
+        if not key.startswith('__') and isinstance(val, (str, int, float))
+    )
+    return '\n'.join(t for t in texts if t)
+
+
+class Options(typing.NamedTuple):
+    """Options of the rule made from the configuration.
+    """
+    blocked: typing.FrozenSet[str]
+    canonicals: typing.FrozenSet[str]  # The canonical names of ``blocked``.
+
+    # The canonical names of modules and the matchers of their arguments.
+    args_matchers: typing.Dict[str, ArgsMatcher]
+
+    # The short names of all of the aliases of the modules to prefilter files.
+    tokens: typing.FrozenSet[str]
+
+
+class BlockedModules(_base.CustomRule):
     """
     Lint rule class to test if variables defined by users follow the namging
     conventions and guildelines.
@@ -54,17 +195,69 @@ class BlockedModules(ansiblelint.rules.AnsibleLintRule):
     description: str = DESC
     severity: str = 'HIGH'
     tags: typing.List[str] = [ID, 'module']
+    kinds = _base.TASK_KINDS
 
-    @functools.lru_cache()
-    def blocked_modules(self):
+    def make_options(self, config: typing.Dict[str, typing.Any]) -> Options:
         """
-        .. seealso:: rules.DebugRule.DebugRule.enabled
+        .. seealso:: rules._base.CustomRule.make_options
         """
-        blocked = self.get_config(C_BLOCKED_MODULES)
-        if blocked:
-            return frozenset(blocked)
+        index = _modules.get_index()
+
+        blocked = config.get(C_BLOCKED_MODULES)
+        blocked = frozenset(blocked) if blocked else BLOCKED_MODULES
+
+        args_matchers = {}
+        blocked_args = config.get(C_BLOCKED_ARGS)
+        if isinstance(blocked_args, dict):
+            patterns: typing.Dict[str, typing.List[str]] = {}
+            for mod, mod_patterns in blocked_args.items():
+                if isinstance(mod_patterns, str):
+                    mod_patterns = [mod_patterns]
+                elif not isinstance(mod_patterns, list):
+                    warnings.warn(f'Invalid {C_BLOCKED_ARGS} value of {mod}: '
+                                  f'{mod_patterns!r}')
+                    continue
+
+                # Patterns given to the aliases of a module are merged.
+                patterns.setdefault(index.canonical(mod), []).extend(
+                    mod_patterns
+                )
+
+            for mod, mod_patterns in patterns.items():
+                matcher = make_args_matcher(mod_patterns)
+                if matcher:
+                    args_matchers[mod] = matcher
 
-        return BLOCKED_MODULES
+        elif blocked_args:
+            warnings.warn(f'Invalid {C_BLOCKED_ARGS} value: {blocked_args!r}')
+
+        canonicals = index.canonicals(blocked)
+        tokens = frozenset(
+            name.rsplit('.', 1)[-1]
+            for name in index.aliases(canonicals | frozenset(args_matchers))
+        )
+        return Options(blocked, canonicals, args_matchers, tokens)
+
+    def prefilter_tokens(self) -> typing.FrozenSet[str]:
+        """
+        .. seealso:: rules._base.CustomRule.prefilter_tokens
+        """
+        return self.options.tokens
+
+    def cache_key_data(self) -> typing.Any:
+        """
+        The results depend on the collections installed and the redirects of
+        the modules in them.
+
+        .. seealso:: rules._base.CustomRule.cache_key_data
+        """
+        return _modules.get_index().key
+
+    def blocked_modules(self) -> typing.FrozenSet[str]:
+        """
+        .. seealso:: rules.DebugRule.DebugRule.enabled
+        """
+        return self.options.blocked
 
     def matchtask(self, task: typing.Dict[str, typing.Any],
                   file: 'Optional[Lintable]' = None
@@ -73,11 +266,22 @@ class BlockedModules(ansiblelint.rules.AnsibleLintRule):
         .. seealso:: ansiblelint.rules.AnsibleLintRule.matchtasks
         """
         try:
-            mod = task['action']['__ansible_module__']
-            if mod in self.blocked_modules():
-                return f'{self.shortdesc}: {mod}'
-        except KeyError:
-            pass
+            action = task['action']
+            mod = action['__ansible_module__']
+        except (KeyError, TypeError):
+            return False
+
+        options = self.options
+        canonical = _modules.get_index().canonical(mod)
+        if canonical in options.canonicals:
+            return f'{self.shortdesc}: {mod}'
+
+        matcher = options.args_matchers.get(canonical)
+        if matcher is not None:
+            pattern = matcher.search(get_args_text(action))
+            if pattern is not None:
+                return f'{self.shortdesc}: {mod} with the arguments ' \
+                       f'match the blocked pattern "{pattern}"'
 
         return False
 
@@ -4,13 +4,21 @@
 # pylint: disable=invalid-name
 """ Lint rule class to Debug
 """
-import functools
 import os
+import site
+import threading
+import time
 import typing
+import warnings
 
 import ansiblelint.errors
 import ansiblelint.file_utils
-import ansiblelint.rules
+
+if __package__:
+    from . import _base, _trace
+else:  # Loaded as a top-level module by ansiblelint.rules.load_plugins.
+    site.addsitedir(os.path.dirname(os.path.abspath(__file__)))
+    from _ansiblelint_custom_rules_ex import _base, _trace  # type: ignore
 
 if typing.TYPE_CHECKING:
     from typing import Optional
@@ -20,13 +28,27 @@ if typing.TYPE_CHECKING:
 
 ID: str = 'debug'
 E_ENABLED_VAR: str = '_ANSIBLE_LINT_RULE_DEBUG'
+E_PATH_VAR: str = '_ANSIBLE_LINT_RULE_DEBUG_PATH'
 C_ENABLED: str = 'enabled'
+C_PATH: str = 'path'
+C_SAMPLE_RATE: str = 'sample_rate'
+C_BUFFER_SIZE: str = 'buffer_size'
 
 DESC: str = """Rule to debug and monitor ansible-lint behavior.
 
+This rule does not report any errors. It traces the files, tasks and plays
+ansible-lint gives the rules instead, and writes the events as JSON lines at
+exit. .. seealso:: rules._trace
+
 - Options
 
   - ``enabled`` enables this rule disabled by default.
+  - ``path`` is the path of the file to append the events to. They are
+    written to stderr if it's not given.
+  - ``sample_rate`` is the rate of the files to trace in (0.0, 1.0], 1.0 by
+    default.
+  - ``buffer_size`` is the max number of the latest events to keep, 10000 by
+    default.
 
 - Configuration
 
@@ -35,12 +57,17 @@ DESC: str = """Rule to debug and monitor ansible-lint behavior.
   rules:
     debug:
       enabled: true
+      path: /tmp/ansible-lint-trace.jsonl
+      sample_rate: 0.1
+      buffer_size: 100000
 
 - Environment variables
 
   - Set ``_ANSIBLE_LINT_RULE_DEBUG`` to any value evaluated to true like 1,
     '0', 'foo', if you want to enable this rule. The value to enable this rule
     will be given higher priority than the above configuration value.
+  - Set ``_ANSIBLE_LINT_RULE_DEBUG_PATH`` to the path of the file to append
+    the events to. It will be given higher priority than ``path``.
 """
 
 
@@ -51,7 +78,62 @@ def is_enabled(default: bool = False) -> bool:
     return bool(os.environ.get(E_ENABLED_VAR, default))
 
 
-class DebugRule(ansiblelint.rules.AnsibleLintRule):
+def get_sample_rate(config: typing.Dict[str, typing.Any]) -> float:
+    """Get the sample rate from the configuration.
+    """
+    value = config.get(C_SAMPLE_RATE)
+    if value is None:
+        return _trace.DEFAULT_SAMPLE_RATE
+
+    try:
+        rate = float(value)
+        assert 0.0 < rate <= 1.0
+        return rate
+
+    except (TypeError, ValueError, AssertionError) as exc:
+        warnings.warn(f'Invalid {C_SAMPLE_RATE} value: {value!r}, '
+                      f'exc={exc!s}')
+
+    return _trace.DEFAULT_SAMPLE_RATE
+
+
+def get_buffer_size(config: typing.Dict[str, typing.Any]) -> int:
+    """Get the size of the buffer from the configuration.
+    """
+    value = config.get(C_BUFFER_SIZE)
+    if value is None:
+        return _trace.DEFAULT_BUFFER_SIZE
+
+    try:
+        size = int(value)
+        assert size > 0
+        return size
+
+    except (TypeError, ValueError, AssertionError) as exc:
+        warnings.warn(f'Invalid {C_BUFFER_SIZE} value: {value!r}, '
+                      f'exc={exc!s}')
+
+    return _trace.DEFAULT_BUFFER_SIZE
+
+
+def get_size(file: 'Lintable') -> typing.Optional[int]:
+    """Get the size of the file in bytes without reading it."""
+    try:
+        return os.stat(file.path).st_size
+    except (OSError, TypeError):
+        return None
+
+
+class Options(typing.NamedTuple):
+    """Options of the rule made from the configuration.
+    """
+    enabled: bool
+    path: typing.Optional[str] = None
+    sample_rate: float = _trace.DEFAULT_SAMPLE_RATE
+    buffer_size: int = _trace.DEFAULT_BUFFER_SIZE
+
+
+class DebugRule(_base.CustomRule):
     """
     Lint rule class for debug.
     """
@@ -60,9 +142,23 @@ class DebugRule(ansiblelint.rules.AnsibleLintRule):
     description = DESC
     severity = 'LOW'
     tags = ['debug']
+    cacheable = False
+
+    def __init__(self) -> None:
+        """Initialize."""
+        super().__init__()
+        # The file being traced and the time of the last event in each thread.
+        self._state = threading.local()
+
+    def make_options(self, config: typing.Dict[str, typing.Any]) -> Options:
+        """
+        .. seealso:: rules._base.CustomRule.make_options
+        """
+        return Options(bool(config.get(C_ENABLED)),
+                       config.get(C_PATH) or None,
+                       get_sample_rate(config), get_buffer_size(config))
 
-    @functools.lru_cache(None)
-    def enabled(self):
+    def enabled(self) -> bool:
         """
         .. seealso:: ansiblelint.config.options
         .. seealso:: ansiblelint.cli.load_config
@@ -70,13 +166,51 @@ class DebugRule(ansiblelint.rules.AnsibleLintRule):
         if is_enabled():
             return True  # Gives higher prio. to the environment variable.
 
-        return bool(self.get_config(C_ENABLED))
+        return self.options.enabled
+
+    def tracer(self) -> _trace.Tracer:
+        """Get the tracer of the rule."""
+        opts = self.options
+        return _trace.get_tracer(os.environ.get(E_PATH_VAR) or opts.path,
+                                 opts.sample_rate, opts.buffer_size)
+
+    def trace(self, hook: str, size: typing.Optional[int] = None) -> None:
+        """
+        Record an event of the hook ``hook`` called for the file being traced
+        with the time elapsed since the last event of the file, that is, the
+        time ansible-lint took to give the data to the hook.
+        """
+        state = self._state
+        now = time.perf_counter()
+        state.tracer.add(state.file, hook, now - state.last, size)
+        state.last = now
 
-    def match(self, line: str) -> typing.Union[bool, str]:
+    def getmatches(self, file: 'Lintable'
+                   ) -> typing.List[ansiblelint.errors.MatchError]:
         """
-        .. seealso:: ansiblelint.rules.AnsibleLintRule.matchlines
+        Trace the file if it's sampled. It never reports any errors but the
+        ones of other rules like loading failures.
+
+        .. seealso:: rules._base.CustomRule.getmatches
         """
-        return f'match() at: {line}' if self.enabled() else False
+        if not self.enabled():
+            return []
+
+        tracer = self.tracer()
+        if not tracer.sample():
+            return []
+
+        state = self._state
+        state.tracer, state.file = tracer, file
+        state.start = state.last = time.perf_counter()
+        try:
+            matches = super().getmatches(file)
+        finally:
+            state.file = None
+            tracer.add(file, 'getmatches', time.perf_counter() - state.start,
+                       get_size(file))
+
+        return [m for m in matches if getattr(m.rule, 'id', None) != self.id]
 
     def matchtask(self, task: typing.Dict[str, typing.Any],
                   file: 'Optional[Lintable]' = None
@@ -84,7 +218,10 @@ class DebugRule(ansiblelint.rules.AnsibleLintRule):
         """
         .. seealso:: ansiblelint.rules.AnsibleLintRule.matchtasks
         """
-        return f'matchtask(): {task!r}, {file!r}' if self.enabled() else False
+        if getattr(self._state, 'file', None) is not None:
+            self.trace('matchtask', len(task))
+
+        return False
 
     def matchplay(self, file: ansiblelint.file_utils.Lintable,
                   data: 'odict[str, typing.Any]'
@@ -92,8 +229,9 @@ class DebugRule(ansiblelint.rules.AnsibleLintRule):
         """
         .. seealso:: ansiblelint.rules.AnsibleLintRule.matchtasks
         """
-        if self.enabled():
-            msg = f'matchplay(): {file!r}, {data!r}'
-            return [self.create_matcherror(message=msg, filename=file.name)]
+        if getattr(self._state, 'file', None) is not None:
+            self.trace('matchplay', len(data) if data else 0)
 
         return []
+
+# vim:sw=4:ts=4:et:
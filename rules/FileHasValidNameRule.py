@@ -4,14 +4,20 @@
 # pylint: disable=invalid-name
 """Lint rule class to test if playbook files have valid filenames.
 """
-import functools
+import os
 import re
+import site
 import typing
 import warnings
 
 import ansiblelint.errors
 import ansiblelint.file_utils
-import ansiblelint.rules
+
+if __package__:
+    from . import _base
+else:  # Loaded as a top-level module by ansiblelint.rules.load_plugins.
+    site.addsitedir(os.path.dirname(os.path.abspath(__file__)))
+    from _ansiblelint_custom_rules_ex import _base  # type: ignore
 
 
 ID: str = 'file_has_valid_name'
@@ -47,7 +53,13 @@ FILE_KINDS: typing.FrozenSet[str] = frozenset((
 ))
 
 
-class FileHasValidNameRule(ansiblelint.rules.AnsibleLintRule):
+class Options(typing.NamedTuple):
+    """Options of the rule made from the configuration.
+    """
+    name_re: typing.Pattern
+
+
+class FileHasValidNameRule(_base.CustomRule):
     """
     Rule class to test if playbook file has a valid filename satisfies the file
     naming rules in the organization.
@@ -57,24 +69,30 @@ class FileHasValidNameRule(ansiblelint.rules.AnsibleLintRule):
     description = DESC
     severity = 'MEDIUM'
     tags = [ID, 'playbook', 'readability', 'formatting']
+    kinds = FILE_KINDS
 
-    @functools.lru_cache(None)
-    def valid_name_re(self) -> typing.Pattern:
-        """A valid file name regex pattern.
+    def make_options(self, config: typing.Dict[str, typing.Any]) -> Options:
         """
-        pattern = self.get_config(C_NAME_RE)
+        .. seealso:: rules._base.CustomRule.make_options
+        """
+        pattern = config.get(C_NAME_RE)
         if pattern is not None and pattern:
             pattern = str(pattern).strip()
             if pattern:
                 try:
-                    if self.get_config(C_UNICODE):
-                        return re.compile(pattern)
+                    if config.get(C_UNICODE):
+                        return Options(re.compile(pattern))
 
-                    return re.compile(pattern, re.ASCII)
+                    return Options(re.compile(pattern, re.ASCII))
                 except BaseException:  # pylint: disable=broad-except
                     warnings.warn(f'Invalid pattern? "{pattern}"')
 
-        return DEFAULT_NAME_RE
+        return Options(DEFAULT_NAME_RE)
+
+    def valid_name_re(self) -> typing.Pattern:
+        """A valid file name regex pattern.
+        """
+        return self.options.name_re
 
     def is_invalid_filename(self, filename: str) -> bool:
         """
@@ -11,12 +11,17 @@ variable, _ANSIBLE_LINT_RULE_CUSTOM_2020_30_MAX_LINES.
     _ANSIBLE_LINT_RULE_CUSTOM_2020_30_MAX_LINES=500
 
 """
-import functools
+import os
+import site
 import typing
-import warnings
 
-import ansiblelint.constants
-import ansiblelint.rules
+if __package__:
+    from . import _base, _content, _scan
+else:  # Loaded as a top-level module by ansiblelint.rules.load_plugins.
+    site.addsitedir(os.path.dirname(os.path.abspath(__file__)))
+    from _ansiblelint_custom_rules_ex import (  # type: ignore
+        _base, _content, _scan
+    )
 
 if typing.TYPE_CHECKING:
     from ansiblelint.errors import MatchError
@@ -26,12 +31,16 @@ if typing.TYPE_CHECKING:
 ID: str = 'file_is_small_enough'
 
 C_MAX_LINES: str = 'max_lines'
+C_MAX_BYTES: str = 'max_bytes'
 DEFAULT_MAX_LINES: int = 500
+DEFAULT_MAX_BYTES: typing.Optional[int] = None  # Not limited by default.
+
 DESC: str = """Rule to test if files are smalll enough.
 
 - Options
 
   - ``max_lines`` limits the number of maximum lines files can have.
+  - ``max_bytes`` limits the maximum size of files in bytes if given.
 
 - Configuration
 
@@ -40,27 +49,36 @@ DESC: str = """Rule to test if files are smalll enough.
     rules:
         file_is_small_enough:
             max_lines: 500
+            max_bytes: 65536
 """
 
 
-def exceeds_max_lines(filepath: str, max_lines: int) -> bool:
+class LineCount(typing.NamedTuple):
+    """A namedtuple object to keep the number of lines counted.
+
+    ``nlines`` is the lower bound of the number of lines if ``exact`` is
+    False because counting was stopped early.
     """
-    Test if given file in ``filepath`` has a content exceeds max lines
-    ``max_lines``.
+    nlines: int
+    exact: bool = True
 
-    >>> exceeds_max_lines(__file__, 1000000)
-    False
-    >>> exceeds_max_lines(__file__, 10)
-    True
+
+def count_lines(filepath: '_content.PathOrLintable',
+                limit: typing.Optional[int] = None) -> LineCount:
     """
-    with open(filepath) as fobj:
-        # Which is better?
-        # return len(fobj.readliens()) > max_lines
-        for idx, _line in enumerate(fobj):
-            if idx + 1 > max_lines:
-                return True
+    Count the number of lines of given file in ``filepath``.
 
-    return False
+    The lines are counted in the pass of the scanner shared with other rules
+    without reading and decoding its whole content, and counting stops if the
+    number exceeds ``limit``. .. seealso:: rules._scan
+
+    >>> count_lines(__file__).nlines > 10
+    True
+    >>> count_lines(__file__, 10).nlines > 10
+    True
+    """
+    res = _scan.scan(filepath, limit=limit, count=True)
+    return LineCount(res.nlines, res.exact)
 
 
 # .. seealso:: ansiblelint.constants.FileType
@@ -69,7 +87,14 @@ FTYPES: typing.FrozenSet = frozenset(
 )
 
 
-class FileIsSmallEnoughRule(ansiblelint.rules.AnsibleLintRule):
+class Options(typing.NamedTuple):
+    """Options of the rule made from the configuration.
+    """
+    max_lines: int
+    max_bytes: typing.Optional[int] = DEFAULT_MAX_BYTES
+
+
+class FileIsSmallEnoughRule(_base.CustomRule):
     """
     Rule class to test if playbook and tasks files are small enough.
     """
@@ -78,37 +103,60 @@ class FileIsSmallEnoughRule(ansiblelint.rules.AnsibleLintRule):
     description = shortdesc
     severity = 'MEDIUM'
     tags = [ID, 'playbook', 'tasks', 'readability']
+    kinds = FTYPES
 
-    @functools.lru_cache()
-    def max_lines(self):
-        """The limit number of lines files can have.
+    def make_options(self, config: typing.Dict[str, typing.Any]) -> Options:
+        """
+        .. seealso:: rules._base.CustomRule.make_options
         """
-        try:
-            max_lines = int(self.get_config(C_MAX_LINES))
-            assert max_lines > 0
-            return max_lines
+        return Options(
+            _base.get_int(config, C_MAX_LINES, DEFAULT_MAX_LINES, 1),
+            _base.get_int(config, C_MAX_BYTES, DEFAULT_MAX_BYTES, 1)
+        )
 
-        except (ValueError, AssertionError) as exc:
-            warnings.warn(f'Invalid max_lines value: {max_lines:!r}'
-                          f'exc={exc!s}')
+    def max_lines(self) -> int:
+        """The limit number of lines files can have.
+        """
+        return self.options.max_lines
 
-        return DEFAULT_MAX_LINES
+    def max_bytes(self) -> typing.Optional[int]:
+        """The limit size of files in bytes if given.
+        """
+        return self.options.max_bytes
 
-    @functools.lru_cache()
-    def exceeds_max_lines(self, path: str):
-        """Test if given file is small enough.
+    def check_size(self, file: '_content.PathOrLintable'
+                   ) -> typing.Optional[str]:
         """
-        return exceeds_max_lines(path, self.max_lines())
+        Check the size of given file and return the reason if it's too large.
+        """
+        path: typing.Any = getattr(file, 'path', file)
+        size = os.stat(path).st_size
+
+        max_bytes = self.max_bytes()
+        if max_bytes is not None and size > max_bytes:
+            return f'{size} bytes > {max_bytes}'
+
+        max_lines = self.max_lines()
+        if size <= max_lines:
+            return None  # Each line has one byte at least.
+
+        count = count_lines(file, max_lines)
+        if count.nlines > max_lines:
+            nlines = count.nlines if count.exact else f'{count.nlines}+'
+            return f'{nlines} lines > {max_lines}'
+
+        return None
 
     def matchyaml(self, file: 'Lintable') -> typing.List['MatchError']:
         """Test playbook files.
         """
         if file.kind in FTYPES:
             path = str(file.path)
-            if self.exceeds_max_lines(path):
+            reason = self.check_size(file)
+            if reason:
                 return [
                     self.create_matcherror(
-                        message='File {path} may be too large',
+                        message=f'File {path} may be too large: {reason}',
                         filename=path
                     )
                 ]
@@ -4,9 +4,15 @@
 # pylint: disable=invalid-name
 """Lint rule class to test if tasks use with_* directives.
 """
+import os
+import site
 import typing
 
-import ansiblelint.rules
+if __package__:
+    from . import _base
+else:  # Loaded as a top-level module by ansiblelint.rules.load_plugins.
+    site.addsitedir(os.path.dirname(os.path.abspath(__file__)))
+    from _ansiblelint_custom_rules_ex import _base  # type: ignore
 
 if typing.TYPE_CHECKING:
     from typing import Optional
@@ -20,7 +26,7 @@ https://docs.ansible.com/ansible/latest/user_guide/playbooks_loops.html
 """
 
 
-class LoopIsRecommendedRule(ansiblelint.rules.AnsibleLintRule):
+class LoopIsRecommendedRule(_base.CustomRule):
     """
     Rule class to test if any tasks use with_* loop directive.
     """
@@ -29,6 +35,8 @@ class LoopIsRecommendedRule(ansiblelint.rules.AnsibleLintRule):
     description: str = DESC
     severity: str = 'LOW'
     tags: typing.List[str] = [ID, 'readability', 'formatting']
+    kinds = _base.TASK_KINDS
+    prefilter = frozenset(['with_'])
 
     def matchtask(self, task: typing.Dict[str, typing.Any],
                   file: 'Optional[Lintable]' = None
@@ -5,29 +5,121 @@
 r"""
 Lint rule class to test if there are YAML files have no data.
 """
-import functools
+import os
+import site
 import typing
 import yaml
-import yaml.parser
+import yaml.constructor
+import yaml.resolver
 
-import ansiblelint.rules
 import ansiblelint.errors
 
 from ansiblelint.file_utils import Lintable
 
+if __package__:
+    from . import _base, _content, _scan
+else:  # Loaded as a top-level module by ansiblelint.rules.load_plugins.
+    site.addsitedir(os.path.dirname(os.path.abspath(__file__)))
+    from _ansiblelint_custom_rules_ex import (  # type: ignore
+        _base, _content, _scan
+    )
+
 
 ID: str = 'no-empty-data-files'
 
+# Use the faster parser using libyaml if it's available.
+SAFE_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# The name and the pattern of lines have some data, that is, lines other than
+# blank lines, comments and document markers. .. seealso:: rules._scan
+DATA_LINE: str = 'no_empty_data_files_data_line'
+DATA_LINE_PATTERN: str = r'(?![ \t]*(?:#|\r?$))(?!(?:---|\.\.\.)[ \t]*\r?$)'
+
+_scan.register(DATA_LINE, DATA_LINE_PATTERN)
+
+
+def has_no_data_lines_only(filepath: '_content.PathOrLintable') -> bool:
+    r"""
+    Test if given YAML file consists of lines have no data only.
+
+    The scanner shared with other rules stops at the first line has some data
+    without reading the whole file. .. seealso:: rules._scan
+
+    :raises: OSError if failed to stat or read the file
+
+    >>> _scan.scan_data('---\n# comment\n\n...\n', [DATA_LINE]).found
+    {'no_empty_data_files_data_line': None}
+    >>> _scan.scan_data('---\n# comment\n\na: 1\n', [DATA_LINE]).found
+    {'no_empty_data_files_data_line': 4}
+    """
+    return _scan.scan(filepath, [DATA_LINE]).found[DATA_LINE] is None
+
+
+def scalar_has_some_data(event: yaml.ScalarEvent) -> bool:
+    """
+    Is the scalar of given event ``event`` evaluated to true?
+    """
+    tag = event.tag
+    if tag is None or tag == '!':
+        tag = yaml.resolver.Resolver().resolve(
+            yaml.ScalarNode, event.value, event.implicit
+        )
+    node = yaml.ScalarNode(tag, event.value, style=event.style)
+
+    return bool(yaml.constructor.SafeConstructor().construct_object(node))
+
+
+def yaml_data_has_some_data(data: typing.Union[str, bytes, typing.IO]
+                            ) -> bool:
+    r"""
+    Is given YAML data ``data`` has some data?
+
+    It parses the data or the stream and stops at the first node in the first
+    document without building the objects of the whole data.
 
-@functools.lru_cache()
-def yml_file_has_some_data(filepath: str) -> bool:
+    >>> yaml_data_has_some_data(b'---\n{}\n')
+    False
+    >>> yaml_data_has_some_data(b'---\n[0]\n')
+    True
+    >>> yaml_data_has_some_data(b'false')
+    False
+    """
+    events = yaml.parse(data, Loader=SAFE_LOADER)
+    for event in events:
+        if isinstance(event, yaml.ScalarEvent):
+            return scalar_has_some_data(event)
+
+        if isinstance(event, yaml.MappingStartEvent):
+            return not isinstance(next(events), yaml.MappingEndEvent)
+
+        if isinstance(event, yaml.SequenceStartEvent):
+            return not isinstance(next(events), yaml.SequenceEndEvent)
+
+    return False
+
+
+def yml_file_has_some_data(filepath: '_content.PathOrLintable') -> bool:
     """
     Is given YAML file has some data?
     """
+    path: typing.Any = getattr(filepath, 'path', filepath)
     try:
-        with open(filepath) as fio:
-            return bool(yaml.safe_load(fio))
-    except yaml.parser.ParserError:
+        if os.stat(os.fspath(path)).st_size == 0:
+            return False
+
+        if has_no_data_lines_only(filepath):
+            return False
+
+        # .. seealso:: ansiblelint.file_utils.Lintable.content
+        text = getattr(filepath, '_content', None)
+        if isinstance(text, str):
+            return yaml_data_has_some_data(text)
+
+        # Parse the stream not to read the whole file and keep it in the
+        # shared content cache.
+        with open(path, mode='rb') as fobj:
+            return yaml_data_has_some_data(fobj)
+    except (OSError, yaml.YAMLError):
         pass
 
     return True  # Innocent until proven guilty.
@@ -39,7 +131,7 @@ FTYPES: typing.FrozenSet = frozenset(
 )
 
 
-class NoEmptyDataFilesRule(ansiblelint.rules.AnsibleLintRule):
+class NoEmptyDataFilesRule(_base.CustomRule):
     """
     Lint rule class to test if roles' YAML files have some data.
     """
@@ -47,6 +139,7 @@ class NoEmptyDataFilesRule(ansiblelint.rules.AnsibleLintRule):
     shortdesc = description = 'All YAML files should have some data'
     severity = 'MEDIUM'
     tags = [ID, 'format', 'yaml']
+    kinds = FTYPES
 
     def matchyaml(self, file: Lintable
                   ) -> typing.List[ansiblelint.errors.MatchError]:
@@ -54,7 +147,7 @@ class NoEmptyDataFilesRule(ansiblelint.rules.AnsibleLintRule):
         """
         if file.kind in FTYPES:
             path = str(file.path)
-            if not yml_file_has_some_data(path):
+            if not yml_file_has_some_data(file):
                 return [
                     self.create_matcherror(
                         message=f'Empty data file: {path!s}',
@@ -3,13 +3,19 @@
 #
 r"""Lint rule class to test if tasks have valid names.
 """
-import functools
+import os
 import re
+import site
 import typing
 import warnings
 
 import ansiblelint.utils
-import ansiblelint.rules
+
+if __package__:
+    from . import _base, _memo
+else:  # Loaded as a top-level module by ansiblelint.rules.load_plugins.
+    site.addsitedir(os.path.dirname(os.path.abspath(__file__)))
+    from _ansiblelint_custom_rules_ex import _base, _memo  # type: ignore
 
 if typing.TYPE_CHECKING:
     from typing import Optional
@@ -18,11 +24,19 @@ if typing.TYPE_CHECKING:
 
 ID: str = 'task_has_valid_name'
 C_NAME_RE: str = 'name'
-DESC: str = r"""Rule to test if files are smalll enough.
+C_VERBS_FILE: str = 'verbs_file'
+DESC: str = r"""Rule to test if tasks have valid names.
+
+Task names must start with one of the verbs and have some words after that by
+default.
 
 - Options
 
   - ``name`` gives a valid task name pattern (regexp)
+  - ``verbs_file`` gives the path of a file lists the verbs task names may
+    start with, separated by white spaces. Lines start with '#' are ignored.
+    The file is read as UTF-8, and a relative path is relative to the dir of
+    the configuration file.
 
 - Configuration
 
@@ -31,6 +45,12 @@ DESC: str = r"""Rule to test if files are smalll enough.
     rules:
         task_has_valid_name:
             name: ^\S+$
+
+  .. code-block:: yaml
+
+    rules:
+        task_has_valid_name:
+            verbs_file: .ansible-lint-verbs.txt
 """
 
 VERBS: typing.List[str] = """\
@@ -43,11 +63,55 @@ use validate verify wait work\
 """.split()
 
 VERBS_ALL: typing.List[str] = VERBS + [v.capitalize() for v in VERBS]
+
+# It is not used by default any more and kept for backward compatibility.
 DEFAULT_NAME_RE: typing.Pattern = re.compile(
     r'(' + '|'.join(VERBS_ALL) + r')(\s+(\S+))+$',
     re.ASCII
 )
 
+VerbsT = typing.FrozenSet[str]
+
+
+def make_verbs_index(verbs: typing.Iterable[str]) -> VerbsT:
+    """Make an index of the verbs to look up the first words of names.
+    """
+    return frozenset(v.casefold() for v in verbs)
+
+
+DEFAULT_VERBS: VerbsT = make_verbs_index(VERBS)
+
+
+def load_verbs(path: str) -> VerbsT:
+    """
+    Load the verbs from the file ``path`` and make an index of them.
+
+    :raises: OSError if failed to read the file
+    """
+    with open(path, encoding='utf-8') as fobj:
+        return make_verbs_index(
+            word for line in fobj if not line.lstrip().startswith('#')
+            for word in line.split()
+        )
+
+
+def starts_with_verb(name: str, verbs: VerbsT = DEFAULT_VERBS) -> bool:
+    """
+    Test if given task name ``name`` starts with one of the verbs ``verbs``
+    followed by some words.
+
+    >>> starts_with_verb('Ensure foo is installed')
+    True
+    >>> starts_with_verb('ensure')
+    False
+    >>> starts_with_verb('Foo is installed')
+    False
+    """
+    words = name.split(None, 1)
+    return (len(words) == 2 and words[0].casefold() in verbs and
+            not name[0].isspace() and not name[-1].isspace())
+
+
 _NAMELESS_TASKS: typing.FrozenSet[str] = frozenset("""
 meta
 debug
@@ -66,7 +130,14 @@ def is_named_task(task: typing.Dict[str, typing.Any],
     return task['action']['__ansible_module__'] not in nameless_tasks
 
 
-class TaskHasValidNameRule(ansiblelint.rules.AnsibleLintRule):
+class Options(typing.NamedTuple):
+    """Options of the rule made from the configuration.
+    """
+    name_re: typing.Optional[typing.Pattern] = None
+    verbs: VerbsT = DEFAULT_VERBS
+
+
+class TaskHasValidNameRule(_base.CustomRule):
     """
     Rule class to test if given task has a valid name satisfies the naming rule
     in the organization.
@@ -76,26 +147,45 @@ class TaskHasValidNameRule(ansiblelint.rules.AnsibleLintRule):
     description = DESC
     severity = 'MEDIUM'
     tags = [ID, 'task', 'readability', 'formatting']
+    kinds = _base.TASK_KINDS
+    config_files = frozenset([C_VERBS_FILE])
 
-    @functools.lru_cache()
-    def valid_name_re(self) -> typing.Pattern:
-        """A valid task name pattern.
+    def make_options(self, config: typing.Dict[str, typing.Any]) -> Options:
         """
-        pattern_s = self.get_config(C_NAME_RE)
+        .. seealso:: rules._base.CustomRule.make_options
+        """
+        pattern_s = config.get(C_NAME_RE)
         if pattern_s:
             try:
-                return re.compile(pattern_s)
+                return Options(name_re=re.compile(pattern_s))
             except BaseException:  # pylint: disable=broad-except
                 warnings.warn(f'Invalid pattern "{pattern_s}"')
 
-        return DEFAULT_NAME_RE
+        verbs_file = config.get(C_VERBS_FILE)
+        if verbs_file:
+            try:
+                return Options(verbs=load_verbs(verbs_file))
+            except (OSError, UnicodeDecodeError) as exc:
+                warnings.warn(f'Failed to load the verbs from {verbs_file}, '
+                              f'exc={exc!r}')
+
+        return Options()
+
+    def valid_name_re(self) -> typing.Optional[typing.Pattern]:
+        """A valid task name pattern if given.
+        """
+        return self.options.name_re
 
-    @functools.lru_cache()
+    @_memo.memoize
     def is_invalid_task_name(self, name: str) -> bool:
         """
         Test if given task's name is invalid.
         """
-        return self.valid_name_re().match(name) is None
+        name_re = self.valid_name_re()
+        if name_re is None:
+            return not starts_with_verb(name, self.options.verbs)
+
+        return name_re.match(name) is None
 
     def matchtask(self, task: typing.Dict[str, typing.Any],
                   file: 'Optional[Lintable]' = None
@@ -4,15 +4,21 @@
 # pylint: disable=invalid-name
 """Lint rule class to test if tasks files have valid filenames.
 """
-import functools
+import os
 import pathlib
 import re
+import site
 import typing
 import warnings
 
 import ansiblelint.errors
 import ansiblelint.file_utils
-import ansiblelint.rules
+
+if __package__:
+    from . import _base, _memo
+else:  # Loaded as a top-level module by ansiblelint.rules.load_plugins.
+    site.addsitedir(os.path.dirname(os.path.abspath(__file__)))
+    from _ansiblelint_custom_rules_ex import _base, _memo  # type: ignore
 
 if typing.TYPE_CHECKING:
     from ansiblelint.constants import odict
@@ -41,7 +47,13 @@ C_UNICODE: str = 'unicode'
 DEFAULT_NAME_RE: typing.Pattern = re.compile(r'^\w+\.ya?ml$', re.ASCII)
 
 
-class TasksFileHasValidNameRule(ansiblelint.rules.AnsibleLintRule):
+class Options(typing.NamedTuple):
+    """Options of the rule made from the configuration.
+    """
+    name_re: typing.Pattern
+
+
+class TasksFileHasValidNameRule(_base.CustomRule):
     """
     Rule class to test if tasks file has a valid filename satisfies the file
     naming rules in the organization.
@@ -51,24 +63,30 @@ class TasksFileHasValidNameRule(ansiblelint.rules.AnsibleLintRule):
     description = DESC
     severity = 'HIGH'
     tags = [ID, 'task']
+    kinds = frozenset(['tasks'])
 
-    @functools.lru_cache()
-    def valid_name_re(self) -> typing.Pattern:
-        """A valid task name pattern.
+    def make_options(self, config: typing.Dict[str, typing.Any]) -> Options:
         """
-        pattern_s = self.get_config(C_NAME_RE)
+        .. seealso:: rules._base.CustomRule.make_options
+        """
+        pattern_s = config.get(C_NAME_RE)
         if pattern_s:
             try:
-                if self.get_config(C_UNICODE):
-                    return re.compile(pattern_s)
+                if config.get(C_UNICODE):
+                    return Options(re.compile(pattern_s))
 
-                return re.compile(pattern_s, re.ASCII)
+                return Options(re.compile(pattern_s, re.ASCII))
             except BaseException:  # pylint: disable=broad-except
                 warnings.warn(f'Invalid pattern "{pattern_s}"')
 
-        return DEFAULT_NAME_RE
+        return Options(DEFAULT_NAME_RE)
+
+    def valid_name_re(self) -> typing.Pattern:
+        """A valid task name pattern.
+        """
+        return self.options.name_re
 
-    @functools.lru_cache()
+    @_memo.memoize
     def is_valid_filename(self, path: str) -> bool:
         """
         Test if given task's filename is valid.
@@ -4,16 +4,23 @@
 # pylint: disable=invalid-name
 """Lint rule class to test if variables in vars files have valid names.
 """
-import functools
+import os
 import re
+import site
 import typing
 import warnings
 
-import ansiblelint.rules
-import ansiblelint.utils
+import yaml
+
+if __package__:
+    from . import _base, _content, _memo
+else:  # Loaded as a top-level module by ansiblelint.rules.load_plugins.
+    site.addsitedir(os.path.dirname(os.path.abspath(__file__)))
+    from _ansiblelint_custom_rules_ex import (  # type: ignore
+        _base, _content, _memo
+    )
 
 if typing.TYPE_CHECKING:
-    from ansiblelint.constants import odict
     from ansiblelint.errors import MatchError
     from ansiblelint.file_utils import Lintable
 
@@ -30,6 +37,11 @@ DESC: str = r"""Rule to test if variables in vars files have valid names.
 
   - ``name`` gives a valid variable name pattern (regexp)
   - ``unicode`` allows unicode characters are used in variable names
+  - ``max_depth`` limits the depth of the nested mappings to test the keys,
+    1 (only the top-level keys, the variable names) by default and 0 means
+    no limits
+  - ``max_errors`` limits the number of errors reported for each file, 100
+    by default and 0 means no limits
 
 - Configuration
 
@@ -39,27 +51,80 @@ DESC: str = r"""Rule to test if variables in vars files have valid names.
       vars_in_vars_files_have_valid_names:
         name: ^\w+$
         unicode: false
+        max_depth: 1
+        max_errors: 100
 """
 C_NAME_RE: str = 'name'
 C_UNICODE: str = 'unicode'
+C_MAX_DEPTH: str = 'max_depth'
+C_MAX_ERRORS: str = 'max_errors'
 
 DEFAULT_NAME_RE: typing.Pattern = re.compile(r'^\w+$', re.ASCII)
+DEFAULT_MAX_DEPTH: int = 1
+DEFAULT_MAX_ERRORS: int = 100
+
+SAFE_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
 
+# The key to merge mappings, not a variable name.
+MERGE_KEY: str = '<<'
 
-def each_keys(data: 'odict[str, typing.Any]') -> typing.Iterator[str]:
+
+def each_keys_in_stream(stream: typing.Union[str, typing.IO],
+                        max_depth: int = DEFAULT_MAX_DEPTH
+                        ) -> typing.Iterator[typing.Tuple[str, int]]:
     """
-    Traverse nested dict and yield keys.
+    Yield the keys of the mappings and the line numbers of them from the YAML
+    events without constructing the whole data.
+
+    :param stream: A str or a file object of YAML data
+    :param max_depth: The max depth of mappings, no limits if it's 0
+    :raises: yaml.YAMLError if failed to parse the data
+
+    >>> list(each_keys_in_stream('a: {b: 1}\\nc: [{d: 2}]\\n', 0))
+    [('a', 1), ('b', 1), ('c', 2), ('d', 2)]
+    >>> list(each_keys_in_stream('a: {b: 1}\\nc: [{d: 2}]\\n'))
+    [('a', 1), ('c', 2)]
     """
-    for key, _val, _parent in ansiblelint.utils.nested_items(data):
-        # Special case.
-        # .. seealso:: ansiblelint.utils.nested_items
-        if key == 'list-item':
+    # A stack of [expecting a key or not] of each mapping, or None of each
+    # sequence.
+    stack: typing.List[typing.Optional[typing.List[bool]]] = []
+    depth = 0  # The depth of the current mapping.
+
+    for event in yaml.parse(stream, Loader=SAFE_LOADER):
+        if isinstance(event, (yaml.MappingEndEvent, yaml.SequenceEndEvent)):
+            if stack.pop() is not None:
+                depth -= 1
             continue
 
-        yield key
+        if not isinstance(event, yaml.NodeEvent):
+            continue  # Stream and document events.
+
+        is_key = False
+        if stack and stack[-1] is not None:
+            frame = stack[-1]
+            is_key = frame[0]
+            frame[0] = not is_key
+
+        if isinstance(event, yaml.MappingStartEvent):
+            stack.append([True])
+            depth += 1
+        elif isinstance(event, yaml.SequenceStartEvent):
+            stack.append(None)
+        elif (is_key and isinstance(event, yaml.ScalarEvent) and
+              (max_depth <= 0 or depth <= max_depth) and
+              event.value != MERGE_KEY):
+            yield (event.value, getattr(event.start_mark, 'line', -1) + 1)
 
 
-class VarsInVarsFilesHaveValidNamesRule(ansiblelint.rules.AnsibleLintRule):
+class Options(typing.NamedTuple):
+    """Options of the rule made from the configuration.
+    """
+    name_re: typing.Pattern
+    max_depth: int = DEFAULT_MAX_DEPTH
+    max_errors: int = DEFAULT_MAX_ERRORS
+
+
+class VarsInVarsFilesHaveValidNamesRule(_base.CustomRule):
     """
     Rule class to test if variables defined in vars files (host_vars,
     group_vars, defaults, vars) have valid names follow the naming rules.
@@ -69,43 +134,90 @@ class VarsInVarsFilesHaveValidNamesRule(ansiblelint.rules.AnsibleLintRule):
     description = DESC
     severity = 'HIGH'
     tags = ['idiom']
+    kinds = frozenset(['vars'])
 
-    @functools.lru_cache(None)
-    def valid_name_re(self) -> typing.Pattern:
-        """A valid variable name pattern.
+    def make_options(self, config: typing.Dict[str, typing.Any]) -> Options:
+        """
+        .. seealso:: rules._base.CustomRule.make_options
         """
-        pattern_s = self.get_config(C_NAME_RE)
+        name_re = DEFAULT_NAME_RE
+        pattern_s = config.get(C_NAME_RE)
         if pattern_s:
             try:
-                if self.get_config(C_UNICODE):
-                    return re.compile(pattern_s)
-
-                return re.compile(pattern_s, re.ASCII)
+                if config.get(C_UNICODE):
+                    name_re = re.compile(pattern_s)
+                else:
+                    name_re = re.compile(pattern_s, re.ASCII)
             except BaseException:  # pylint: disable=broad-except
                 warnings.warn(f'Invalid pattern "{pattern_s}"')
 
-        return DEFAULT_NAME_RE
+        return Options(name_re,
+                       _base.get_int(config, C_MAX_DEPTH, DEFAULT_MAX_DEPTH),
+                       _base.get_int(config, C_MAX_ERRORS,
+                                     DEFAULT_MAX_ERRORS))
+
+    def valid_name_re(self) -> typing.Pattern:
+        """A valid variable name pattern.
+        """
+        return self.options.name_re
 
-    @functools.lru_cache()
+    @_memo.memoize
     def is_invalid_name(self, var_name: str) -> bool:
         """
         True if given variable name is NOT valid.
         """
         return self.valid_name_re().match(var_name) is None
 
-    def matchplay(self, file: 'Lintable',
-                  data: 'odict[str, typing.Any]'
-                  ) -> typing.List['MatchError']:
+    def each_invalid_names(self, file: 'Lintable'
+                           ) -> typing.Iterator[typing.Tuple[str, int]]:
+        """
+        Yield the invalid names and the line numbers of them in given vars
+        file without duplicates.
+        """
+        seen: typing.Set[str] = set()
+        text = _content.load(file).text
+        for name, lineno in each_keys_in_stream(text, self.options.max_depth):
+            if name in seen:
+                continue
+
+            seen.add(name)
+            if self.is_invalid_name(name):
+                yield (name, lineno)
+
+    def matchyaml(self, file: 'Lintable') -> typing.List['MatchError']:
         """
-        .. seealso:; ansiblelint.rules.AnsibleLintRule.matchplay
+        .. seealso:; ansiblelint.rules.AnsibleLintRule.matchyaml
         """
-        if file.kind == 'vars':
-            return [
+        if file.kind != 'vars':
+            return []
+
+        max_errors = self.options.max_errors
+        matches = []
+        nerrors = 0
+        try:
+            for var_name, lineno in self.each_invalid_names(file):
+                nerrors += 1
+                if max_errors and nerrors > max_errors:
+                    continue
+
+                matches.append(
+                    self.create_matcherror(
+                        details=f'{self.shortdesc}: {var_name}',
+                        linenumber=lineno, filename=file
+                    )
+                )
+        except (OSError, yaml.YAMLError):
+            return []  # ansible-lint reports the errors to load the file.
+
+        if max_errors and nerrors > max_errors:
+            matches.append(
                 self.create_matcherror(
-                    details=f'{self.shortdesc}: {var_name}', filename=file
+                    details=(f'{self.shortdesc}: {nerrors - max_errors} more '
+                             f'invalid names were found'),
+                    filename=file
                 )
-                for var_name in each_keys(data)
-                if self.is_invalid_name(var_name)
-            ]
+            )
+
+        return matches
 
-        return []
+# vim:sw=4:ts=4:et:
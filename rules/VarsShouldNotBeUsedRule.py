@@ -4,53 +4,88 @@
 # pylint: disable=invalid-name
 """Lint rule class to test if vars and include_vars are used.
 """
-import functools
-import re
+import os
+import site
 import typing
-import warnings
 
 import ansiblelint.errors
 import ansiblelint.file_utils
-import ansiblelint.rules
+import ansiblelint.utils
+
+if __package__:
+    from . import _base, _modules
+else:  # Loaded as a top-level module by ansiblelint.rules.load_plugins.
+    site.addsitedir(os.path.dirname(os.path.abspath(__file__)))
+    from _ansiblelint_custom_rules_ex import _base, _modules  # type: ignore
+
+if typing.TYPE_CHECKING:
+    from typing import Optional
+    from ansiblelint.constants import odict
 
 
 ID: str = "vars_should_not_be_used"
 
-VARS_DIRECTIVES: typing.FrozenSet = frozenset("""
-include_vars
-vars
-vars_files
-""".split())
+KINDS: typing.FrozenSet[str] = frozenset(
+    'playbook tasks handlers role'.split()
+)
+
+# The keys of plays, blocks and tasks to define variables.
+VARS_KEYS: typing.Tuple[str, ...] = ('vars', 'vars_files')
 
-VARS_RE: typing.Pattern = re.compile(
-    r'^(\s+)?(-\s+)?('
-    f"{'|'.join(VARS_DIRECTIVES)}"
-    r'):', re.ASCII
+# The keys of plays and blocks have lists of tasks.
+TASKS_KEYS: typing.Tuple[str, ...] = (
+    'pre_tasks', 'tasks', 'post_tasks', 'handlers', 'block', 'rescue',
+    'always'
 )
 
+# The key of plays have a list of roles may have their own vars.
+ROLES_KEY: str = 'roles'
 
-KINDS: typing.FrozenSet[str] = frozenset(
-    'playbook tasks role'.split()
+# The modules to include roles, the ``apply`` of them may have vars.
+ROLE_MODULES: typing.FrozenSet[str] = frozenset(
+    f'{prefix}{mod}' for mod in ('include_role', 'import_role')
+    for prefix in ('', 'ansible.builtin.', 'ansible.legacy.')
 )
 
+INCLUDE_VARS: str = 'ansible.builtin.include_vars'
+
+LINE_KEY: str = ansiblelint.utils.LINE_NUMBER_KEY
+
 
-@functools.lru_cache()
-def contains_vars_directive(path: str) -> bool:
+def each_vars_keys(data: typing.Any
+                   ) -> typing.Iterator[typing.Tuple[str, typing.Any]]:
     """
-    Test if file of given path contains vars directives in it.
+    Yield the keys to define variables and the mappings have them in given
+    play, block or task ``data`` parsed, and the ones nested in it, that is,
+    the roles of plays, the ``apply`` of the tasks include roles and the
+    tasks of plays and blocks.
     """
-    try:
-        with open(path) as fobj:
-            for line in fobj:
-                if VARS_RE.match(line):
-                    return True
-    except (IOError, OSError) as exc:
-        warnings.warn(f'Failed to load {path}, exc={exc!r}')
+    if not isinstance(data, dict):
+        return
+
+    for key in VARS_KEYS:
+        if key in data:
+            yield (key, data)
+
+    roles = data.get(ROLES_KEY)
+    if isinstance(roles, list):
+        for role in roles:
+            if isinstance(role, dict):
+                yield from each_vars_keys(role)
 
-    return False
+    for mod in ROLE_MODULES.intersection(data):
+        args = data[mod]
+        if isinstance(args, dict) and isinstance(args.get('apply'), dict):
+            yield from each_vars_keys(args['apply'])
 
+    for key in TASKS_KEYS:
+        tasks = data.get(key)
+        if isinstance(tasks, list):
+            for task in tasks:
+                yield from each_vars_keys(task)
 
-class VarsShouldNotBeUsedRule(ansiblelint.rules.AnsibleLintRule):
+
+class VarsShouldNotBeUsedRule(_base.CustomRule):
     """
     Rule class to test if vars directives are used.
     """
@@ -61,18 +96,47 @@ class VarsShouldNotBeUsedRule(ansiblelint.rules.AnsibleLintRule):
                         'and related data instead.')
     severity = 'LOW'
     tags = [ID, 'readability', 'formatting']
+    kinds = KINDS
+    prefilter = frozenset(['vars'])  # vars, vars_files and include_vars.
 
-    def matchyaml(self, file: ansiblelint.file_utils.Lintable
+    def matchplay(self, file: ansiblelint.file_utils.Lintable,
+                  data: 'odict[str, typing.Any]'
                   ) -> typing.List[ansiblelint.errors.MatchError]:
-        """Test playbook files.
         """
-        if file.kind in KINDS:
-            path = str(file.path)
-            if contains_vars_directive(path):
-                return [
-                    self.create_matcherror(message=f'{self.shortdesc}: {path}')
-                ]
-
-        return []
+        Test the plays, blocks and tasks parsed by ansible-lint already.
+
+        .. seealso:: ansiblelint.rules.AnsibleLintRule.matchyaml
+        """
+        if file.kind not in KINDS:
+            return []
+
+        # The line numbers of the plays, blocks and tasks have the keys.
+        return [
+            self.create_matcherror(
+                message=f'{self.shortdesc}: {key}',
+                linenumber=mapping.get(LINE_KEY, 1),
+                details=key, filename=file
+            )
+            for key, mapping in each_vars_keys(data)
+        ]
+
+    def matchtask(self, task: typing.Dict[str, typing.Any],
+                  file: 'Optional[ansiblelint.file_utils.Lintable]' = None
+                  ) -> typing.Union[bool, str]:
+        """
+        .. seealso:: ansiblelint.rules.AnsibleLintRule.matchtasks
+        """
+        if file is not None and file.kind not in KINDS:
+            return False
+
+        try:
+            mod = task['action']['__ansible_module__']
+        except (KeyError, TypeError):
+            return False
+
+        if _modules.normalize(mod) == INCLUDE_VARS:
+            return f'{self.shortdesc}: {mod}'
+
+        return False
 
 # vim:sw=4:ts=4:et:
@@ -0,0 +1,348 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+"""asyncio API to lint files in the services run many requests at once.
+
+The rules are loaded once and shared by the requests. The files of each
+request are linted in a bounded pool of threads not to block the event loop,
+and the errors found are yielded as soon as the lint of each file finished.
+
+.. code-block:: python
+
+    async def handle(paths):
+        config = dict(rules=dict(blocked_modules=dict(blocked=['shell'])))
+        async for match in lint_paths(paths, config, timeout=60):
+            print(match)
+
+The configuration ``config`` is a mapping object same as the content of the
+ansible-lint configuration file, and its keys, rules, tags, skip_list and
+exclude_paths are used.
+
+.. note::
+
+   The rules get their configuration from the global options of ansible-lint,
+   so that the requests of the different configuration of the rules cannot
+   run at the same time. The requests of the same configuration run at once,
+   and the others wait for them to finish.
+
+.. note::
+
+   The syntax check of the playbooks by ansible-playbook is not done, same
+   as the daemon. .. seealso:: rules._daemon
+"""
+import asyncio
+import collections
+import concurrent.futures
+import copy
+import os
+import pathlib
+import subprocess
+import threading
+import typing
+
+import ansiblelint.config
+import ansiblelint.errors
+import ansiblelint.rules
+import ansiblelint.utils
+from ansiblelint._internal.rules import LoadingFailureRule
+from ansiblelint.file_utils import Lintable
+
+from . import _config, _dispatch, _git, _runner
+
+
+RULES_DIR: str = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MAX_WORKERS: int = min(4, os.cpu_count() or 1)
+
+ConfigT = typing.Dict[str, typing.Any]
+MatchesT = typing.List[ansiblelint.errors.MatchError]
+
+# The collections of the rules keyed by the dirs of them.
+_RULES: typing.Dict[typing.Tuple[str, ...], _dispatch.Dispatcher] = {}
+_LOCK = threading.RLock()
+
+
+def get_rules(rulesdirs: typing.Optional[typing.Iterable[str]] = None
+              ) -> _dispatch.Dispatcher:
+    """Get the rules in the dirs ``rulesdirs`` loaded once.
+
+    :param rulesdirs: The dirs of the rules, the dir of this module by default
+    """
+    key = tuple(rulesdirs or (RULES_DIR, ))
+    with _LOCK:
+        rules = _RULES.get(key)
+        if rules is None:
+            rules = _RULES[key] = _dispatch.Dispatcher(
+                ansiblelint.rules.RulesCollection(list(key))
+            )
+
+    return rules
+
+
+def list_files(topdir: str) -> typing.List[str]:
+    """
+    List the files under the dir ``topdir``. The files ignored by git are not
+    listed if it's in a git repository.
+    """
+    try:
+        return sorted(os.path.join(topdir, path)
+                      for path in _git.list_files(['.'], cwd=topdir))
+    except (OSError, subprocess.CalledProcessError):
+        pass
+
+    return sorted(
+        os.path.join(root, filename)
+        for root, _dirs, files in os.walk(topdir)
+        for filename in files
+        if not any(d.startswith('.')
+                   for d in pathlib.PurePath(root).relative_to(topdir).parts)
+    )
+
+
+def find_lintables(paths: typing.Iterable[str],
+                   exclude_paths: typing.Iterable[str] = ()
+                   ) -> typing.List[Lintable]:
+    """
+    Make the Lintable objects of the paths and the files in the dirs in them.
+
+    .. seealso:: ansiblelint.file_utils.expand_dirs_in_lintables
+    """
+    exclude_paths = list(exclude_paths)
+    res: typing.Dict[str, Lintable] = {}
+    for path in paths:
+        files = [path]
+        if os.path.isdir(path):
+            files.extend(list_files(path))
+
+        for filename in files:
+            if filename in res or \
+                    _runner.is_excluded(filename, exclude_paths):
+                continue
+
+            lintable = Lintable(filename)
+            if lintable.kind:
+                res[filename] = lintable
+
+    return list(res.values())
+
+
+def lint_file(rules: _dispatch.Dispatcher, lintable: Lintable,
+              tags: typing.Set[str], skip_list: typing.List[str]
+              ) -> typing.Tuple[MatchesT, typing.List[Lintable]]:
+    """
+    Lint the file and find the children of it, e.g. the tasks files included.
+
+    :return: A tuple of the errors found and the children
+    """
+    matches: MatchesT = []
+    children: typing.List[Lintable] = []
+    try:
+        children = ansiblelint.utils.find_children(lintable)
+    except ansiblelint.errors.MatchError as exc:
+        if not exc.filename:
+            exc.filename = str(lintable.path)
+        exc.rule = LoadingFailureRule()
+        matches.append(exc)
+    except AttributeError:
+        matches.append(ansiblelint.errors.MatchError(
+            filename=str(lintable.path), rule=LoadingFailureRule()
+        ))
+
+    matches.extend(rules.run(lintable, tags=tags, skip_list=skip_list))
+    return (matches, children)
+
+
+class ConfigGate:
+    """
+    A gate lets only the requests of the same configuration of the rules run
+    at once. The requests waiting enter in the order they came, and the ones
+    of the same configuration as the first one waiting enter together. It
+    must be used in one event loop.
+    """
+    def __init__(self) -> None:
+        """Initialize."""
+        self.digest: typing.Optional[str] = None
+        self.active = 0
+        self._waiters: typing.Dict[
+            asyncio.Future, typing.Tuple[str, ConfigT]
+        ] = collections.OrderedDict()
+
+    def _enter(self, digest: str, config: ConfigT) -> bool:
+        """
+        Enter and apply the configuration of the rules ``config``.
+
+        :return: True if no other requests are active
+        """
+        first = not self.active
+        if self.digest != digest:
+            ansiblelint.config.options.rules = copy.deepcopy(config)
+            _config.invalidate()
+            self.digest = digest
+
+        self.active += 1
+        return first
+
+    async def acquire(self, config: ConfigT) -> bool:
+        """
+        Wait for the requests of other configuration and the ones waiting
+        before to finish and apply the configuration of the rules ``config``.
+
+        :return: True if no other requests were active when it entered
+        """
+        digest = _config.digest(config)
+        if not self._waiters and (not self.active or self.digest == digest):
+            return self._enter(digest, config)
+
+        waiter = asyncio.get_event_loop().create_future()
+        self._waiters[waiter] = (digest, config)
+        try:
+            return await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # It was cancelled after it entered.
+            else:
+                self._waiters.pop(waiter, None)
+            raise
+
+    def release(self) -> None:
+        """
+        Release and let the requests waiting first enter if it's the last one.
+        """
+        self.active -= 1
+        while not self.active and self._waiters:
+            digest = next(iter(self._waiters.values()))[0]
+            for waiter, (wdigest, config) in list(self._waiters.items()):
+                if wdigest != digest:
+                    continue
+
+                del self._waiters[waiter]
+                if not waiter.done():  # It may be cancelled.
+                    waiter.set_result(self._enter(digest, config))
+
+
+class Linter:
+    """Linter shares the rules and the pool of threads among the requests.
+    """
+    def __init__(self, rulesdirs: typing.Optional[typing.List[str]] = None,
+                 max_workers: int = DEFAULT_MAX_WORKERS):
+        """Initialize.
+
+        :param rulesdirs: The dirs of the rules, .. seealso:: get_rules
+        :param max_workers: The max number of the threads to lint files
+        """
+        self.rules = get_rules(rulesdirs)
+        self.max_workers = max_workers
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers
+        )
+        self.gate = ConfigGate()
+
+    def close(self) -> None:
+        """Shutdown the pool of threads."""
+        self.executor.shutdown(wait=False)
+
+    async def lint_paths(self, paths: typing.Iterable[str],
+                         config: typing.Optional[ConfigT] = None,
+                         timeout: typing.Optional[float] = None
+                         ) -> typing.AsyncIterator[
+                             ansiblelint.errors.MatchError]:
+        """
+        Lint the files and the files in the dirs ``paths`` and yield the
+        errors found as soon as they are found.
+
+        The lint of the files not started yet is cancelled if the iteration
+        was stopped or cancelled.
+
+        :param config: The configuration same as the one of ansible-lint
+        :param timeout: The timeout of the whole request in seconds
+        :raises: asyncio.TimeoutError if it timed out
+        """
+        config = config or {}
+        tags = set(config.get('tags') or [])
+        skip_list = list(config.get('skip_list') or [])
+        exclude_paths = list(config.get('exclude_paths') or [])
+
+        loop = asyncio.get_event_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+
+        first = await self.gate.acquire(config.get('rules') or {})
+        pending: typing.Set[asyncio.Future] = set()
+        cfuts: typing.Dict[asyncio.Future, concurrent.futures.Future] = {}
+        try:
+            # The files parsed by other requests may be changed since then.
+            # The configuration is changed only if no others are active too.
+            if first:
+                ansiblelint.utils.parse_yaml_linenumbers.cache_clear()
+
+            queue = collections.deque(await loop.run_in_executor(
+                self.executor, find_lintables, list(paths), exclude_paths
+            ))
+            seen = set(queue)
+            while queue or pending:
+                while queue and len(pending) < self.max_workers:
+                    cfut = self.executor.submit(lint_file, self.rules,
+                                                queue.popleft(), tags,
+                                                skip_list)
+                    fut = asyncio.wrap_future(cfut)
+                    cfuts[fut] = cfut
+                    pending.add(fut)
+
+                remains = None if deadline is None else deadline - loop.time()
+                if remains is not None and remains <= 0:
+                    raise asyncio.TimeoutError()
+
+                done, pending = await asyncio.wait(
+                    pending, timeout=remains,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                for fut in done:
+                    del cfuts[fut]
+                    matches, children = fut.result()
+                    for child in children:
+                        if child not in seen and \
+                                not _runner.is_excluded(str(child.path),
+                                                        exclude_paths):
+                            seen.add(child)
+                            queue.append(child)
+
+                    for match in matches:
+                        if not _runner.is_excluded(match.filename,
+                                                   exclude_paths):
+                            yield match
+        finally:
+            # Cancel the lint not started yet, and keep the gate until the
+            # running ones finish not to change the configuration under them
+            # even if this was cancelled.
+            running = [fut for fut in pending if not cfuts[fut].cancel()]
+            if running:
+                finished = asyncio.gather(*running, return_exceptions=True)
+                finished.add_done_callback(lambda _: self.gate.release())
+                await asyncio.shield(finished)
+            else:
+                self.gate.release()
+
+
+_LINTER: typing.Optional[Linter] = None
+
+
+def get_linter() -> Linter:
+    """Get the linter shared by default."""
+    global _LINTER  # pylint: disable=global-statement
+    with _LOCK:
+        if _LINTER is None:
+            _LINTER = Linter()
+
+    return _LINTER
+
+
+def lint_paths(paths: typing.Iterable[str],
+               config: typing.Optional[ConfigT] = None,
+               timeout: typing.Optional[float] = None
+               ) -> typing.AsyncIterator[ansiblelint.errors.MatchError]:
+    """
+    Lint the files with the linter shared by default.
+
+    .. seealso:: Linter.lint_paths
+    """
+    return get_linter().lint_paths(paths, config, timeout=timeout)
+
+# vim:sw=4:ts=4:et:
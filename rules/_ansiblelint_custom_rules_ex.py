@@ -0,0 +1,36 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+"""The package of the helper modules for the rules loaded without a package.
+
+ansiblelint.rules.load_plugins loads the rules as top-level modules without a
+package, so that they cannot import the helper modules in the same dir,
+rules/_*.py, relatively. This module makes the dir a package of this distinct
+name, and the rules import the helper modules as the submodules of it, e.g.
+``_ansiblelint_custom_rules_ex._base``, instead of top-level modules of the
+generic names may conflict with other modules.
+
+The rules cannot import even this module before the dir is in sys.path, so
+that each of them adds the dir with site.addsitedir, which does nothing if it
+was added already, and imports the helper modules from this module.
+
+.. code-block:: python
+
+    if __package__:
+        from . import _base
+    else:  # Loaded as a top-level module by ansiblelint.rules.load_plugins.
+        site.addsitedir(os.path.dirname(os.path.abspath(__file__)))
+        from _ansiblelint_custom_rules_ex import _base
+
+The scripts in the dir, e.g. rules/_runner.py, do not need to add it because
+Python adds the dir of the script run to sys.path.
+
+pylint cannot find this package made only at runtime, so that it's listed in
+the ignored-modules of pylint in setup.cfg.
+"""
+import os
+
+
+__path__ = [os.path.dirname(os.path.abspath(__file__))]
+
+# vim:sw=4:ts=4:et:
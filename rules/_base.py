@@ -0,0 +1,211 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+"""Base class of the custom rules.
+"""
+import typing
+import warnings
+
+import ansiblelint.errors
+import ansiblelint.rules
+
+from . import (
+    _config, _content, _git, _memo, _memory, _metrics, _prefilter,
+    _profile, _result_cache
+)
+
+if typing.TYPE_CHECKING:
+    from ansiblelint.file_utils import Lintable
+
+
+# The kinds of files ansible-lint gives tasks from.
+# .. seealso:: ansiblelint.rules.AnsibleLintRule.matchtasks
+TASK_KINDS: typing.FrozenSet[str] = frozenset(
+    'handlers tasks playbook'.split()
+)
+
+DefaultT = typing.TypeVar('DefaultT', int, typing.Optional[int])
+
+
+def get_int(config: typing.Dict[str, typing.Any], key: str,
+            default: DefaultT, minimum: int = 0) -> DefaultT:
+    """
+    Get an int value not less than ``minimum`` of ``key`` from the
+    configuration of a rule, or ``default`` with a warning if it's invalid.
+
+    >>> get_int({'a': '1'}, 'a', 10)
+    1
+    >>> get_int({}, 'a', None)
+    """
+    value = config.get(key)
+    if value is None:
+        return default
+
+    try:
+        ival = int(value)
+        assert ival >= minimum, f'It must be >= {minimum}'
+        return ival
+
+    except (ValueError, TypeError, AssertionError) as exc:
+        warnings.warn(f'Invalid {key} value: {value!r}, exc={exc!s}')
+
+    return default
+
+
+class CustomRule(ansiblelint.rules.AnsibleLintRule):
+    """
+    Base class of the custom rules to provide some common features.
+
+    - The lint results may be restored from the persistent cache.
+      .. seealso:: rules._result_cache
+    - The configuration is converted to an immutable object, ``options``,
+      and it will be rebuilt only if the configuration was changed.
+      .. seealso:: rules._config
+      .. seealso:: rules._memo
+    - Lines are not scanned one by one for rules without their own ``match``.
+    - The rule is not called for files of the kinds not in ``kinds`` by the
+      dispatcher. .. seealso:: rules._dispatch
+    - The rule is not called for files lack all of its prefilter tokens.
+      .. seealso:: rules._prefilter
+    - The hooks of the rule may be timed.
+      .. seealso:: rules._metrics
+    - The hooks of the rule may be profiled.
+      .. seealso:: rules._profile
+    - The memory allocated by the rule may be accounted.
+      .. seealso:: rules._memory
+    """
+    # Set False if the lint results of the rule should not be cached.
+    cacheable: bool = True
+
+    # The default size of the memos of the methods.
+    cache_size: int = _memo.DEFAULT_CACHE_SIZE
+
+    # The kinds of files the rule tests or None if it tests files of any
+    # kinds. .. seealso:: ansiblelint.config.DEFAULT_KINDS
+    kinds: typing.Optional[typing.FrozenSet[str]] = None
+
+    # The tokens any of them must appear in files the rule may find
+    # something. .. seealso:: rules._prefilter
+    prefilter: typing.Optional[typing.FrozenSet[str]] = None
+
+    # The keys of the configuration give the paths of the files the rule
+    # loads. .. seealso:: rules._config
+    config_files: typing.FrozenSet[str] = frozenset()
+
+    def __init__(self) -> None:
+        """Initialize and instrument the rule if enabled."""
+        super().__init__()
+        if _profile.ENABLED:
+            _profile.instrument(self)
+        if _memory.ENABLED:
+            _memory.instrument(self)
+        if _metrics.ENABLED:
+            _metrics.instrument(self)
+
+    def prefilter_tokens(self) -> typing.Optional[typing.FrozenSet[str]]:
+        """
+        Get the tokens any of them must appear in files the rule may find
+        something, or None if the rule may find something in any files.
+        Children classes may override this.
+        """
+        return self.prefilter
+
+    def cache_key_data(self) -> typing.Any:
+        """
+        Get the data the lint results of the rule depend on other than the
+        configuration and the file to lint, like the collections installed.
+        Children classes may override this.
+
+        .. seealso:: rules._result_cache.make_key
+        """
+        return None
+
+    def get_config(self, key: str) -> typing.Any:  # type: ignore[override]
+        """
+        Get the configuration value of ``key``.
+
+        .. note::
+
+           ansiblelint.rules.AnsibleLintRule.get_config caches the values
+           forever with functools.lru_cache.
+        """
+        return self.rule_config.get(key, None)
+
+    def make_options(self, config: typing.Dict[str, typing.Any]
+                     ) -> typing.Any:
+        """
+        Make an immutable object holds the values of the configuration
+        ``config`` ready to use. Children classes may override this.
+        """
+        return None
+
+    def snapshot(self) -> _config.Snapshot:
+        """Get the snapshot of the configuration."""
+        return _config.get_snapshot(self)
+
+    @property
+    def options(self) -> typing.Any:
+        """The object made by make_options from the configuration."""
+        return _config.get_snapshot(self).options
+
+    def matchlines(self, file: 'Lintable'
+                   ) -> typing.List[ansiblelint.errors.MatchError]:
+        """
+        Skip the scan of each line if the rule does not have its own match.
+
+        .. note::
+
+           ansiblelint.rules.AnsibleLintRule.matchlines calls the method
+           ``match`` for each line always even if it's the default one does
+           nothing. The rules look for some lines should search the content
+           of the files at once instead, e.g.
+           rules.NoEmptyDataFilesRule.has_no_data_lines_only.
+
+        .. seealso:: ansiblelint.rules.AnsibleLintRule.matchlines
+        """
+        if type(self).match is ansiblelint.rules.AnsibleLintRule.match:
+            return []
+
+        return super().matchlines(file)
+
+    def getmatches(self, file: 'Lintable'
+                   ) -> typing.List[ansiblelint.errors.MatchError]:
+        """
+        .. seealso:: ansiblelint._internal.rules.BaseRule.getmatches
+        """
+        # Check the configuration once for each file, and the memos depend on
+        # it are renewed if it was changed. .. seealso:: rules._memo
+        _config.get_snapshot(self)
+
+        if not file.path.is_dir() and not _prefilter.may_match(self, file):
+            if _metrics.ENABLED:
+                _metrics.count(self, 'skipped_prefilter')
+            return []
+
+        cache = _result_cache.get_cache()
+        if cache is None or not self.cacheable or file.path.is_dir():
+            return super().getmatches(file)
+
+        try:
+            blob_id = _git.get_blob_id(file)
+            content = None if blob_id else _content.load(file).data
+            key = _result_cache.make_key(self, file, content, blob_id)
+        except OSError:
+            return super().getmatches(file)
+
+        data = cache.get(key)
+        if _metrics.ENABLED:
+            _metrics.count(self, 'result_cache_misses' if data is None
+                           else 'result_cache_hits')
+        if data is not None:
+            return _result_cache.load_matches(self, file, data)
+
+        matches = super().getmatches(file)
+
+        # Errors from other rules like the loading failures are not cached.
+        if all(getattr(m.rule, 'id', None) == self.id for m in matches):
+            cache.set(key, _result_cache.dump_matches(matches, file))
+
+        return matches
+
+# vim:sw=4:ts=4:et:
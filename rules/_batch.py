@@ -0,0 +1,211 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+"""Batch mode to lint many repositories in one process.
+
+Running ansible-lint for each repository loads ansible-lint and the rules
+every time. The batch mode loads them once and lints the repositories one by
+one in the same process. The snapshots of the configuration of the rules are
+reused among the repositories share the same configuration of the rules
+(.. seealso:: rules._config).
+
+The results are written as JSON lines, one line for each repository, as soon
+as each repository was linted::
+
+    {"repo": "...", "config": "<digest>", "files": N, "matches": [...],
+     "timings": {"load": ..., "lint": ..., "total": ...}, "error": null}
+
+Usage::
+
+    python -m rules._batch [-o OUTPUT] [--repos-from FILE] [--repo REPO ...]
+        [ANSIBLE_LINT_OPTIONS ...]
+
+The options of ansible-lint like -r RULESDIR are loaded in the current dir
+first to load the rules, and in the top dir of each repository again to load
+the configuration of it.
+
+.. seealso:: rules._runner
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+import typing
+
+import ansiblelint.__main__
+import ansiblelint.rules
+import ansiblelint.utils
+
+if __package__:
+    from . import _config, _content, _runner
+else:  # Run as a script.
+    from _ansiblelint_custom_rules_ex import (  # type: ignore
+        _config, _content, _runner
+    )
+
+
+RecordT = typing.Dict[str, typing.Any]
+
+
+@contextlib.contextmanager
+def chdir(path: str) -> typing.Iterator[None]:
+    """Change the current dir to ``path`` temporarily."""
+    cwd = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(cwd)
+
+
+def clear_caches() -> None:
+    """
+    Clear the caches keyed by the relative paths of the files because the
+    repositories may have the files of the same paths, and the values of the
+    configuration of the rules ansible-lint caches forever.
+    """
+    ansiblelint.utils.parse_yaml_linenumbers.cache_clear()
+    ansiblelint.rules.AnsibleLintRule.get_config.cache_clear()
+    _content.CACHE.clear()
+
+
+def abspath_rulesdirs(argv: typing.List[str]) -> typing.List[str]:
+    """
+    Make the paths of the dirs of the rules in the arguments absolute to
+    load the rules in the workers run in the top dirs of the repositories.
+
+    >>> abspath_rulesdirs(['-r', '/a', '-R', '-rb'])[:3]
+    ['-r', '/a', '-R']
+    >>> abspath_rulesdirs(['-rb'])[0] == '-r' + os.path.abspath('b')
+    True
+    """
+    res = []
+    prev = None
+    for arg in argv:
+        if prev == '-r':
+            arg = os.path.abspath(arg)
+        elif arg.startswith('-r') and len(arg) > 2:
+            arg = '-r' + os.path.abspath(arg[2:])
+
+        res.append(arg)
+        prev = arg
+
+    return res
+
+
+def lint_repo(repo: str, rules: ansiblelint.rules.RulesCollection,
+              argv: typing.List[str], jobs: int = 1) -> RecordT:
+    """Lint the repository ``repo``.
+
+    :param repo: The path of the top dir of the repository
+    :param rules: A RulesCollection object loaded once
+    :param argv: The arguments of ansible-lint
+    :param jobs: The number of worker processes; run in this process if < 2
+    :return: A mapping object of the results
+    """
+    start = time.perf_counter()
+    res: RecordT = dict(repo=repo, config=None, files=0, matches=[],
+                        timings={}, error=None)
+    try:
+        with chdir(repo):
+            clear_caches()
+            options, _app = _runner.load_options(argv)
+            res['config'] = _config.digest(options.rules)
+            loaded = time.perf_counter()
+
+            report = _runner.run(rules, options, argv, jobs)
+            result = _runner.to_lint_result(report, rules)
+            res['files'] = len(report.files)
+            res['matches'] = [
+                _runner.dump_match(m)._asdict() for m in result.matches
+            ]
+            res['timings'] = dict(load=loaded - start,
+                                  lint=time.perf_counter() - loaded)
+    # ansible-lint exits if the configuration is invalid.
+    except (Exception, SystemExit) as exc:  # pylint: disable=broad-except
+        res['error'] = f'{exc.__class__.__name__}: {exc!s}'
+
+    res['timings']['total'] = time.perf_counter() - start
+    return res
+
+
+def lint_repos(repos: typing.Iterable[str],
+               rules: ansiblelint.rules.RulesCollection,
+               argv: typing.List[str], jobs: int = 1
+               ) -> typing.Iterator[RecordT]:
+    """Lint the repositories one by one.
+
+    .. seealso:: lint_repo
+    """
+    for repo in repos:
+        yield lint_repo(repo, rules, argv, jobs)
+
+
+def load_repos(path: str) -> typing.List[str]:
+    """Load the paths of the repositories from the file or stdin if '-'.
+    """
+    if path == '-':
+        lines = sys.stdin.readlines()
+    else:
+        with open(path, encoding='utf-8') as fobj:
+            lines = fobj.readlines()
+
+    return [line.strip() for line in lines
+            if line.strip() and not line.startswith('#')]
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> int:
+    """Entry point.
+
+    :return: 1 if failed to lint any repositories, 2 if any errors were found
+        in them, or 0
+    """
+    psr = argparse.ArgumentParser(add_help=False)
+    psr.add_argument('--repo', action='append', default=[],
+                     help='The top dir of a repository to lint. It can be '
+                          'given multiple times.')
+    psr.add_argument('--repos-from', metavar='PATH',
+                     help='The file lists the top dirs of the repositories, '
+                          'one for each line, or - to read from stdin')
+    psr.add_argument('-o', '--output', default='-',
+                     help='The path of the file to write the results as '
+                          'JSON lines, or - for stdout [%(default)s]')
+    psr.add_argument('-j', '--jobs', type=int, default=1,
+                     help='The number of worker processes for each '
+                          'repository [%(default)s]')
+    args, rest = psr.parse_known_args(sys.argv[1:] if argv is None else argv)
+    rest = abspath_rulesdirs(rest)
+
+    repos = [os.path.abspath(r) for r in args.repo]
+    if args.repos_from:
+        repos.extend(os.path.abspath(r) for r in load_repos(args.repos_from))
+
+    options, _app = _runner.load_options(rest)
+    ansiblelint.__main__.initialize_logger(options.verbosity)
+    ansiblelint.__main__.prepare_environment()
+    ansiblelint.__main__.check_ansible_presence(exit_on_error=True)
+
+    rules = ansiblelint.rules.RulesCollection(options.rulesdirs)
+    rcode = 0
+    with contextlib.ExitStack() as stack:
+        out = sys.stdout if args.output == '-' else stack.enter_context(
+            open(args.output, 'w', encoding='utf-8')
+        )
+        for record in lint_repos(repos, rules, rest, args.jobs):
+            out.write(json.dumps(record, default=str) + '\n')
+            out.flush()
+
+            if record['error']:
+                rcode = 1
+            elif record['matches'] and not rcode:
+                rcode = 2
+
+    return rcode
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+# vim:sw=4:ts=4:et:
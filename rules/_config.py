@@ -0,0 +1,281 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+"""Immutable snapshots of the configuration of rules.
+
+Each rule can convert its configuration given in ``rules.<rule_id>`` of the
+ansible-lint configuration to an immutable object holds values ready to use
+like compiled regex patterns, frozensets and ints with a method,
+``make_options``. The snapshot keeps that object with the version and the hash
+of the configuration.
+
+The snapshot is checked only with the identities of
+``ansiblelint.config.options.rules`` and ``options.rules[rule_id]``, and the
+generation of the configuration, so that getting it costs few. It will be
+rebuilt if another configuration was set to either of them, or the generation
+was bumped with ``invalidate`` by the callers loaded the configuration again,
+e.g. on the start of each lint run, or changed it in place.
+
+The values of the configuration give the paths of the files the rules load,
+listed in ``config_files`` of the rules, are resolved to the absolute paths,
+relative to the dir of the ansible-lint configuration file if it was loaded
+same as the other paths in it, and the hashes of the content of the files are
+included in the hash of the configuration. The files are checked again when
+the snapshot is rebuilt, and the options are made again only if the
+configuration or the content of the files were changed.
+"""
+import collections
+import copy
+import hashlib
+import itertools
+import json
+import os
+import threading
+import typing
+
+import ansiblelint.config
+
+
+# The attribute name of rule instances to keep the snapshot.
+SNAPSHOT_ATTR: str = '_config_snapshot'
+
+# The attribute name of rule instances to keep the snapshots made before, and
+# the max number of them kept to reuse if the configuration was changed back.
+SNAPSHOTS_ATTR: str = '_config_snapshots'
+MAX_SNAPSHOTS: int = 16
+
+# The attribute name of rule instances to keep the token identifies the
+# configuration the snapshot was got from.
+TOKEN_ATTR: str = '_config_token'
+
+FileStatT = typing.Optional[typing.Tuple[int, int]]
+
+_VERSIONS = itertools.count(1)
+_LOCK = threading.Lock()
+
+# The generation of the configuration bumped by invalidate.
+_GENERATION: int = 0
+
+
+def digest(config: typing.Dict[str, typing.Any]) -> str:
+    """Compute the hash of the configuration ``config``.
+
+    >>> digest({'a': 1, 'b': 2}) == digest({'b': 2, 'a': 1})
+    True
+    """
+    data = json.dumps(config, sort_keys=True, default=repr)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def get_env_int(name: str, default: int, minimum: int = 0) -> int:
+    """
+    Get an int value not less than ``minimum`` of the environment variable
+    ``name``, or ``default`` if it's not set or invalid.
+
+    >>> get_env_int('_ANSIBLE_LINT_RULE_NOT_SET_IN_THE_DOCTEST', 10)
+    10
+    """
+    try:
+        value = int(os.environ.get(name, default))
+        if value >= minimum:
+            return value
+    except ValueError:
+        pass
+
+    return default
+
+
+def file_digest(path: str) -> str:
+    """Compute the hash of the content of the file ``path``.
+
+    :return: The hash or an empty string if failed to read the file
+    """
+    try:
+        with open(path, mode='rb') as fobj:
+            return hashlib.sha1(fobj.read()).hexdigest()
+    except OSError:
+        return ''
+
+
+def get_config_dir() -> typing.Optional[str]:
+    """
+    Get the dir of the ansible-lint configuration file if it was loaded.
+
+    .. seealso:: ansiblelint.cli.load_config
+    """
+    path = getattr(ansiblelint.config.options, 'config_file', None)
+    return os.path.dirname(os.path.abspath(path)) if path else None
+
+
+def resolve_files(config: typing.Dict[str, typing.Any],
+                  keys: typing.Iterable[str],
+                  basedir: typing.Optional[str] = None
+                  ) -> typing.Tuple[typing.Dict[str, typing.Any],
+                                    typing.List[str]]:
+    """
+    Resolve the paths of the files given as the values of ``keys`` in the
+    configuration ``config`` to the absolute ones.
+
+    :param basedir: The dir the relative paths are relative to, or the
+        current dir if not given
+    :return: A tuple of a copy of ``config`` has the absolute paths, or
+        ``config`` itself if there are no such values, and the paths
+
+    >>> resolve_files({'a': 'b'}, ['c'])
+    ({'a': 'b'}, [])
+    >>> resolve_files({'a': '/b'}, ['a'])
+    ({'a': '/b'}, ['/b'])
+    >>> resolve_files({'a': 'b'}, ['a'], '/c')
+    ({'a': '/c/b'}, ['/c/b'])
+    """
+    paths = {key: os.path.abspath(os.path.join(basedir or '', config[key]))
+             for key in keys
+             if config.get(key) and isinstance(config[key], str)}
+    if not paths:
+        return (config, [])
+
+    return (dict(config, **paths), sorted(paths.values()))
+
+
+def stat_files(paths: typing.Iterable[str]) -> typing.Dict[str, FileStatT]:
+    """Get the mtimes and the sizes of the files ``paths`` if exist.
+    """
+    res: typing.Dict[str, FileStatT] = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            res[path] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            res[path] = None
+
+    return res
+
+
+class Snapshot:
+    """An immutable snapshot of the configuration of a rule.
+    """
+    __slots__ = ('version', 'digest', 'config', 'options', 'files')
+
+    version: int
+    digest: str
+    config: typing.Dict[str, typing.Any]
+    options: typing.Any
+    files: typing.Dict[str, FileStatT]
+
+    def __init__(self, config: typing.Dict[str, typing.Any],
+                 options: typing.Any = None,
+                 files: typing.Optional[typing.Dict[str, FileStatT]] = None,
+                 digest_: typing.Optional[str] = None):
+        """Initialize.
+
+        :param config: The configuration of the rule
+        :param options: The object made from ``config`` by the rule
+        :param files: The mtimes and the sizes of the files the rule loads
+        :param digest_: The hash of ``config`` and the files if computed
+        """
+        with _LOCK:
+            version = next(_VERSIONS)
+
+        # pylint: disable=assigning-non-slot
+        object.__setattr__(self, 'version', version)
+        object.__setattr__(self, 'digest', digest_ or digest(config))
+        object.__setattr__(self, 'config', copy.deepcopy(config))
+        object.__setattr__(self, 'options', options)
+        object.__setattr__(self, 'files', dict(files or {}))
+
+    def __setattr__(self, name: str, value: typing.Any) -> None:
+        """Make this immutable."""
+        raise AttributeError(f'{self.__class__.__name__} is immutable')
+
+    def __repr__(self) -> str:
+        """Return a representation."""
+        return (f'<{self.__class__.__name__} version={self.version} '
+                f'digest={self.digest} options={self.options!r}>')
+
+    def is_made_from(self, config: typing.Dict[str, typing.Any],
+                     files: typing.Optional[typing.Dict[str, FileStatT]]
+                     = None) -> bool:
+        """
+        Test if this snapshot was made from the configuration ``config`` and
+        the files of the mtimes and the sizes ``files``.
+
+        .. note::
+
+           The values are compared always because the configuration may be
+           changed in place, e.g. ``options.rules[rule_id]['name'] = ...``.
+        """
+        return self.config == config and self.files == (files or {})
+
+
+def invalidate() -> None:
+    """
+    Bump the generation of the configuration to check the configuration of
+    all rules and the files it gives again on the next access. It must be
+    called if the configuration was loaded again or changed in place.
+    """
+    global _GENERATION  # pylint: disable=global-statement
+    with _LOCK:
+        _GENERATION += 1
+
+
+def get_snapshot(rule: typing.Any) -> Snapshot:
+    """Get the snapshot of the configuration of ``rule``.
+
+    The snapshot is returned as it is while the token of the configuration is
+    the same, and it's rebuilt only if the configuration or the files it gives
+    were changed since then. The snapshot made before from the same
+    configuration and the same content of the files is reused if any, e.g. the
+    configuration was changed back or linting many repositories share the
+    same configuration.
+    """
+    rules = ansiblelint.config.options.rules
+    token = rule.__dict__.get(TOKEN_ATTR)
+    if token is not None and token[0] == _GENERATION and \
+            token[1] is rules and token[2] is rules.get(rule.id):
+        return rule.__dict__[SNAPSHOT_ATTR]
+
+    token = (_GENERATION, rules, rules.get(rule.id))
+    snapshot = rebuild_snapshot(rule)
+    rule.__dict__[TOKEN_ATTR] = token
+    return snapshot
+
+
+def rebuild_snapshot(rule: typing.Any) -> Snapshot:
+    """
+    Check the configuration of ``rule`` and the files it gives, and make the
+    snapshot again if they were changed.
+    """
+    (config, paths) = resolve_files(rule.rule_config,
+                                    getattr(rule, 'config_files', ()),
+                                    get_config_dir())
+    files = stat_files(paths)
+    snapshot = rule.__dict__.get(SNAPSHOT_ATTR)
+    if snapshot is not None and snapshot.is_made_from(config, files):
+        return snapshot
+
+    snapshots = rule.__dict__.setdefault(SNAPSHOTS_ATTR,
+                                         collections.OrderedDict())
+    if paths:
+        key = digest(dict(config=config,
+                          files={p: file_digest(p) for p in paths}))
+    else:
+        key = digest(config)
+
+    snapshot = snapshots.get(key)
+    if snapshot is None or snapshot.config != config:
+        make_options = getattr(rule, 'make_options', None)
+        options = make_options(config) if make_options else None
+        snapshot = Snapshot(config, options, files, key)
+    elif snapshot.files != files:
+        # The files were touched but have the same content.
+        snapshot = Snapshot(config, snapshot.options, files, key)
+
+    snapshots[key] = snapshot
+    snapshots.move_to_end(key)
+    while len(snapshots) > MAX_SNAPSHOTS:
+        snapshots.popitem(last=False)
+
+    rule.__dict__[SNAPSHOT_ATTR] = snapshot
+    return snapshot
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,262 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+"""Shared file content cache for the rules read files by themselves.
+
+Some rules need the raw content of the files to lint in addition to the data
+ansible-lint parsed. This module reads each file only once, keeps its content
+keyed by the path, mtime and size of the file, and hands out the bytes, the
+decoded text and the line offsets to every rule needs them.
+
+The total size of the content kept in the cache is limited and the least
+recently used ones will be evicted if it exceeds the limit. The limit can be
+changed by an environment variable, _ANSIBLE_LINT_RULE_CONTENT_CACHE_MAX_BYTES.
+
+::
+
+    _ANSIBLE_LINT_RULE_CONTENT_CACHE_MAX_BYTES=134217728
+
+"""
+import bisect
+import collections
+import os
+import threading
+import typing
+
+from . import _config
+
+if typing.TYPE_CHECKING:
+    from ansiblelint.file_utils import Lintable
+
+
+E_MAX_BYTES_VAR: str = '_ANSIBLE_LINT_RULE_CONTENT_CACHE_MAX_BYTES'
+DEFAULT_MAX_BYTES: int = 64 * 1024 * 1024
+
+PathOrLintable = typing.Union[str, os.PathLike, 'Lintable']
+
+
+def count_lines(text: str) -> int:
+    r"""Count the number of lines in the text ``text``.
+
+    >>> count_lines('')
+    0
+    >>> count_lines('a\nb')
+    2
+    >>> count_lines('a\nb\n')
+    2
+    """
+    if not text:
+        return 0
+
+    return text.count('\n') + (0 if text.endswith('\n') else 1)
+
+
+class Content:
+    """Content of a file.
+
+    The decoded text and the line offsets are computed lazily and only once.
+    """
+    __slots__ = ('path', 'mtime', 'size', 'data', 'found_tokens', '_text',
+                 '_offsets')
+
+    def __init__(self, path: str, mtime: int, size: int, data: bytes,
+                 text: typing.Optional[str] = None):
+        """Initialize.
+
+        :param path: The path of the file
+        :param mtime: The mtime of the file in nanoseconds
+        :param size: The size of the file in bytes
+        :param data: The content of the file in bytes
+        :param text: The content of the file decoded already if available
+        """
+        self.path = path
+        self.mtime = mtime
+        self.size = size
+        self.data = data
+        self._text = text
+        self._offsets: typing.Optional[typing.List[int]] = None
+
+        # The tokens found or not, .. seealso:: rules._prefilter
+        self.found_tokens: typing.Dict[bytes, bool] = {}
+
+    @property
+    def text(self) -> str:
+        """The content decoded as UTF-8 text."""
+        if self._text is None:
+            self._text = self.data.decode('utf-8', errors='replace')
+        return self._text
+
+    @property
+    def offsets(self) -> typing.List[int]:
+        """The offsets in the text where each line starts."""
+        if self._offsets is None:
+            text = self.text
+            offsets = [0] if text else []
+            idx = text.find('\n')
+            while idx >= 0:
+                if idx + 1 < len(text):
+                    offsets.append(idx + 1)
+                idx = text.find('\n', idx + 1)
+
+            self._offsets = offsets
+        return self._offsets
+
+    @property
+    def nlines(self) -> int:
+        """The number of lines."""
+        if self._offsets is not None:
+            return len(self._offsets)
+
+        # Count them without making the list of the offsets.
+        return count_lines(self.text)
+
+    def lines(self) -> typing.Iterator[str]:
+        """Yield each line in the text with the newline character."""
+        text = self.text
+        offsets = self.offsets
+        for idx, start in enumerate(offsets):
+            end = offsets[idx + 1] if idx + 1 < len(offsets) else len(text)
+            yield text[start:end]
+
+    def linenumber(self, offset: int) -> int:
+        """Get the line number (1-based) of given text offset ``offset``.
+        """
+        return max(bisect.bisect_right(self.offsets, offset), 1)
+
+
+class Stats(typing.NamedTuple):
+    """A namedtuple object to keep the statistics of the cache.
+    """
+    hits: int
+    misses: int
+    evictions: int
+    nbytes: int
+    entries: int
+
+
+def get_max_bytes(default: int = DEFAULT_MAX_BYTES) -> int:
+    """Get the max bytes of the cache from the environment variable.
+    """
+    return _config.get_env_int(E_MAX_BYTES_VAR, default)
+
+
+def _path_and_text(file: PathOrLintable
+                   ) -> typing.Tuple[str, typing.Optional[str]]:
+    """Get the path and the content loaded already if given a Lintable.
+    """
+    path: typing.Any = getattr(file, 'path', file)
+    # Avoid decoding the file again if ansible-lint has loaded its content.
+    # .. seealso:: ansiblelint.file_utils.Lintable.content
+    text = getattr(file, '_content', None)
+
+    return (os.fspath(path), text if isinstance(text, str) else None)
+
+
+class ContentCache:
+    """An LRU cache of file contents limited by the total size in bytes.
+    """
+    def __init__(self, max_bytes: typing.Optional[int] = None):
+        """Initialize.
+
+        :param max_bytes: The max total size of contents to keep in bytes
+        """
+        if max_bytes is None:
+            max_bytes = get_max_bytes()
+
+        self.max_bytes = max_bytes
+        self._entries: typing.Dict[str, Content] = collections.OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        self._hits = self._misses = self._evictions = 0
+
+    def stats(self) -> Stats:
+        """Get the statistics of the cache."""
+        return Stats(self._hits, self._misses, self._evictions,
+                     self._nbytes, len(self._entries))
+
+    def clear(self) -> None:
+        """Clear the cache."""
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+            self._hits = self._misses = self._evictions = 0
+
+    def _evict(self) -> None:
+        """Evict the least recently used contents to fit in the limit."""
+        while self._entries and self._nbytes > self.max_bytes:
+            _path, content = self._entries.popitem(last=False)  # type: ignore
+            self._nbytes -= len(content.data)
+            self._evictions += 1
+
+    def peek(self, file: PathOrLintable) -> typing.Optional[Content]:
+        """
+        Get the content of given file ``file`` only if it's in the cache
+        already, without reading the file.
+
+        :param file: A path or a Lintable object
+        :raises: OSError if failed to stat the file
+        """
+        path = os.fspath(getattr(file, 'path', file))
+        stat = os.stat(path)
+
+        with self._lock:
+            content = self._entries.get(path)
+            if content is None or \
+                    (content.mtime, content.size) != (stat.st_mtime_ns,
+                                                      stat.st_size):
+                return None
+
+            self._entries.move_to_end(path)  # type: ignore
+            self._hits += 1
+            return content
+
+    def get(self, file: PathOrLintable) -> Content:
+        """Get the content of given file ``file``.
+
+        :param file: A path or a Lintable object
+        :raises: OSError if failed to stat or read the file
+        """
+        path, text = _path_and_text(file)
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            content = self._entries.get(path)
+            if content is not None and (content.mtime, content.size) == key:
+                self._entries.move_to_end(path)  # type: ignore
+                self._hits += 1
+                return content
+
+        # The bytes are read from the file even if the text was loaded, which
+        # may differ from them in newlines and encoding.
+        with open(path, mode='rb') as fio:
+            data = fio.read()
+
+        content = Content(path, key[0], key[1], data, text)
+
+        with self._lock:
+            self._misses += 1
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self._nbytes -= len(old.data)
+
+            if len(data) <= self.max_bytes:
+                self._entries[path] = content
+                self._nbytes += len(data)
+                self._evict()
+
+        return content
+
+
+CACHE: ContentCache = ContentCache()
+
+
+def load(file: PathOrLintable) -> Content:
+    """Get the content of given file ``file`` from the shared cache.
+
+    :param file: A path or a Lintable object
+    :raises: OSError if failed to stat or read the file
+    """
+    return CACHE.get(file)
+
+# vim:sw=4:ts=4:et:
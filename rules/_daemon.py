@@ -0,0 +1,591 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+"""Lint daemon keeps the rules warm and re-lints the files changed.
+
+The daemon loads the options and the rules once, lints all of the files found
+by ansible-lint first, and then watches the tree with inotify (or polls the
+mtimes of the files if inotify is not available) and re-lints only the files
+touched and the files of the same roles. The results are served over a Unix
+socket to the client.
+
+If the configuration file was changed, the daemon reloads it and re-lints the
+files only with the rules their configuration were changed.
+
+Usage::
+
+    # Start the daemon in the top dir of the tree.
+    python -m rules._daemon serve [--socket PATH] [ANSIBLE_LINT_OPTIONS ...]
+
+    # Get the results of all of the files or the files given.
+    python -m rules._daemon lint [--socket PATH] [PATH ...]
+
+    # Stop the daemon.
+    python -m rules._daemon stop [--socket PATH]
+
+.. note::
+
+   The syntax check of the playbooks by ansible-playbook is not done by the
+   daemon because it's too slow to run for each change.
+
+.. seealso:: rules._runner
+"""
+import argparse
+import ctypes
+import json
+import os
+import select
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+import typing
+import warnings
+
+import ansiblelint.rules
+import ansiblelint.utils
+from ansiblelint.file_utils import Lintable
+
+if __package__:
+    from . import _config, _dispatch, _git, _runner
+else:  # Run as a script.
+    from _ansiblelint_custom_rules_ex import (  # type: ignore
+        _config, _dispatch, _git, _runner
+    )
+
+
+DEFAULT_SOCKET: str = '.ansible-lint-daemon.sock'
+DEFAULT_CONFIG_FILE: str = '.ansible-lint'
+
+# The dirs never watched.
+EXCLUDED_DIRS: typing.FrozenSet[str] = frozenset(
+    '.git .tox .cache __pycache__'.split()
+)
+
+# .. seealso:: inotify(7)
+IN_MODIFY: int = 0x00000002
+IN_CLOSE_WRITE: int = 0x00000008
+IN_MOVED_FROM: int = 0x00000040
+IN_MOVED_TO: int = 0x00000080
+IN_CREATE: int = 0x00000100
+IN_DELETE: int = 0x00000200
+IN_Q_OVERFLOW: int = 0x00004000
+IN_IGNORED: int = 0x00008000
+IN_ISDIR: int = 0x40000000
+
+IN_MASK: int = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+                IN_CREATE | IN_DELETE)
+IN_EVENT: struct.Struct = struct.Struct('iIII')
+
+# The key of the digest of the options common to all of the rules.
+_COMMON: str = ''
+
+ChangesT = typing.Optional[typing.Set[str]]  # None means all may be changed.
+
+
+def each_dirs(topdir: str) -> typing.Iterator[str]:
+    """Yield the dirs to watch under ``topdir``."""
+    for root, dirs, _files in os.walk(topdir):
+        dirs[:] = sorted(d for d in dirs if d not in EXCLUDED_DIRS)
+        yield root
+
+
+class InotifyWatcher:
+    """Watcher of the files in the tree with inotify.
+    """
+    def __init__(self, topdir: str = os.curdir):
+        """Initialize.
+
+        :raises: OSError if inotify is not available
+        """
+        self.topdir = topdir
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        try:
+            init = self._libc.inotify_init1
+        except AttributeError as exc:
+            raise OSError('inotify is not available') from exc
+
+        self.fd = init(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+        self._wds: typing.Dict[int, str] = {}
+        self.add_tree(topdir)
+
+    def add_tree(self, topdir: str) -> None:
+        """Watch the dirs under ``topdir``."""
+        for path in each_dirs(topdir):
+            wdesc = self._libc.inotify_add_watch(
+                self.fd, os.fsencode(path), IN_MASK
+            )
+            if wdesc >= 0:
+                self._wds[wdesc] = path
+
+    def wait(self, timeout: float) -> bool:
+        """Wait for some events for ``timeout`` seconds."""
+        return bool(select.select([self.fd], [], [], timeout)[0])
+
+    def read(self) -> ChangesT:
+        """
+        Read the events and return the paths relative to the top dir of the
+        files and the dirs changed.
+        """
+        changes: typing.Set[str] = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changes
+
+            offset = 0
+            while offset < len(data):
+                wdesc, mask, _cookie, size = IN_EVENT.unpack_from(data, offset)
+                start = offset + IN_EVENT.size
+                name = os.fsdecode(data[start:start + size].rstrip(b'\0'))
+                offset = start + size
+
+                if mask & IN_Q_OVERFLOW:
+                    return None
+                if mask & IN_IGNORED:
+                    self._wds.pop(wdesc, None)
+                    continue
+
+                parent = self._wds.get(wdesc)
+                if parent is None or not name:
+                    continue
+
+                path = os.path.join(parent, name)
+                if mask & IN_ISDIR:
+                    if name in EXCLUDED_DIRS:
+                        continue
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        self.add_tree(path)
+
+                changes.add(os.path.relpath(path, self.topdir))
+
+    def close(self) -> None:
+        """Stop watching."""
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Watcher of the files in the tree polls their mtimes.
+    """
+    def __init__(self, topdir: str = os.curdir, interval: float = 1.0):
+        """Initialize."""
+        self.topdir = topdir
+        self.interval = interval
+        self._mtimes = self._scan()
+
+    def _scan(self) -> typing.Dict[str, int]:
+        """Get the mtimes of the files."""
+        res = {}
+        for root in each_dirs(self.topdir):
+            for entry in os.scandir(root):
+                if entry.is_file():
+                    path = os.path.relpath(entry.path, self.topdir)
+                    res[path] = entry.stat().st_mtime_ns
+
+        return res
+
+    def wait(self, timeout: float) -> bool:
+        """Wait for ``timeout`` seconds at most."""
+        time.sleep(min(timeout, self.interval))
+        return True
+
+    def read(self) -> ChangesT:
+        """Return the paths of the files changed."""
+        mtimes = self._scan()
+        changes = set(
+            path for path in set(mtimes) | set(self._mtimes)
+            if mtimes.get(path) != self._mtimes.get(path)
+        )
+        self._mtimes = mtimes
+        return changes
+
+    def close(self) -> None:
+        """Stop watching."""
+
+
+def make_watcher(topdir: str = os.curdir
+                 ) -> typing.Union[InotifyWatcher, PollingWatcher]:
+    """Make a watcher with inotify if available."""
+    try:
+        return InotifyWatcher(topdir)
+    except OSError as exc:
+        warnings.warn(f'Poll the files instead: {exc!s}')
+        return PollingWatcher(topdir)
+
+
+def sort_key(result: _runner.Result) -> typing.Tuple[typing.Any, ...]:
+    """
+    Get the key to sort the results in the same order as the errors.
+
+    .. seealso:: ansiblelint.errors.MatchError._hash_key
+    """
+    return (result.filename, result.linenumber, result.rule_id,
+            result.message, str(result.details),
+            -1 if result.column is None else result.column)
+
+
+class Daemon:
+    """Lint daemon keeps the results of the files and updates them.
+    """
+    def __init__(self, argv: typing.List[str]):
+        """Initialize.
+
+        :param argv: The arguments of ansible-lint
+        """
+        self.argv = argv
+        self.options, _app = _runner.load_options(argv)
+        self.rules = _dispatch.Dispatcher(
+            ansiblelint.rules.RulesCollection(self.options.rulesdirs)
+        )
+        self.lintables: typing.Dict[str, Lintable] = {}
+
+        # The errors found in the files by the rules.
+        self.results: typing.Dict[
+            str, typing.Dict[str, typing.List[_runner.Result]]
+        ] = {}
+        self.digests = self.config_digests()
+        self.lock = threading.RLock()
+        self.nlints = 0
+
+    @property
+    def config_file(self) -> str:
+        """The path of the configuration file."""
+        path = getattr(self.options, 'config_file', None)
+        return os.path.relpath(os.path.abspath(path or DEFAULT_CONFIG_FILE))
+
+    def config_digests(self) -> typing.Dict[str, str]:
+        """Get the digests of the configuration of the rules."""
+        opts = self.options
+        res = {
+            str(rule.id): _config.digest(opts.rules.get(rule.id) or {})
+            for rule in self.rules
+        }
+        res[_COMMON] = _config.digest(
+            dict(tags=sorted(opts.tags), skip_list=sorted(opts.skip_list),
+                 exclude_paths=sorted(opts.exclude_paths))
+        )
+        return res
+
+    def lint(self, path: str,
+             ids: typing.Optional[typing.Collection[str]] = None) -> None:
+        """Lint the file ``path`` with the rules or the rules of ``ids``.
+        """
+        lintable = self.lintables[path]
+        errors = self.rules.run_by_rules(
+            lintable, tags=set(self.options.tags),
+            skip_list=self.options.skip_list, ids=ids
+        )
+        results = self.results.setdefault(path, {})
+        if ids is None:
+            results.clear()
+
+        results.update(
+            (rid, [_runner.dump_match(m) for m in matches])
+            for rid, matches in errors.items()
+        )
+        self.nlints += 1
+
+    def add(self, lintable: Lintable) -> None:
+        """Add the Lintable object and its children."""
+        pending = [lintable]
+        while pending:
+            lnt = pending.pop()
+            path = str(lnt.name)
+            if path in self.lintables or not lnt.kind or \
+                    _runner.is_excluded(path, self.options.exclude_paths):
+                continue
+
+            self.lintables[path] = lnt
+            try:
+                pending.extend(ansiblelint.utils.find_children(lnt))
+            except Exception:  # pylint: disable=broad-except
+                pass  # They will be reported on lint.
+
+    def scan(self) -> None:
+        """Find the files and lint all of them."""
+        with self.lock:
+            lintables = ansiblelint.utils.get_lintables(
+                options=self.options, args=self.options.lintables
+            )
+            runner = _runner.make_runner(self.rules.rules, self.options,
+                                         lintables)
+            ansiblelint.utils.parse_yaml_linenumbers.cache_clear()
+            self.lintables.clear()
+            self.results.clear()
+            for lintable in sorted(runner.lintables, key=str):
+                self.add(lintable)
+
+            for path in list(self.lintables):
+                self.lint(path)
+
+    def reload(self) -> typing.Set[str]:
+        """
+        Reload the configuration and re-lint the files with the rules of
+        which configuration was changed.
+
+        :return: The IDs of the rules of which configuration was changed
+        """
+        with self.lock:
+            self.options, _app = _runner.load_options(self.argv)
+            ansiblelint.rules.AnsibleLintRule.get_config.cache_clear()
+
+            digests = self.config_digests()
+            changed = set(
+                rid for rid, dig in digests.items()
+                if self.digests.get(rid) != dig
+            )
+            self.digests = digests
+
+            if _COMMON in changed:
+                self.scan()
+            elif changed:
+                for path in list(self.lintables):
+                    self.lint(path, ids=changed)
+
+            return changed
+
+    def update(self, changes: ChangesT) -> typing.Set[str]:
+        """Update the results of the files changed and their dependents.
+
+        :param changes: The paths of the files and the dirs changed
+        :return: The paths of the files linted again
+        """
+        with self.lock:
+            if changes is None:
+                self.scan()
+                return set(self.lintables)
+
+            if self.config_file in changes:
+                self.reload()
+                changes = changes - {self.config_file}
+
+            # The caches of the files parsed and the configuration of the
+            # rules may give the files changed must be invalidated. The cache
+            # of the files parsed is cleared entirely because it's a
+            # functools.lru_cache cannot evict some entries, and the Lintable
+            # objects made again of the files changed are equal to the old
+            # ones keyed, so that the old results would be given. The files
+            # not changed are not parsed again unless they are linted again.
+            ansiblelint.utils.parse_yaml_linenumbers.cache_clear()
+            _config.invalidate()
+
+            paths = set()
+            for change in changes:
+                paths.add(change)
+                if os.path.isdir(change):  # The files may be moved in.
+                    try:
+                        paths.update(
+                            os.path.relpath(os.path.join(root, f))
+                            for root in each_dirs(change)
+                            for f in os.listdir(root)
+                        )
+                    except OSError as exc:  # It was removed since.
+                        warnings.warn(f'Failed to list {change}: {exc!r}')
+                prefix = change + os.sep
+                paths.update(p for p in self.lintables
+                             if p.startswith(prefix))
+
+            # The files in the roles of the files changed.
+            roles = set(
+                role for role in (_git.find_role_dir(p) for p in paths)
+                if role
+            )
+            paths.update(
+                p for p in self.lintables
+                if any(p.startswith(r + os.sep) for r in roles)
+            )
+
+            for path in sorted(paths):
+                old = self.lintables.pop(path, None)
+                self.results.pop(path, None)
+                if not os.path.exists(path) or \
+                        (old is None and os.path.isdir(path)):
+                    continue
+
+                # Make it again not to use the content loaded before.
+                try:
+                    self.add(Lintable(path, kind=old.kind) if old
+                             else Lintable(path))
+                except Exception as exc:  # pylint: disable=broad-except
+                    warnings.warn(f'Failed to load {path}: {exc!r}')
+
+            # The files changed and the children of them new found.
+            linted = set(self.lintables) - set(self.results)
+            for path in sorted(linted):
+                try:
+                    self.lint(path)
+                except Exception as exc:  # pylint: disable=broad-except
+                    warnings.warn(f'Failed to lint {path}: {exc!r}')
+
+            return linted
+
+    def matches(self, paths: typing.Optional[typing.Iterable[str]] = None
+                ) -> typing.List[_runner.Result]:
+        """Get the errors found in the files or the files ``paths``."""
+        with self.lock:
+            if paths is None:
+                targets = list(self.results)
+            else:
+                targets = [os.path.normpath(p) for p in paths]
+
+            return sorted(
+                set(r for path in targets
+                    for results in self.results.get(path, {}).values()
+                    for r in results),
+                key=sort_key
+            )
+
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        """Get the statistics."""
+        with self.lock:
+            return dict(files=len(self.lintables), lints=self.nlints,
+                        dispatch=self.rules.stats()._asdict())
+
+
+class Handler(socketserver.StreamRequestHandler):
+    """Handler of the requests to the daemon.
+
+    A request and its response are a JSON object in a line.
+    """
+    def handle(self) -> None:
+        """Handle a request."""
+        server = typing.cast('Server', self.server)
+        try:
+            req = json.loads(self.rfile.readline())
+            res = server.handle_command(req)
+        except (ValueError, KeyError, TypeError) as exc:
+            res = dict(error=f'Invalid request: {exc!r}')
+        except Exception as exc:  # pylint: disable=broad-except
+            res = dict(error=f'Failed to process the request: {exc!r}')
+
+        self.wfile.write(json.dumps(res, default=str).encode('utf-8') + b'\n')
+
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Server serves the results of the daemon over a Unix socket.
+    """
+    daemon_threads = True
+
+    def __init__(self, path: str, daemon: Daemon,
+                 watcher: typing.Union[InotifyWatcher, PollingWatcher]):
+        """Initialize."""
+        if os.path.exists(path):
+            os.unlink(path)  # A stale one.
+
+        super().__init__(path, Handler)
+        self.daemon = daemon
+        self.watcher = watcher
+        self._watcher_lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def sync(self) -> None:
+        """Update the results with the changes not processed yet."""
+        with self._watcher_lock:
+            changes = self.watcher.read()
+
+        if changes is None or changes:
+            self.daemon.update(changes)
+
+    def watch(self, timeout: float = 0.5) -> None:
+        """Process the changes until stopped even if failed to process some.
+        """
+        while not self._stopped.is_set():
+            try:
+                if self.watcher.wait(timeout):
+                    self.sync()
+            except Exception as exc:  # pylint: disable=broad-except
+                warnings.warn(f'Failed to process the changes: {exc!r}')
+
+    def handle_command(self, req: typing.Dict[str, typing.Any]
+                       ) -> typing.Dict[str, typing.Any]:
+        """Handle the command in the request ``req``."""
+        cmd = req['command']
+        if cmd == 'lint':
+            self.sync()
+            results = self.daemon.matches(req.get('paths') or None)
+            return dict(matches=[r._asdict() for r in results])
+
+        if cmd == 'stats':
+            return self.daemon.stats()
+
+        if cmd == 'stop':
+            self._stopped.set()
+            threading.Thread(target=self.shutdown).start()
+            return dict(stopped=True)
+
+        raise ValueError(f'Unknown command: {cmd}')
+
+    def serve(self) -> None:
+        """Start the daemon and serve until stopped."""
+        thread = threading.Thread(target=self.watch, daemon=True)
+        thread.start()
+        try:
+            self.serve_forever()
+        finally:
+            self._stopped.set()
+            thread.join()
+            self.watcher.close()
+            self.server_close()
+            if os.path.exists(self.server_address):  # type: ignore
+                os.unlink(self.server_address)  # type: ignore
+
+
+def request(path: str, command: str, **kwargs: typing.Any
+            ) -> typing.Dict[str, typing.Any]:
+    """Send a request to the daemon and return the response.
+
+    :raises: OSError if failed to connect
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        sock.sendall(json.dumps(dict(command=command, **kwargs)).encode()
+                     + b'\n')
+        with sock.makefile('rb') as fobj:
+            return json.loads(fobj.readline())
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> int:
+    """Entry point."""
+    psr = argparse.ArgumentParser()
+    psr.add_argument('command', choices=('serve', 'lint', 'stats', 'stop'))
+    psr.add_argument('--socket', default=DEFAULT_SOCKET,
+                     help='The path of the socket [%(default)s]')
+    args, rest = psr.parse_known_args(sys.argv[1:] if argv is None else argv)
+
+    if args.command == 'serve':
+        daemon = Daemon(rest)
+        daemon.scan()
+        Server(args.socket, daemon, make_watcher()).serve()
+        return 0
+
+    try:
+        res = request(args.socket, args.command, paths=rest)
+    except OSError as exc:
+        print(f'Failed to connect to the daemon: {exc!s}', file=sys.stderr)
+        return 1
+
+    if 'error' in res:
+        print(res['error'], file=sys.stderr)
+        return 1
+
+    if args.command != 'lint':
+        print(json.dumps(res, indent=2))
+        return 0
+
+    for item in res['matches']:
+        print(f'{item["filename"]}:{item["linenumber"]}: '
+              f'[{item["rule_id"]}] {item["message"]}')
+
+    return 2 if res['matches'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,200 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+"""Dispatcher to call only the rules subscribe the kinds of files.
+
+ansiblelint.rules.RulesCollection.run calls all of the rules for every file
+and each rule tests the kind of the file by itself. The dispatcher wraps a
+RulesCollection object, builds an index of the kinds of files and the rules
+subscribe them from the ``kinds`` attribute of the rules once, and calls only
+the rules subscribe the kind of each file. The rules do not test ``kinds``
+again in rules._base.CustomRule.getmatches.
+
+.. code-block:: python
+
+    collection = ansiblelint.rules.RulesCollection([rules_dir])
+    rules = Dispatcher(collection)
+    runner = ansiblelint.runner.Runner(*lintables, rules=rules)
+    matches = runner.run()
+    print(rules.stats())
+"""
+import collections
+import threading
+import typing
+
+import ansiblelint.errors
+from ansiblelint._internal.rules import LoadingFailureRule
+
+from . import _metrics
+
+if typing.TYPE_CHECKING:
+    from ansiblelint.file_utils import Lintable
+    from ansiblelint.rules import BaseRule, RulesCollection
+
+
+MatchesT = typing.List[ansiblelint.errors.MatchError]
+
+
+class Stats(typing.NamedTuple):
+    """A namedtuple object to keep the statistics of the dispatcher.
+    """
+    calls: int  # The number of calls of the rules.
+    avoided: int  # The number of calls of the rules avoided.
+    avoided_by_rules: typing.Dict[str, int]
+
+
+def get_kinds(rule: 'BaseRule') -> typing.Optional[typing.FrozenSet[str]]:
+    """
+    Get the kinds of files ``rule`` tests or None if it tests any kinds.
+    """
+    kinds = getattr(rule, 'kinds', None)
+    return None if kinds is None else frozenset(kinds)
+
+
+class Dispatcher:
+    """A wrapper of a RulesCollection object to dispatch files to the rules.
+    """
+    def __init__(self, rules: 'RulesCollection'):
+        """Initialize.
+
+        :param rules: A RulesCollection object
+        """
+        self.rules = rules
+        self._index: typing.Dict[typing.Any, typing.List['BaseRule']] = {}
+        self._any_kinds: typing.List['BaseRule'] = []
+        self._indexed: typing.Optional[typing.List['BaseRule']] = None
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._avoided: typing.Dict[str, int] = collections.Counter()
+
+    def __iter__(self) -> typing.Iterator['BaseRule']:
+        """Return the iterator over the rules."""
+        return iter(self.rules)
+
+    def __len__(self) -> int:
+        """Return the number of the rules."""
+        return len(self.rules)
+
+    def __getattr__(self, name: str) -> typing.Any:
+        """Delegate other attributes to the RulesCollection object."""
+        return getattr(self.rules, name)
+
+    def _build_index(self) -> None:
+        """Build the index of the kinds and the rules subscribe them."""
+        rules = list(self.rules)
+        if self._indexed == rules:
+            return
+
+        kinds_of_rules = [get_kinds(rule) for rule in rules]
+        all_kinds = set().union(*(k for k in kinds_of_rules if k is not None))
+
+        # Keep the order of the rules in the collection.
+        self._index = {
+            kind: [rule for rule, kinds in zip(rules, kinds_of_rules)
+                   if kinds is None or kind in kinds]
+            for kind in all_kinds
+        }
+        self._any_kinds = [
+            rule for rule, kinds in zip(rules, kinds_of_rules) if kinds is None
+        ]
+        self._indexed = rules
+
+    def rules_for(self, kind: typing.Any) -> typing.List['BaseRule']:
+        """Get the rules subscribe the kind ``kind`` of files."""
+        with self._lock:
+            self._build_index()
+            return self._index.get(kind, self._any_kinds)
+
+    def stats(self) -> Stats:
+        """Get the statistics of the dispatcher."""
+        with self._lock:
+            avoided = dict(self._avoided)
+
+        return Stats(self._calls, sum(avoided.values()), avoided)
+
+    def _count(self, rules: typing.List['BaseRule'],
+               ids: typing.Optional[typing.Collection[str]] = None) -> None:
+        """
+        Count the calls of the rules and the ones avoided because they do not
+        subscribe the kind, not the ones excluded by ``ids``.
+        """
+        subscribed = set(id(rule) for rule in rules)
+        with self._lock:
+            self._calls += len(rules)
+            for rule in self._indexed or []:
+                if id(rule) not in subscribed and \
+                        (ids is None or rule.id in ids):
+                    self._avoided[rule.id] += 1
+                    if _metrics.ENABLED:
+                        _metrics.count(rule, 'skipped_kind')
+
+    def run_by_rules(self, file: 'Lintable',
+                     tags: typing.Optional[typing.Set[str]] = None,
+                     skip_list: typing.Optional[typing.List[str]] = None,
+                     ids: typing.Optional[typing.Collection[str]] = None
+                     ) -> typing.Dict[str, MatchesT]:
+        """
+        Run the rules subscribe the kind of the file ``file`` and return
+        the errors found by each rule.
+
+        :param ids: Run only the rules of these IDs if given
+        :return: A mapping object of the IDs of the rules and the errors
+
+        .. seealso:: ansiblelint.rules.RulesCollection.run
+        """
+        if tags is None:
+            tags = set()
+        if skip_list is None:
+            skip_list = []
+
+        if not file.path.is_dir():
+            try:
+                if file.content is not None:  # Load the content.
+                    pass
+            except IOError as exc:
+                failure = LoadingFailureRule()
+                return {
+                    failure.id: [
+                        ansiblelint.errors.MatchError(
+                            message=str(exc), filename=file, rule=failure,
+                            tag=exc.__class__.__name__.lower()
+                        )
+                    ]
+                }
+
+        rules = self.rules_for(file.kind)
+        if ids is not None:
+            rules = [rule for rule in rules if rule.id in ids]
+        self._count(rules, ids)
+
+        res = {}
+        for rule in rules:
+            rule_definition = set(rule.tags)
+            rule_definition.add(rule.id)
+            if tags and not rule.has_dynamic_tags and \
+                    rule_definition.isdisjoint(tags):
+                continue
+
+            if rule_definition.isdisjoint(skip_list):
+                # .. seealso:: ansiblelint.rules.RulesCollection.run
+                res[rule.id] = [m for m in rule.getmatches(file)
+                                if m.tag not in skip_list]
+
+        return res
+
+    def run(self, file: 'Lintable',
+            tags: typing.Optional[typing.Set[str]] = None,
+            skip_list: typing.Optional[typing.List[str]] = None
+            ) -> MatchesT:
+        """
+        Run the rules subscribe the kind of the file ``file``.
+
+        .. seealso:: ansiblelint.rules.RulesCollection.run
+        """
+        return [
+            match for matches in self.run_by_rules(file, tags,
+                                                   skip_list).values()
+            for match in matches
+        ]
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,182 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+"""Helpers to find the files changed with git.
+
+The files changed since the merge base of a base ref, e.g. origin/main, and
+the files not tracked yet are found from the local git repository. git tells
+the IDs of the blobs of the files in the index also, and they are used as the
+hashes of the content of the files without reading them if the files in the
+working tree are same as the ones in the index.
+
+.. seealso:: rules._runner
+.. seealso:: rules._result_cache
+"""
+import os
+import pathlib
+import subprocess
+import threading
+import typing
+
+if typing.TYPE_CHECKING:
+    from ansiblelint.file_utils import Lintable
+
+
+PathOrLintable = typing.Union[str, pathlib.Path, 'Lintable']
+
+# The blob ID git uses for the files changed in the working tree.
+NULL_ID: str = '0' * 40
+
+# The IDs of the blobs of the files keyed by their absolute paths.
+BLOB_IDS: typing.Dict[str, str] = {}
+
+_LOCK = threading.Lock()
+
+
+class Change(typing.NamedTuple):
+    """A namedtuple object represents a file changed.
+    """
+    path: str
+    status: str  # A (added), D (deleted), M (modified), ?? (untracked), ...
+    blob_id: typing.Optional[str] = None  # The ID of the blob in the index.
+
+
+def git(*args: str, cwd: typing.Optional[str] = None) -> str:
+    """Run git and return its output.
+
+    :raises: OSError, subprocess.CalledProcessError
+    """
+    return subprocess.run(
+        ['git', *args], cwd=cwd, check=True, stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE, universal_newlines=True
+    ).stdout
+
+
+def split_z(output: str) -> typing.List[str]:
+    """Split the output of git separated with NUL characters."""
+    return [item for item in output.split('\0') if item]
+
+
+def parse_diff_index(output: str) -> typing.List[Change]:
+    """
+    Parse the output of ``git diff-index -z``.
+
+    >>> parse_diff_index(
+    ...     ':100644 100644 ' + 'a' * 40 + ' ' + 'b' * 40 + ' M\\0x.yml\\0'
+    ...     ':000000 100644 ' + '0' * 40 + ' ' + '0' * 40 + ' A\\0y.yml\\0'
+    ... ) == [Change('x.yml', 'M', 'b' * 40), Change('y.yml', 'A', None)]
+    True
+    """
+    items = split_z(output)
+    changes = []
+    for meta, path in zip(items[::2], items[1::2]):
+        dst_id, status = meta.split()[3:5]
+        changes.append(
+            Change(path, status[0], None if dst_id == NULL_ID else dst_id)
+        )
+
+    return changes
+
+
+def changed_files(base: str = 'HEAD', cwd: typing.Optional[str] = None
+                  ) -> typing.List[Change]:
+    """
+    Find the files changed since the merge base of ``base`` and HEAD in the
+    index and the working tree, and the files not tracked yet, under the dir
+    ``cwd``. The paths are relative to ``cwd``.
+
+    :raises: OSError, subprocess.CalledProcessError
+    """
+    merge_base = git('merge-base', base, 'HEAD', cwd=cwd).strip()
+    changes = parse_diff_index(
+        git('diff-index', '-z', '--relative', '--no-renames', merge_base,
+            cwd=cwd)
+    )
+    changes.extend(
+        Change(path, '??') for path in split_z(
+            git('ls-files', '-z', '--others', '--exclude-standard', cwd=cwd)
+        )
+    )
+    return changes
+
+
+def list_files(paths: typing.Iterable[str],
+               cwd: typing.Optional[str] = None) -> typing.List[str]:
+    """
+    List the files tracked and not tracked but not ignored under the paths.
+
+    :raises: OSError, subprocess.CalledProcessError
+    """
+    paths = list(paths)
+    if not paths:
+        return []
+
+    return split_z(git('ls-files', '-z', '--cached', '--others',
+                       '--exclude-standard', '--', *paths, cwd=cwd))
+
+
+def blob_ids(paths: typing.Iterable[str],
+             cwd: typing.Optional[str] = None) -> typing.Dict[str, str]:
+    """
+    Get the IDs of the blobs of the files in the index same as the ones in
+    the working tree.
+
+    :param paths: The paths of the files or dirs to get the IDs of the files
+    :raises: OSError, subprocess.CalledProcessError
+    """
+    paths = list(paths)
+    if not paths:
+        return {}
+
+    dirty = set(split_z(git('diff-files', '-z', '--name-only', '--relative',
+                            '--', *paths, cwd=cwd)))
+    res = {}
+    for line in split_z(git('ls-files', '-z', '-s', '--', *paths, cwd=cwd)):
+        meta, path = line.split('\t', 1)
+        _mode, blob_id, stage = meta.split()
+        if stage == '0' and path not in dirty:
+            res[path] = blob_id
+
+    return res
+
+
+def find_role_dir(path: str) -> typing.Optional[str]:
+    """
+    Find the dir of the role the file ``path`` belongs to.
+
+    >>> find_role_dir('roles/a/tasks/main.yml')
+    'roles/a'
+    >>> find_role_dir('x/roles/a/roles/b/tasks/main.yml')
+    'x/roles/a/roles/b'
+    >>> find_role_dir('roles/a') is None
+    True
+    """
+    parts = pathlib.PurePath(path).parts
+    for idx in range(len(parts) - 3, -1, -1):
+        if parts[idx] == 'roles':
+            return str(pathlib.PurePath(*parts[:idx + 2]))
+
+    return None
+
+
+def register_blob_ids(ids: typing.Dict[str, str],
+                      cwd: typing.Optional[str] = None) -> None:
+    """Register the IDs of the blobs of the files.
+
+    :param ids: A mapping object of the paths and the IDs of the blobs
+    :param cwd: The dir the paths are relative to
+    """
+    topdir = cwd or os.curdir
+    with _LOCK:
+        BLOB_IDS.update(
+            (os.path.abspath(os.path.join(topdir, path)), blob_id)
+            for path, blob_id in ids.items()
+        )
+
+
+def get_blob_id(file: PathOrLintable) -> typing.Optional[str]:
+    """Get the ID of the blob of the file registered if available."""
+    path = getattr(file, 'path', file)
+    return BLOB_IDS.get(os.path.abspath(str(path)))
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,141 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+"""Bounded and config-aware memoization of the methods of rules.
+
+functools.lru_cache applied to methods keeps ``self`` in its keys and never
+notices the changes of the rule's configuration. The memos of this module are
+kept in each rule instance instead, limited by the size configurable for each
+rule, and renewed automatically if the snapshot of the rule's configuration
+was rebuilt.
+
+- Configuration
+
+  .. code-block:: yaml
+
+    rules:
+      task_has_valid_name:
+        cache_size: 100000
+"""
+import functools
+import typing
+import weakref
+
+from . import _config
+
+
+C_CACHE_SIZE: str = 'cache_size'
+DEFAULT_CACHE_SIZE: int = 10000
+
+# The attribute name of rule instances to keep memos.
+MEMOS_ATTR: str = '_memos'
+
+_NO_MEMOS: typing.Dict[str, typing.Any] = {}
+
+
+class Stats(typing.NamedTuple):
+    """A namedtuple object to keep the statistics of a memo.
+    """
+    hits: int
+    misses: int
+    size: int
+    maxsize: int
+
+
+class Memo:
+    """An LRU memo of the results of a function bounded by the number of items.
+
+    The results are kept by functools.lru_cache to look them up with few
+    costs, and the memo is made again instead of checking the configuration
+    on each call.
+    """
+    def __init__(self, fun: typing.Callable[..., typing.Any],
+                 maxsize: int = DEFAULT_CACHE_SIZE, version: int = 0):
+        """Initialize.
+
+        :param fun: The function to memoize the results of
+        :param maxsize: The max number of items to keep
+        :param version: The version of the configuration this memo depends on
+        """
+        self.maxsize = max(maxsize, 0)
+        self.version = version
+        self.call = functools.lru_cache(maxsize=self.maxsize)(fun)
+
+    def stats(self) -> Stats:
+        """Get the statistics of this memo."""
+        info = self.call.cache_info()
+        return Stats(info.hits, info.misses, info.currsize, self.maxsize)
+
+    def clear(self) -> None:
+        """Clear this memo."""
+        self.call.cache_clear()
+
+
+def get_cache_size(rule: typing.Any, config: typing.Dict[str, typing.Any]
+                   ) -> int:
+    """Get the size of memos for ``rule`` from its configuration.
+    """
+    default = getattr(rule, C_CACHE_SIZE, DEFAULT_CACHE_SIZE)
+    try:
+        return int(config.get(C_CACHE_SIZE, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def get_memo(rule: typing.Any, name: str,
+             fun: typing.Callable[..., typing.Any]) -> Memo:
+    """Get the memo ``name`` of ``rule``, renewed if the config changed.
+
+    :param fun: The method of ``rule`` to memoize the results of
+    """
+    snapshot = _config.get_snapshot(rule)
+    memos = rule.__dict__.get(MEMOS_ATTR)
+    if memos is None:
+        memos = rule.__dict__[MEMOS_ATTR] = {}
+
+    memo = memos.get(name)
+    if memo is None or memo.version != snapshot.version:
+        memo = memos[name] = Memo(
+            functools.partial(fun, weakref.proxy(rule)),
+            get_cache_size(rule, snapshot.config), snapshot.version
+        )
+    return memo
+
+
+def memoize(fun: typing.Callable[..., typing.Any]
+            ) -> typing.Callable[..., typing.Any]:
+    """Decorator to memoize the results of a method of rules.
+
+    The arguments of the method except for ``self`` must be hashable. The
+    memo is checked only with the version of the snapshot of the
+    configuration the rule holds, which is got again on each access of the
+    options and for each file to lint. .. seealso:: rules._config
+    """
+    name = fun.__name__
+
+    @functools.wraps(fun)
+    def wrapper(self, *args):
+        attrs = self.__dict__
+        memo = attrs.get(MEMOS_ATTR, _NO_MEMOS).get(name)
+        if memo is None or \
+                memo.version != attrs[_config.SNAPSHOT_ATTR].version:
+            memo = get_memo(self, name, fun)
+
+        return memo.call(*args)
+
+    return wrapper
+
+
+def stats(rule: typing.Any) -> typing.Dict[str, Stats]:
+    """Get the statistics of the memos of ``rule``.
+    """
+    memos = rule.__dict__.get(MEMOS_ATTR, {})
+    return {name: memo.stats() for name, memo in memos.items()}
+
+
+def clear(rule: typing.Any) -> None:
+    """Clear all of the memos of ``rule``.
+    """
+    rule.__dict__.pop(MEMOS_ATTR, None)
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,306 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+"""Memory usage accounting of the rules with tracemalloc.
+
+If enabled, the memory allocated while each rule lints each file, that is,
+in ``getmatches`` calls the hooks of the rule, is traced and the peak and the
+retained size of them are accounted for each rule and each kind of files.
+The allocation sites in the code of the rules retain the most memory, like
+the caches of the rules, are found by comparing the snapshots taken at the
+start and the end.
+
+The top offenders are reported to stderr at exit, and all of the results are
+dumped as JSON if the path of the file is given instead of ``-``.
+
+::
+
+    _ANSIBLE_LINT_RULE_MEMORY=/tmp/memory.json  # or '-'
+    _ANSIBLE_LINT_RULE_MEMORY_TOP=10
+    _ANSIBLE_LINT_RULE_MEMORY_NFRAMES=16
+
+.. note::
+
+   tracemalloc traces the memory of the whole process, and the peaks are
+   accurate only if the rules are run in one thread, and with python 3.9 or
+   later which has tracemalloc.reset_peak. Tracing memory makes lint slower
+   by several times.
+
+.. note::
+
+   The memory of the worker processes of rules._runner is not accounted,
+   and it warns about that. Run it with ``-j 1`` to account it.
+"""
+import atexit
+import functools
+import json
+import linecache
+import os
+import sys
+import threading
+import tracemalloc
+import typing
+
+from . import _config
+
+
+E_PATH_VAR: str = '_ANSIBLE_LINT_RULE_MEMORY'
+E_TOP_VAR: str = '_ANSIBLE_LINT_RULE_MEMORY_TOP'
+E_NFRAMES_VAR: str = '_ANSIBLE_LINT_RULE_MEMORY_NFRAMES'
+
+DEFAULT_TOP: int = 10
+DEFAULT_NFRAMES: int = 16
+
+# The attribute name of rule instances to mark them accounted.
+ACCOUNTED_ATTR: str = '_memory_accounted'
+
+# The dir of the code of the rules to find the allocation sites in it.
+RULES_DIR: str = os.path.dirname(os.path.abspath(__file__))
+
+
+def is_enabled() -> bool:
+    """Is the memory accounting enabled?"""
+    return bool(os.environ.get(E_PATH_VAR))
+
+
+ENABLED: bool = is_enabled()
+
+
+def format_size(size: float) -> str:
+    """
+    Format the size in bytes.
+
+    >>> format_size(512), format_size(-2048), format_size(3 * 1024 ** 2)
+    ('512 B', '-2.0 KiB', '3.0 MiB')
+    """
+    for unit in ('B', 'KiB', 'MiB'):
+        if abs(size) < 1024 or unit == 'MiB':
+            break
+        size /= 1024
+
+    return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
+
+
+class Account:
+    """The memory allocated by a rule for files of a kind.
+    """
+    __slots__ = ('calls', 'peak_max', 'peak_total', 'retained')
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self.calls = 0
+        self.peak_max = 0
+        self.peak_total = 0
+        self.retained = 0
+
+    def add(self, peak: int, retained: int) -> None:
+        """Add the sizes allocated in a call."""
+        self.calls += 1
+        self.peak_max = max(self.peak_max, peak)
+        self.peak_total += peak
+        self.retained += retained
+
+    def merge(self, other: 'Account') -> None:
+        """Add the sizes of the account ``other``."""
+        self.calls += other.calls
+        self.peak_max = max(self.peak_max, other.peak_max)
+        self.peak_total += other.peak_total
+        self.retained += other.retained
+
+    def to_dict(self) -> typing.Dict[str, int]:
+        """Convert to a dict."""
+        return {key: getattr(self, key) for key in self.__slots__}
+
+
+class Accounts:
+    """The accounts of the memory of the rules for each kind of files.
+    """
+    def __init__(self, nframes: int = DEFAULT_NFRAMES):
+        """Initialize.
+
+        :param nframes: The number of frames tracemalloc keeps
+        """
+        self.nframes = nframes
+        self.accounts: typing.Dict[typing.Tuple[str, str], Account] = {}
+        self.baseline: typing.Optional[tracemalloc.Snapshot] = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start tracing and take the baseline snapshot if not yet."""
+        with self._lock:
+            if self.baseline is not None:
+                return
+
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.nframes)
+            self.baseline = tracemalloc.take_snapshot()
+
+    def record(self, rule_id: str, kind: str, peak: int, retained: int
+               ) -> None:
+        """Record the sizes allocated by the rule for a file of the kind."""
+        key = (rule_id, kind)
+        with self._lock:
+            account = self.accounts.get(key)
+            if account is None:
+                account = self.accounts[key] = Account()
+            account.add(peak, retained)
+
+    def wrap(self, rule_id: str, fun: typing.Callable[..., typing.Any]
+             ) -> typing.Callable[..., typing.Any]:
+        """Wrap ``getmatches`` of the rule ``rule_id`` to account it."""
+        reset_peak = getattr(tracemalloc, 'reset_peak', None)
+
+        @functools.wraps(fun)
+        def wrapper(file, *args, **kwargs):
+            local = self._local
+            if getattr(local, 'active', False) or not tracemalloc.is_tracing():
+                return fun(file, *args, **kwargs)
+
+            local.active = True
+            before = tracemalloc.get_traced_memory()[0]
+            if reset_peak is not None:
+                reset_peak()
+            try:
+                return fun(file, *args, **kwargs)
+            finally:
+                current, peak = tracemalloc.get_traced_memory()
+                local.active = False
+                self.record(rule_id, str(file.kind),
+                            max(peak - before, 0), current - before)
+
+        return wrapper
+
+    def by_rules(self) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+        """Summarize the accounts for each rule and kind."""
+        res: typing.Dict[str, typing.Dict[str, typing.Any]] = {}
+        with self._lock:
+            accounts = sorted(self.accounts.items(), key=lambda kv: kv[0])
+
+        for (rule_id, kind), account in accounts:
+            data = res.setdefault(rule_id, dict(total=Account(), kinds={}))
+            data['total'].merge(account)
+            data['kinds'][kind] = account.to_dict()
+
+        return {rid: dict(data['total'].to_dict(), kinds=data['kinds'])
+                for rid, data in res.items()}
+
+    def sites(self, top: int = DEFAULT_TOP
+              ) -> typing.List[typing.Dict[str, typing.Any]]:
+        """
+        Find the allocation sites in the code of the rules retain the most
+        memory since the baseline snapshot.
+        """
+        if self.baseline is None or not tracemalloc.is_tracing():
+            return []
+
+        snapshot = tracemalloc.take_snapshot()
+        sizes: typing.Dict[typing.Tuple[str, int], typing.List[int]] = {}
+        for diff in snapshot.compare_to(self.baseline, 'traceback'):
+            if diff.size_diff <= 0:
+                continue
+
+            frame = find_rules_frame(diff.traceback)
+            if frame is None:
+                continue
+
+            site = sizes.setdefault((frame.filename, frame.lineno), [0, 0])
+            site[0] += diff.size_diff
+            site[1] += diff.count_diff
+
+        return [
+            dict(site=f'{os.path.relpath(fname, RULES_DIR)}:{lineno}',
+                 line=linecache.getline(fname, lineno).strip(),
+                 size=size, count=count)
+            for (fname, lineno), (size, count)
+            in sorted(sizes.items(), key=lambda kv: -kv[1][0])[:top]
+        ]
+
+
+def find_rules_frame(traceback: tracemalloc.Traceback
+                     ) -> typing.Optional[tracemalloc.Frame]:
+    """Find the most recent frame in the code of the rules."""
+    for frame in reversed(list(traceback)):  # The most recent one last.
+        if os.path.dirname(os.path.abspath(frame.filename)) == RULES_DIR and \
+                frame.filename != __file__:
+            return frame
+
+    return None
+
+
+ACCOUNTS = Accounts(_config.get_env_int(E_NFRAMES_VAR, DEFAULT_NFRAMES, 1))
+
+_LOCK = threading.Lock()
+_RULE_IDS: typing.Set[str] = set()
+
+
+def instrument(rule: typing.Any) -> None:
+    """Account the memory allocated by the rule instance ``rule``."""
+    if ACCOUNTED_ATTR in rule.__dict__:
+        return
+
+    ACCOUNTS.start()
+    rule_id = str(rule.id)
+    rule.__dict__[ACCOUNTED_ATTR] = True
+    rule.getmatches = ACCOUNTS.wrap(rule_id, rule.getmatches)
+
+    with _LOCK:
+        _RULE_IDS.add(rule_id)
+
+
+def collect(top: int = DEFAULT_TOP) -> typing.Dict[str, typing.Any]:
+    """Collect the results of the memory accounting."""
+    rules = ACCOUNTS.by_rules()
+    current, peak = tracemalloc.get_traced_memory()
+    return dict(
+        rules=rules,
+        top_peak=sorted(rules, key=lambda r: -rules[r]['peak_max'])[:top],
+        top_retained=sorted(rules, key=lambda r: -rules[r]['retained'])[:top],
+        sites=ACCOUNTS.sites(top),
+        traced=dict(current=current, peak=peak)
+    )
+
+
+def to_text(report: typing.Dict[str, typing.Any]) -> str:
+    """Make the text report of the top offenders."""
+    rules = report['rules']
+    lines = ['Memory of the rules, peak (max / total) and retained:']
+    for rule_id in report['top_peak']:
+        for kind, data in sorted(rules[rule_id]['kinds'].items(),
+                                 key=lambda kv: -kv[1]['peak_max']):
+            lines.append(f'  {rule_id} [{kind}]: '
+                         f'{format_size(data["peak_max"])} / '
+                         f'{format_size(data["peak_total"])}, '
+                         f'{format_size(data["retained"])} '
+                         f'in {data["calls"]} calls')
+
+    if report['sites']:
+        lines.append('Allocation sites in the rules retain the most memory:')
+        lines.extend(f'  {site["site"]}: {format_size(site["size"])} in '
+                     f'{site["count"]} blocks: {site["line"]}'
+                     for site in report['sites'])
+
+    return '\n'.join(lines) + '\n'
+
+
+def dump(path: typing.Optional[str] = None) -> None:
+    """
+    Report the top offenders to stderr, and dump all of the results to the
+    file ``path`` or the one given by the environment variable.
+    """
+    if not _RULE_IDS:
+        return  # Nothing was accounted with this module.
+
+    report = collect(_config.get_env_int(E_TOP_VAR, DEFAULT_TOP, 1))
+    sys.stderr.write(to_text(report))
+
+    path = path or os.environ.get(E_PATH_VAR)
+    if path and path != '-':
+        with open(path, mode='w', encoding='utf-8') as fobj:
+            json.dump(report, fobj, indent=2)
+
+
+if ENABLED:
+    atexit.register(dump)
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,366 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+"""Instrumentation of the rules to find which of them are slow.
+
+If enabled, the hooks of the rules, ``match``, ``matchtask``, ``matchplay``
+and ``matchyaml``, and ``getmatches`` called for each file are timed, and the
+files skipped and the hit rates of the caches of the rules are counted. They
+are dumped at exit as JSON and/or a textfile of the Prometheus node exporter.
+
+It's enabled by setting the paths of the files to dump into these environment
+variables, and does nothing and costs almost nothing if disabled.
+
+::
+
+    _ANSIBLE_LINT_RULE_METRICS=/tmp/metrics.json
+    _ANSIBLE_LINT_RULE_METRICS_PROM=/var/lib/node_exporter/ansible_lint.prom
+
+.. note::
+
+   The metrics in the worker processes of rules._runner are not collected,
+   and it warns about that. Run it with ``-j 1`` to collect them.
+
+.. seealso:: benchmarks.bench_metrics
+"""
+import atexit
+import bisect
+import collections
+import functools
+import json
+import os
+import tempfile
+import threading
+import time
+import typing
+
+import ansiblelint.rules
+
+from . import _content, _memo
+
+
+E_JSON_VAR: str = '_ANSIBLE_LINT_RULE_METRICS'
+E_PROM_VAR: str = '_ANSIBLE_LINT_RULE_METRICS_PROM'
+
+# The hooks timed if the rules have their own.
+HOOKS: typing.Tuple[str, ...] = ('match', 'matchtask', 'matchplay',
+                                 'matchyaml')
+
+# The upper bounds of the buckets of the histograms in seconds, 1 [us] x 2^n.
+BUCKETS: typing.Tuple[float, ...] = tuple(1e-6 * 2 ** n for n in range(27))
+
+# The attribute name of rule instances to keep the metrics.
+METRICS_ATTR: str = '_metrics'
+
+PROM_PREFIX: str = 'ansible_lint_rule'
+
+
+def is_enabled() -> bool:
+    """Is the instrumentation enabled?"""
+    return bool(os.environ.get(E_JSON_VAR) or os.environ.get(E_PROM_VAR))
+
+
+ENABLED: bool = is_enabled()
+
+# The rules instrumented.
+RULES: typing.List[typing.Any] = []
+
+_LOCK = threading.Lock()
+
+
+class Histogram:
+    """A histogram of durations in seconds.
+    """
+    def __init__(self) -> None:
+        """Initialize."""
+        self.counts = [0] * (len(BUCKETS) + 1)  # The last one is +Inf.
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """Add a duration ``value``."""
+        idx = bisect.bisect_left(BUCKETS, value)
+        with self._lock:
+            self.counts[idx] += 1
+            self.count += 1
+            self.total += value
+
+    def merge(self, other: 'Histogram') -> None:
+        """Add the durations of the histogram ``other``."""
+        with self._lock:
+            self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+            self.count += other.count
+            self.total += other.total
+
+    def quantile(self, qtl: float) -> float:
+        """
+        Estimate the quantile ``qtl`` by the linear interpolation in the
+        bucket it falls in.
+
+        >>> hist = Histogram()
+        >>> for val in (1e-6, 3e-6, 3e-6, 1e-3):
+        ...     hist.observe(val)
+        >>> round(hist.quantile(0.5), 9)
+        3e-06
+        >>> hist.quantile(0.99) <= BUCKETS[10]
+        True
+        """
+        if not self.count:
+            return 0.0
+
+        rank = qtl * self.count
+        seen = 0
+        for idx, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = BUCKETS[idx - 1] if idx else 0.0
+                upper = BUCKETS[idx] if idx < len(BUCKETS) else lower
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+
+        return BUCKETS[-1]
+
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        """Summarize the durations."""
+        return dict(calls=self.count, total=self.total,
+                    mean=self.total / self.count if self.count else 0.0,
+                    p50=self.quantile(0.5), p99=self.quantile(0.99))
+
+
+class RuleMetrics:
+    """The metrics of a rule.
+    """
+    def __init__(self, rule_id: str):
+        """Initialize."""
+        self.rule_id = rule_id
+        self.hooks: typing.Dict[str, Histogram] = {}
+        self.counters: typing.Dict[str, int] = collections.Counter()
+        self._lock = threading.Lock()
+
+    def histogram(self, hook: str) -> Histogram:
+        """Get the histogram of the hook ``hook``."""
+        with self._lock:
+            return self.hooks.setdefault(hook, Histogram())
+
+    def count(self, name: str, value: int = 1) -> None:
+        """Increment the counter ``name``."""
+        with self._lock:
+            self.counters[name] += value
+
+
+def timed(hist: Histogram, fun: typing.Callable[..., typing.Any]
+          ) -> typing.Callable[..., typing.Any]:
+    """Wrap a function to observe its durations with ``hist``."""
+    @functools.wraps(fun)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fun(*args, **kwargs)
+        finally:
+            hist.observe(time.perf_counter() - start)
+
+    return wrapper
+
+
+def has_own(rule: typing.Any, hook: str) -> bool:
+    """Test if ``rule`` has its own hook ``hook``."""
+    return getattr(type(rule), hook, None) is not \
+        getattr(ansiblelint.rules.AnsibleLintRule, hook, None)
+
+
+def instrument(rule: typing.Any) -> None:
+    """Time the hooks of the rule instance ``rule``."""
+    if METRICS_ATTR in rule.__dict__:
+        return
+
+    metrics = rule.__dict__[METRICS_ATTR] = RuleMetrics(str(rule.id))
+    for hook in ('getmatches', ) + HOOKS:
+        if hook == 'getmatches' or has_own(rule, hook):
+            setattr(rule, hook,
+                    timed(metrics.histogram(hook), getattr(rule, hook)))
+
+    with _LOCK:
+        RULES.append(rule)
+
+
+def count(rule: typing.Any, name: str, value: int = 1) -> None:
+    """Increment the counter ``name`` of ``rule`` if it's instrumented."""
+    metrics = getattr(rule, '__dict__', {}).get(METRICS_ATTR)
+    if metrics is not None:
+        metrics.count(name, value)
+
+
+def hit_rate(hits: int, misses: int) -> float:
+    """
+    Compute the hit rate of a cache.
+
+    >>> hit_rate(3, 1), hit_rate(0, 0)
+    (0.75, 0.0)
+    """
+    total = hits + misses
+    return hits / total if total else 0.0
+
+
+def collect(rules: typing.Optional[typing.Iterable[typing.Any]] = None
+            ) -> typing.Dict[str, typing.Any]:
+    """
+    Collect the metrics of the rules instrumented, merged by the IDs of the
+    rules.
+    """
+    hooks: typing.Dict[str, typing.Dict[str, Histogram]] = {}
+    counters: typing.Dict[str, typing.Dict[str, int]] = {}
+    memos: typing.Dict[str, typing.Dict[str, typing.List[int]]] = {}
+
+    for rule in list(RULES if rules is None else rules):
+        metrics = rule.__dict__.get(METRICS_ATTR)
+        if metrics is None:
+            continue
+
+        rid = metrics.rule_id
+        for hook, hist in list(metrics.hooks.items()):
+            hooks.setdefault(rid, {}).setdefault(hook, Histogram()).merge(hist)
+
+        rcounters = counters.setdefault(rid, collections.Counter())
+        rcounters.update(metrics.counters)
+
+        for name, stats in _memo.stats(rule).items():
+            memo = memos.setdefault(rid, {}).setdefault(name, [0, 0])
+            memo[0] += stats.hits
+            memo[1] += stats.misses
+
+    res: typing.Dict[str, typing.Any] = {}
+    for rid in sorted(set(hooks) | set(counters)):
+        rcounters = counters.get(rid, {})
+        caches = {
+            f'memo:{name}': dict(hits=hits, misses=misses,
+                                 hit_rate=hit_rate(hits, misses))
+            for name, (hits, misses) in sorted(memos.get(rid, {}).items())
+        }
+        hits = rcounters.get('result_cache_hits', 0)
+        misses = rcounters.get('result_cache_misses', 0)
+        if hits or misses:
+            caches['result'] = dict(hits=hits, misses=misses,
+                                    hit_rate=hit_rate(hits, misses))
+        res[rid] = dict(
+            hooks={hook: hist.to_dict()
+                   for hook, hist in sorted(hooks.get(rid, {}).items())},
+            skipped=dict(kind=rcounters.get('skipped_kind', 0),
+                         prefilter=rcounters.get('skipped_prefilter', 0)),
+            caches=caches,
+            histograms=hooks.get(rid, {})
+        )
+
+    cstats = _content.CACHE.stats()
+    return dict(
+        rules=res,
+        content_cache=dict(cstats._asdict(),
+                           hit_rate=hit_rate(cstats.hits, cstats.misses))
+    )
+
+
+def to_json(metrics: typing.Dict[str, typing.Any]) -> str:
+    """Convert the metrics collected to JSON."""
+    rules = {
+        rid: {key: val for key, val in data.items() if key != 'histograms'}
+        for rid, data in metrics['rules'].items()
+    }
+    return json.dumps(dict(metrics, rules=rules), indent=2)
+
+
+def _labels(**labels: typing.Any) -> str:
+    """
+    Format the labels of a metric of Prometheus.
+
+    >>> _labels(rule='a', le='+Inf')
+    '{rule="a",le="+Inf"}'
+    """
+    return '{' + ','.join(
+        '{}="{}"'.format(key, str(val).replace('\\', r'\\')
+                         .replace('"', r'\"').replace('\n', r'\n'))
+        for key, val in labels.items()
+    ) + '}'
+
+
+def to_prometheus(metrics: typing.Dict[str, typing.Any]) -> str:
+    """
+    Convert the metrics collected to the text format of Prometheus.
+    """
+    pfx = PROM_PREFIX
+    lines = [
+        f'# HELP {pfx}_hook_seconds The wall time of the hooks of the rules.',
+        f'# TYPE {pfx}_hook_seconds histogram',
+    ]
+    for rid, data in metrics['rules'].items():
+        for hook, hist in sorted(data['histograms'].items()):
+            cumulative = 0
+            for bound, count in zip(BUCKETS + (None, ), hist.counts):
+                cumulative += count
+                ble = '+Inf' if bound is None else repr(bound)
+                lines.append(f'{pfx}_hook_seconds_bucket'
+                             f'{_labels(rule=rid, hook=hook, le=ble)} '
+                             f'{cumulative}')
+            labels = _labels(rule=rid, hook=hook)
+            lines.append(f'{pfx}_hook_seconds_sum{labels} {hist.total!r}')
+            lines.append(f'{pfx}_hook_seconds_count{labels} {hist.count}')
+
+    lines.extend([
+        f'# HELP {pfx}_files_skipped_total The files the rules skipped.',
+        f'# TYPE {pfx}_files_skipped_total counter',
+    ])
+    lines.extend(
+        f'{pfx}_files_skipped_total{_labels(rule=rid, reason=reason)} {val}'
+        for rid, data in metrics['rules'].items()
+        for reason, val in sorted(data['skipped'].items())
+    )
+
+    for name in ('hits', 'misses'):
+        lines.extend([
+            f'# HELP {pfx}_cache_{name}_total The {name} of the caches.',
+            f'# TYPE {pfx}_cache_{name}_total counter',
+        ])
+        lines.extend(
+            f'{pfx}_cache_{name}_total{_labels(rule=rid, cache=cache)} '
+            f'{stats[name]}'
+            for rid, data in metrics['rules'].items()
+            for cache, stats in sorted(data['caches'].items())
+        )
+        lines.append(f'{pfx}_cache_{name}_total'
+                     f'{_labels(rule="", cache="content")} '
+                     f'{metrics["content_cache"][name]}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def write_file(path: str, content: str) -> None:
+    """Write the file atomically not to let others read it partially."""
+    dirname = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=dirname, prefix='.metrics-')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as fobj:
+            fobj.write(content)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def dump() -> None:
+    """Dump the metrics to the files given by the environment variables.
+    """
+    if not RULES:
+        return  # Nothing was instrumented with this module.
+
+    metrics = collect()
+    json_path = os.environ.get(E_JSON_VAR)
+    if json_path:
+        write_file(json_path, to_json(metrics))
+
+    prom_path = os.environ.get(E_PROM_VAR)
+    if prom_path:
+        write_file(prom_path, to_prometheus(metrics))
+
+
+if ENABLED:
+    atexit.register(dump)
+
+# vim:sw=4:ts=4:et:
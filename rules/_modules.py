@@ -0,0 +1,319 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+"""Index of the aliases of modules to resolve them to their canonical names.
+
+A module can be referred with some names in tasks, e.g. ``shell``,
+``ansible.builtin.shell`` and ``ansible.legacy.shell``, and modules may be
+redirected to others by ansible itself and the collections installed. This
+module builds an index of the redirects once from the routing data,
+``ansible_builtin_runtime.yml`` of ansible and ``meta/runtime.yml`` of the
+collections, and resolves the names to the canonical, fully qualified ones.
+
+The index is built only once in a process. It can be saved in a file to
+reuse in the later runs if an environment variable,
+_ANSIBLE_LINT_RULE_MODULE_INDEX_CACHE_DIR, is set to the dir to keep it. The
+file is keyed by the versions of ansible and the collections.
+
+::
+
+    _ANSIBLE_LINT_RULE_MODULE_INDEX_CACHE_DIR=.cache/ansible-lint-custom-rules
+"""
+import functools
+import hashlib
+import json
+import os
+import pathlib
+import sys
+import tempfile
+import threading
+import typing
+import warnings
+
+import yaml
+
+
+E_CACHE_DIR_VAR: str = '_ANSIBLE_LINT_RULE_MODULE_INDEX_CACHE_DIR'
+
+BUILTIN_PREFIX: str = 'ansible.builtin.'
+LEGACY_PREFIX: str = 'ansible.legacy.'
+
+SAFE_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+PathT = typing.Union[str, pathlib.Path]
+
+
+class Collection(typing.NamedTuple):
+    """A namedtuple object to keep the info of an installed collection.
+    """
+    name: str  # <namespace>.<collection>
+    version: str
+    runtime: str  # The path of meta/runtime.yml or ''
+
+
+def normalize(name: str) -> str:
+    """
+    Normalize the module name ``name`` to the fully qualified one.
+
+    >>> normalize('shell')
+    'ansible.builtin.shell'
+    >>> normalize('ansible.legacy.shell')
+    'ansible.builtin.shell'
+    >>> normalize('community.general.foo')
+    'community.general.foo'
+    """
+    if '.' not in name:
+        return BUILTIN_PREFIX + name
+
+    if name.startswith(LEGACY_PREFIX):
+        return BUILTIN_PREFIX + name[len(LEGACY_PREFIX):]
+
+    return name
+
+
+def get_ansible_version() -> str:
+    """Get the version of ansible."""
+    try:
+        import ansible.release  # pylint: disable=import-outside-toplevel
+        return str(ansible.release.__version__)
+    except ImportError:
+        return 'unknown'
+
+
+def get_builtin_runtime() -> str:
+    """Get the path of the routing data of ansible itself."""
+    try:
+        import ansible  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return ''
+
+    path = os.path.join(os.path.dirname(ansible.__file__), 'config',
+                        'ansible_builtin_runtime.yml')
+    return path if os.path.exists(path) else ''
+
+
+def get_collection_roots() -> typing.List[str]:
+    """
+    Get the dirs may have ansible_collections/ where collections were
+    installed.
+    """
+    roots: typing.List[str] = []
+    try:
+        import ansible.constants  # pylint: disable=import-outside-toplevel
+        roots.extend(
+            ansible.constants.config.get_config_value('COLLECTIONS_PATHS')
+            or []
+        )
+    except ImportError:
+        pass
+
+    roots.extend(sys.path)  # The collections installed with pip.
+    return roots
+
+
+def get_collection_version(cdir: pathlib.Path) -> str:
+    """Get the version of the collection in the dir ``cdir``."""
+    try:
+        with (cdir / 'MANIFEST.json').open(encoding='utf-8') as fobj:
+            return str(json.load(fobj)['collection_info']['version'])
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    try:
+        with (cdir / 'galaxy.yml').open(encoding='utf-8') as fobj:
+            return str(yaml.load(fobj, Loader=SAFE_LOADER)['version'])
+    except (OSError, yaml.YAMLError, KeyError, TypeError):
+        pass
+
+    return 'unknown'
+
+
+def find_collections(roots: typing.Iterable[PathT]
+                     ) -> typing.List[Collection]:
+    """
+    Find the collections installed in the dirs ``roots``. The ones found
+    first win if there are some collections of the same name.
+    """
+    res: typing.Dict[str, Collection] = {}
+    for root in roots:
+        rdir = pathlib.Path(root).expanduser()
+        if rdir.name != 'ansible_collections':
+            rdir = rdir / 'ansible_collections'
+
+        if not rdir.is_dir():
+            continue
+
+        for cdir in sorted(rdir.glob('*/*/')):
+            name = f'{cdir.parent.name}.{cdir.name}'
+            if name in res or not cdir.is_dir():
+                continue
+
+            runtime = cdir / 'meta' / 'runtime.yml'
+            res[name] = Collection(
+                name, get_collection_version(cdir),
+                str(runtime) if runtime.exists() else ''
+            )
+
+    return [res[name] for name in sorted(res)]
+
+
+def load_redirects(path: PathT, prefix: str) -> typing.Dict[str, str]:
+    """
+    Load the redirects of modules from the routing data in ``path``.
+
+    :param path: The path of the routing data, runtime.yml
+    :param prefix: The prefix of the names of modules in the data
+    """
+    try:
+        with open(path, encoding='utf-8') as fobj:
+            data = yaml.load(fobj, Loader=SAFE_LOADER)
+        modules = data['plugin_routing']['modules']
+    except (OSError, yaml.YAMLError, KeyError, TypeError):
+        return {}
+
+    if not isinstance(modules, dict):
+        return {}
+
+    return {
+        prefix + name: normalize(str(route['redirect']))
+        for name, route in modules.items()
+        if isinstance(route, dict) and route.get('redirect')
+    }
+
+
+def make_key(collections: typing.Iterable[Collection], builtin: str) -> str:
+    """Make a key of the index from the versions of ansible and collections.
+    """
+    data = json.dumps([get_ansible_version(), builtin,
+                       [list(c) for c in collections]])
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+class ModuleIndex:
+    """An index of the aliases of modules.
+    """
+    def __init__(self, redirects: typing.Optional[typing.Dict[str, str]]
+                 = None, key: str = ''):
+        """Initialize.
+
+        :param redirects: A mapping object of the fully qualified names of
+            the modules redirected and the ones redirected to
+        :param key: The key of the index made from the versions of ansible
+            and the collections, .. seealso:: make_key
+        """
+        self.redirects: typing.Dict[str, str] = redirects or {}
+        self.key = key
+        self._canonicals: typing.Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _resolve(self, name: str) -> str:
+        """Resolve the name ``name`` following the redirects."""
+        name = normalize(name)
+        seen = {name}
+        while name in self.redirects:
+            name = self.redirects[name]
+            if name in seen:
+                break  # Avoid the infinite loop of the broken redirects.
+            seen.add(name)
+
+        return name
+
+    def canonical(self, name: str) -> str:
+        """Get the canonical, fully qualified name of the module ``name``.
+        """
+        res = self._canonicals.get(name)
+        if res is None:
+            res = self._resolve(name)
+            with self._lock:
+                self._canonicals[name] = res
+
+        return res
+
+    def canonicals(self, names: typing.Iterable[str]) -> typing.FrozenSet[str]:
+        """Get the canonical names of the modules ``names``."""
+        return frozenset(self.canonical(name) for name in names)
+
+    def aliases(self, names: typing.Iterable[str]) -> typing.FrozenSet[str]:
+        """
+        Get the names of the modules ``names`` and all of the names
+        redirected to them.
+        """
+        canonicals = self.canonicals(names)
+        return canonicals | frozenset(
+            name for name in self.redirects
+            if self.canonical(name) in canonicals
+        )
+
+
+def get_cache_path(key: str) -> typing.Optional[pathlib.Path]:
+    """Get the path of the file to keep the index if it's enabled."""
+    cache_dir = os.environ.get(E_CACHE_DIR_VAR)
+    if not cache_dir:
+        return None
+
+    return pathlib.Path(cache_dir) / f'module_index_{key}.json'
+
+
+def load_cache(path: pathlib.Path) -> typing.Optional[typing.Dict[str, str]]:
+    """Load the redirects saved in ``path``."""
+    try:
+        with path.open(encoding='utf-8') as fobj:
+            data = json.load(fobj)
+    except (OSError, ValueError):
+        return None
+
+    return data if isinstance(data, dict) else None
+
+
+def save_cache(path: pathlib.Path, redirects: typing.Dict[str, str]) -> None:
+    """Save the redirects in ``path``."""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(mode='w', encoding='utf-8',
+                                         dir=path.parent, suffix='.tmp',
+                                         delete=False) as fobj:
+            json.dump(redirects, fobj)
+        os.replace(fobj.name, path)
+    except OSError as exc:
+        warnings.warn(f'Failed to save the index: {path!s}, exc={exc!r}')
+
+
+def build_index(roots: typing.Optional[typing.Iterable[PathT]] = None,
+                builtin: typing.Optional[str] = None) -> ModuleIndex:
+    """
+    Build the index of modules from the routing data of ansible and the
+    collections installed, or load it from the cache file if available.
+
+    :param roots: The dirs may have ansible_collections/
+    :param builtin: The path of the routing data of ansible itself
+    """
+    if roots is None:
+        roots = get_collection_roots()
+    if builtin is None:
+        builtin = get_builtin_runtime()
+
+    collections = find_collections(roots)
+    key = make_key(collections, builtin)
+    path = get_cache_path(key)
+    if path is not None:
+        redirects = load_cache(path)
+        if redirects is not None:
+            return ModuleIndex(redirects, key)
+
+    redirects = load_redirects(builtin, BUILTIN_PREFIX) if builtin else {}
+    for coll in collections:
+        if coll.runtime:
+            redirects.update(load_redirects(coll.runtime, f'{coll.name}.'))
+
+    if path is not None:
+        save_cache(path, redirects)
+
+    return ModuleIndex(redirects, key)
+
+
+@functools.lru_cache(maxsize=None)
+def get_index() -> ModuleIndex:
+    """Get the index of modules built once per process."""
+    return build_index()
+
+# vim:sw=4:ts=4:et:
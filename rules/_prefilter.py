@@ -0,0 +1,129 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+"""Prefilter to skip the rules for files cannot match them.
+
+Some rules can only find something if some tokens like 'with_' and 'vars'
+appear in the files. Rules declare such tokens with the method,
+``prefilter_tokens``, and they are skipped for files lack all of them.
+
+The tokens all of the rules asked for are searched at once in the raw bytes of
+each file with a combined regex, and the results are kept with the content in
+the shared content cache (.. seealso:: rules._content).
+
+This prefilter can be disabled by setting an environment variable,
+_ANSIBLE_LINT_RULE_PREFILTER, to '0'.
+
+::
+
+    _ANSIBLE_LINT_RULE_PREFILTER=0
+"""
+import functools
+import os
+import re
+import threading
+import typing
+
+from . import _content
+
+
+E_ENABLED_VAR: str = '_ANSIBLE_LINT_RULE_PREFILTER'
+
+# The tokens rules asked for so far.
+TOKENS: typing.Set[bytes] = set()
+
+_LOCK = threading.Lock()
+
+
+def is_enabled() -> bool:
+    """Is the prefilter enabled?"""
+    return os.environ.get(E_ENABLED_VAR, '1') != '0'
+
+
+def to_bytes(token: typing.Union[str, bytes]) -> bytes:
+    """Convert the token to bytes."""
+    return token if isinstance(token, bytes) else token.encode('utf-8')
+
+
+@functools.lru_cache(maxsize=128)
+def compile_tokens(tokens: typing.Tuple[bytes, ...]) -> typing.Pattern:
+    """Compile the tokens into one regex to search all of them at once.
+    """
+    # Longer ones first not to miss them matched partially by shorter ones.
+    return re.compile(b'|'.join(
+        re.escape(t) for t in sorted(tokens, key=len, reverse=True)
+    ))
+
+
+def search_tokens(data: bytes, tokens: typing.Iterable[bytes]
+                  ) -> typing.Dict[bytes, bool]:
+    """
+    Search the tokens in the data at once and return which of them were
+    found. The tokens not found in the matches, e.g. overlap them, are
+    searched one by one after that.
+
+    >>> search_tokens(b'a: 1\\nvars_files: []\\n', [b'vars', b'vars_f', b'x'])
+    {b'vars': True, b'vars_f': True, b'x': False}
+    >>> search_tokens(b'shellx', [b'shell', b'llx'])
+    {b'shell': True, b'llx': True}
+    """
+    res = {t: False for t in tokens}
+    pending = set(res)
+    if not pending:
+        return res
+
+    regex = compile_tokens(tuple(sorted(pending)))
+    for match in regex.finditer(data):
+        # Other shorter tokens may be a part of the one matched.
+        found = match.group(0)
+        for token in list(pending):
+            if token in found:
+                res[token] = True
+                pending.discard(token)
+
+        if not pending:
+            break  # All of the tokens were found.
+
+    for token in pending:
+        res[token] = token in data
+
+    return res
+
+
+def find_tokens(file: '_content.PathOrLintable',
+                tokens: typing.Iterable[typing.Union[str, bytes]]
+                ) -> typing.Dict[bytes, bool]:
+    """
+    Find the tokens in the file ``file``. It searches the tokens asked for
+    by other rules so far at the same time and keep the results.
+
+    :raises: OSError if failed to stat or read the file
+    """
+    btokens = [to_bytes(t) for t in tokens]
+    with _LOCK:
+        TOKENS.update(btokens)
+        known = list(TOKENS)
+
+    content = _content.load(file)
+    found = content.found_tokens
+    pending = [t for t in known if t not in found]
+    if pending:
+        found.update(search_tokens(content.data, pending))
+
+    return {t: found[t] for t in btokens}
+
+
+def may_match(rule: typing.Any, file: '_content.PathOrLintable') -> bool:
+    """
+    Test if ``rule`` may find something in the file ``file``.
+    """
+    tokens = rule.prefilter_tokens()
+    if not tokens or not is_enabled():
+        return True
+
+    try:
+        return any(find_tokens(file, tokens).values())
+    except OSError:
+        return True  # Let the rule process it.
+
+# vim:sw=4:ts=4:et:
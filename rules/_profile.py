@@ -0,0 +1,340 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+"""Profiler of the code of the rules.
+
+If enabled, the hooks of the rules, ``match``, ``matchtask``, ``matchplay``
+and ``matchyaml``, are profiled, and the profiles are aggregated for each rule
+across all of the files and dumped at exit into the dir given:
+
+- ``<rule_id>.pstats``: The profile of the rule made with cProfile to load
+  with pstats, snakeviz and so on
+- ``rules.pstats``: The profile of all of the rules
+- ``<rule_id>.folded``: The stacks of the rule sampled periodically in the
+  collapsed format ready for flamegraph.pl, speedscope, inferno and so on
+- ``rules.folded``: The stacks of all of the rules, prefixed with their IDs
+
+It's enabled by setting the path of the dir to the environment variable,
+and the profilers to use, ``cprofile`` and/or ``sample``, and the interval
+of sampling in seconds can be given too.
+
+::
+
+    _ANSIBLE_LINT_RULE_PROFILE=/tmp/profiles
+    _ANSIBLE_LINT_RULE_PROFILE_MODE=cprofile,sample
+    _ANSIBLE_LINT_RULE_PROFILE_INTERVAL=0.001
+
+    flamegraph.pl /tmp/profiles/rules.folded > rules.svg
+
+.. note::
+
+   The profiles in the worker processes of rules._runner are not collected,
+   and it warns about that. Run it with ``-j 1`` to collect them.
+"""
+import atexit
+import collections
+import cProfile
+import functools
+import os
+import pathlib
+import pstats
+import sys
+import threading
+import types
+import typing
+
+from . import _metrics
+
+
+E_DIR_VAR: str = '_ANSIBLE_LINT_RULE_PROFILE'
+E_MODE_VAR: str = '_ANSIBLE_LINT_RULE_PROFILE_MODE'
+E_INTERVAL_VAR: str = '_ANSIBLE_LINT_RULE_PROFILE_INTERVAL'
+
+MODES: typing.FrozenSet[str] = frozenset(('cprofile', 'sample'))
+DEFAULT_INTERVAL: float = 0.001
+
+# The attribute name of rule instances to mark them profiled.
+PROFILED_ATTR: str = '_profiled'
+
+# The name of the files of all of the rules.
+ALL: str = 'rules'
+
+
+def get_modes() -> typing.FrozenSet[str]:
+    """
+    Get the profilers to use.
+
+    >>> sorted(get_modes()) == sorted(MODES)
+    True
+    """
+    value = os.environ.get(E_MODE_VAR)
+    if not value:
+        return MODES
+
+    return frozenset(m.strip() for m in value.split(',')) & MODES
+
+
+def get_interval(default: float = DEFAULT_INTERVAL) -> float:
+    """Get the interval of sampling in seconds."""
+    try:
+        interval = float(os.environ.get(E_INTERVAL_VAR, default))
+        return interval if interval > 0 else default
+    except ValueError:
+        return default
+
+
+def is_enabled() -> bool:
+    """Is the profiler enabled?"""
+    return bool(os.environ.get(E_DIR_VAR))
+
+
+ENABLED: bool = is_enabled()
+
+
+class Profiles:
+    """The profiles of the rules made with cProfile.
+
+    A profiler is made for each rule and thread, because a profiler can only
+    profile one thread, and they are merged at last.
+    """
+    def __init__(self) -> None:
+        """Initialize."""
+        self._profilers: typing.Dict[
+            typing.Tuple[str, int], cProfile.Profile
+        ] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def wrap(self, rule_id: str, fun: typing.Callable[..., typing.Any]
+             ) -> typing.Callable[..., typing.Any]:
+        """Wrap a hook of the rule ``rule_id`` to profile it."""
+        @functools.wraps(fun)
+        def wrapper(*args, **kwargs):
+            local = self._local
+            if getattr(local, 'active', False):
+                return fun(*args, **kwargs)  # Profiled already.
+
+            prof = self.get(rule_id)
+            local.active = True
+            prof.enable()
+            try:
+                return fun(*args, **kwargs)
+            finally:
+                prof.disable()
+                local.active = False
+
+        return wrapper
+
+    def get(self, rule_id: str) -> cProfile.Profile:
+        """Get the profiler of the rule ``rule_id`` for the current thread.
+        """
+        key = (rule_id, threading.get_ident())
+        prof = self._profilers.get(key)
+        if prof is None:
+            with self._lock:
+                prof = self._profilers.setdefault(key, cProfile.Profile())
+        return prof
+
+    def stats(self) -> typing.Dict[str, pstats.Stats]:
+        """Merge the profiles of each rule."""
+        res: typing.Dict[str, pstats.Stats] = {}
+        with self._lock:
+            profilers = sorted(self._profilers.items(),
+                               key=lambda item: item[0])
+
+        for (rule_id, _tid), prof in profilers:
+            prof.create_stats()
+            if not getattr(prof, 'stats', None):
+                continue  # Never called.
+
+            if rule_id in res:
+                res[rule_id].add(prof)
+            else:
+                res[rule_id] = pstats.Stats(prof)
+
+        return res
+
+
+def frame_label(code: typing.Any) -> str:
+    """
+    Make the label of a frame in the collapsed stacks.
+
+    >>> frame_label(frame_label.__code__).startswith('frame_label (_pro')
+    True
+    """
+    fname = os.path.basename(code.co_filename)
+    return f'{code.co_name} ({fname}:{code.co_firstlineno})'.replace(';', ':')
+
+
+class Sampler:
+    """A sampler of the stacks of the threads running the hooks of rules.
+    """
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        """Initialize.
+
+        :param interval: The interval of sampling in seconds
+        """
+        self.interval = interval
+        self.counts: typing.Dict[str, typing.Counter[str]] = \
+            collections.defaultdict(collections.Counter)
+        self.nsamples = 0
+        self._codes: typing.Set[typing.Any] = set()
+        self._active: typing.Dict[int, str] = {}
+        self._thread: typing.Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def wrap(self, rule_id: str, fun: typing.Callable[..., typing.Any]
+             ) -> typing.Callable[..., typing.Any]:
+        """Wrap a hook of the rule ``rule_id`` to sample its stacks."""
+        active = self._active
+
+        @functools.wraps(fun)
+        def wrapper(*args, **kwargs):
+            tid = threading.get_ident()
+            if tid in active:
+                return fun(*args, **kwargs)  # Sampled already.
+
+            active[tid] = rule_id
+            try:
+                return fun(*args, **kwargs)
+            finally:
+                del active[tid]
+
+        # functools.wraps hides the type of the wrapper function.
+        self._codes.add(typing.cast(types.FunctionType, wrapper).__code__)
+        self.start()
+        return wrapper
+
+    def start(self) -> None:
+        """Start the sampling thread if not started yet."""
+        with self._lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run,
+                                                name='rule-sampler',
+                                                daemon=True)
+                self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the sampling thread."""
+        self._stop.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+
+    def _run(self) -> None:
+        """Sample the stacks until stopped."""
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self) -> None:
+        """Sample the stacks of the threads running the hooks."""
+        if not self._active:
+            return
+
+        frames = sys._current_frames()  # pylint: disable=protected-access
+        for tid, rule_id in list(self._active.items()):
+            frame = frames.get(tid)
+            labels = []
+            while frame is not None and frame.f_code not in self._codes:
+                labels.append(frame_label(frame.f_code))
+                frame = frame.f_back
+
+            if frame is None or not labels:
+                continue  # The hook returned already.
+
+            self.counts[rule_id][';'.join(reversed(labels))] += 1
+            self.nsamples += 1
+
+    def folded(self, rule_id: typing.Optional[str] = None
+               ) -> typing.List[str]:
+        """
+        Get the stacks sampled in the collapsed format, of the rule
+        ``rule_id`` or all of the rules prefixed with their IDs.
+        """
+        if rule_id is not None:
+            return [f'{stack} {count}' for stack, count
+                    in sorted(self.counts.get(rule_id, {}).items())]
+
+        return [f'{rid};{line}' for rid in sorted(self.counts)
+                for line in self.folded(rid)]
+
+
+PROFILES = Profiles()
+SAMPLER = Sampler(get_interval())
+
+_LOCK = threading.Lock()
+_RULE_IDS: typing.Set[str] = set()
+
+
+def instrument(rule: typing.Any,
+               modes: typing.Optional[typing.FrozenSet[str]] = None) -> None:
+    """Profile the hooks of the rule instance ``rule``."""
+    if PROFILED_ATTR in rule.__dict__:
+        return
+
+    if modes is None:
+        modes = get_modes()
+
+    rule_id = str(rule.id)
+    rule.__dict__[PROFILED_ATTR] = True
+    for hook in _metrics.HOOKS:
+        if not _metrics.has_own(rule, hook):
+            continue
+
+        # Sample the stacks under the hook not including cProfile's wrapper.
+        fun = getattr(rule, hook)
+        if 'sample' in modes:
+            fun = SAMPLER.wrap(rule_id, fun)
+        if 'cprofile' in modes:
+            fun = PROFILES.wrap(rule_id, fun)
+        setattr(rule, hook, fun)
+
+    with _LOCK:
+        _RULE_IDS.add(rule_id)
+
+
+def dump(outdir: typing.Optional[str] = None) -> typing.List[pathlib.Path]:
+    """
+    Dump the profiles into the dir ``outdir`` or the one given by the
+    environment variable.
+
+    :return: The list of the paths of the files written
+    """
+    if not _RULE_IDS:
+        return []  # Nothing was profiled with this module.
+
+    SAMPLER.stop()
+    odir = pathlib.Path(outdir or os.environ[E_DIR_VAR])
+    odir.mkdir(parents=True, exist_ok=True)
+    paths = []
+
+    stats = PROFILES.stats()
+    for rule_id, stat in sorted(stats.items()):
+        paths.append(odir / f'{rule_id}.pstats')
+        stat.dump_stats(str(paths[-1]))
+
+    if stats:
+        # Merge them into a new one to keep the stats of each rule as dumped.
+        total = pstats.Stats()
+        total.add(*stats.values())
+        paths.append(odir / f'{ALL}.pstats')
+        total.dump_stats(str(paths[-1]))
+
+    for rule_id in sorted(SAMPLER.counts):
+        paths.append(odir / f'{rule_id}.folded')
+        paths[-1].write_text('\n'.join(SAMPLER.folded(rule_id)) + '\n')
+
+    if SAMPLER.counts:
+        paths.append(odir / f'{ALL}.folded')
+        paths[-1].write_text('\n'.join(SAMPLER.folded()) + '\n')
+
+    return paths
+
+
+if ENABLED:
+    atexit.register(dump)
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,339 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+"""Persistent lint result cache of the custom rules.
+
+This cache is disabled by default. Users can enable it by specifying an
+environment variable, _ANSIBLE_LINT_RULE_RESULT_CACHE_DIR, to the dir to keep
+the cache data, and also limit the total size of the cache data by another
+environment variable, _ANSIBLE_LINT_RULE_RESULT_CACHE_MAX_BYTES.
+
+::
+
+    _ANSIBLE_LINT_RULE_RESULT_CACHE_DIR=.cache/ansible-lint-custom-rules
+    _ANSIBLE_LINT_RULE_RESULT_CACHE_MAX_BYTES=104857600
+
+The lint results of each rule for each file are stored with the key computed
+from the followings and will be invalidated automatically if any of them were
+changed.
+
+- The hash of the content, or the ID of the git blob if available, the path
+  and the kind of the file
+- The rule ID and the hash of the rule's configuration, including the content
+  of the files given in it, .. seealso:: rules._config
+- The values of the environment variables to configure the rules
+- The data the rule depends on other than them, like the collections
+  installed, .. seealso:: rules._base.CustomRule.cache_key_data
+- The versions of this package and ansible-lint, the hash of the rule code and
+  the hash of the code of the helper modules shared by the rules
+"""
+import functools
+import hashlib
+import inspect
+import json
+import os
+import pathlib
+import tempfile
+import threading
+import typing
+import warnings
+
+import ansiblelint.errors
+import ansiblelint.file_utils
+
+from . import _config
+
+if typing.TYPE_CHECKING:
+    from ansiblelint.file_utils import Lintable
+    from ansiblelint.rules import AnsibleLintRule
+
+
+PACKAGE_NAME: str = 'ansiblelint_custom_rules_ex'
+
+E_PREFIX: str = '_ANSIBLE_LINT_RULE_'
+E_CACHE_DIR_VAR: str = f'{E_PREFIX}RESULT_CACHE_DIR'
+E_MAX_BYTES_VAR: str = f'{E_PREFIX}RESULT_CACHE_MAX_BYTES'
+
+DEFAULT_MAX_BYTES: int = 100 * 1024 * 1024
+
+# The ratio of the size to prune the cache data down to when it exceeds the
+# limit, not to prune it again soon.
+LOW_WATER_RATIO: float = 0.8
+
+# The dir of the rules and the helper modules, rules/_*.py.
+RULES_DIR: str = os.path.dirname(os.path.abspath(__file__))
+
+# Keys of MatchError attributes to keep in the cache.
+MATCH_KEYS: typing.Tuple[str, ...] = (
+    'message', 'linenumber', 'column', 'details', 'tag'
+)
+
+
+@functools.lru_cache(None)
+def get_versions() -> str:
+    """Get the versions of this package and ansible-lint.
+    """
+    try:
+        import pkg_resources  # pylint: disable=import-outside-toplevel
+        version = pkg_resources.get_distribution(PACKAGE_NAME).version
+    except Exception:  # pylint: disable=broad-except
+        version = 'unknown'
+
+    return f'{version}:{ansiblelint.__version__}'
+
+
+def get_rule_file(rule_cls: type) -> str:
+    """Get the path of the file defines given rule class ``rule_cls``.
+
+    .. note::
+
+       inspect.getfile does not work for the rule classes loaded by
+       ansiblelint.rules.load_plugins because their modules are not in
+       sys.modules.
+    """
+    for obj in vars(rule_cls).values():
+        if inspect.isfunction(obj):
+            return obj.__code__.co_filename
+
+    return ''
+
+
+@functools.lru_cache(None)
+def get_code_hash(path: str) -> str:
+    """Get the hash of the code in given file ``path``.
+    """
+    return _config.file_digest(path)
+
+
+@functools.lru_cache(None)
+def get_helpers_hash(rules_dir: str = RULES_DIR) -> str:
+    """
+    Get the hash of the code of the helper modules, rules/_*.py, the rules
+    use, because get_rule_file finds the file of the rule only.
+    """
+    hsh = hashlib.sha1()
+    for path in sorted(pathlib.Path(rules_dir).glob('_*.py')):
+        hsh.update(f'{path.name}:{get_code_hash(str(path))}\n'.encode('utf-8'))
+
+    return hsh.hexdigest()
+
+
+def get_env_config() -> typing.Dict[str, str]:
+    """Get the environment variables to configure the rules.
+    """
+    return {
+        key: val for key, val in os.environ.items()
+        if key.startswith(E_PREFIX)
+        and key not in (E_CACHE_DIR_VAR, E_MAX_BYTES_VAR)
+    }
+
+
+def make_key(rule: 'AnsibleLintRule', file: 'Lintable',
+             data: typing.Optional[bytes],
+             blob_id: typing.Optional[str] = None) -> str:
+    """Make a key to store the lint results of ``rule`` for ``file``.
+
+    :param rule: An AnsibleLintRule instance
+    :param file: A Lintable object
+    :param data: The content of ``file`` in bytes
+    :param blob_id: The ID of the git blob of ``file`` used instead of
+        ``data`` if given, .. seealso:: rules._git
+    """
+    code_hash = get_code_hash(get_rule_file(type(rule)))
+    get_data = getattr(rule, 'cache_key_data', None)
+    config = json.dumps(
+        [rule.id, _config.get_snapshot(rule).digest, get_env_config(),
+         get_data() if get_data else None, get_versions(),
+         code_hash, get_helpers_hash(), str(file.path), str(file.kind)],
+        sort_keys=True, default=repr
+    )
+    if blob_id:
+        hsh = hashlib.sha256(f'git-blob:{blob_id}'.encode('utf-8'))
+    else:
+        hsh = hashlib.sha256(data or b'')
+    hsh.update(config.encode('utf-8'))
+
+    return hsh.hexdigest()
+
+
+def dump_matches(matches: typing.Iterable[ansiblelint.errors.MatchError],
+                 file: 'Lintable'
+                 ) -> typing.List[typing.Dict[str, typing.Any]]:
+    """Convert MatchError objects to the data to store in the cache.
+    """
+    filename = ansiblelint.file_utils.normpath(str(file.path))
+    res = []
+    for match in matches:
+        mdata = {key: getattr(match, key) for key in MATCH_KEYS}
+        if match.filename != filename:
+            mdata['filename'] = match.filename
+        res.append(mdata)
+
+    return res
+
+
+def load_matches(rule: 'AnsibleLintRule', file: 'Lintable',
+                 data: typing.List[typing.Dict[str, typing.Any]]
+                 ) -> typing.List[ansiblelint.errors.MatchError]:
+    """Restore MatchError objects from the data stored in the cache.
+    """
+    res = []
+    for mdata in data:
+        match = rule.create_matcherror(
+            message=mdata['message'], linenumber=mdata['linenumber'],
+            details=mdata['details'], filename=mdata.get('filename', file),
+            tag=mdata['tag'] or ''
+        )
+        match.column = mdata['column']
+        res.append(match)
+
+    return res
+
+
+class ResultCache:
+    """A persistent cache of lint results limited by the total size.
+    """
+    def __init__(self, cache_dir: typing.Union[str, pathlib.Path],
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        """Initialize.
+
+        :param cache_dir: The dir to keep the cache data
+        :param max_bytes: The max total size of the cache data in bytes
+        """
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._nbytes: typing.Optional[int] = None
+
+        # The paths of the data used recently to mark only when pruning.
+        self._used: typing.Set[str] = set()
+
+    def path(self, key: str) -> pathlib.Path:
+        """Get the path to keep the data of ``key``."""
+        return self.cache_dir / key[:2] / f'{key}.json'
+
+    def get(self, key: str
+            ) -> typing.Optional[typing.List[typing.Dict[str, typing.Any]]]:
+        """Get the data of ``key`` or None if not found."""
+        path = self.path(key)
+        try:
+            with path.open(encoding='utf-8') as fio:
+                data = json.load(fio)
+        except (OSError, ValueError):
+            return None
+
+        with self._lock:
+            self._used.add(str(path))
+
+        return data if isinstance(data, list) else None
+
+    def set(self, key: str,
+            data: typing.List[typing.Dict[str, typing.Any]]) -> None:
+        """Store ``data`` of ``key`` in the cache."""
+        path = self.path(key)
+        try:
+            old_size = path.stat().st_size  # It will be replaced.
+        except OSError:
+            old_size = 0
+
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(mode='w', encoding='utf-8',
+                                             dir=path.parent, suffix='.tmp',
+                                             delete=False) as fio:
+                json.dump(data, fio)
+            os.replace(fio.name, path)
+            size = path.stat().st_size
+        except OSError as exc:
+            warnings.warn(f'Failed to save the cache: {path!s}, exc={exc!r}')
+            return
+
+        with self._lock:
+            if self._nbytes is None:
+                self._nbytes = self.size()  # Only once, including this one.
+            else:
+                self._nbytes += size - old_size
+
+            if self._nbytes > self.max_bytes:
+                self._nbytes = self.prune(self.low_water())
+
+    def low_water(self) -> int:
+        """Get the size to prune the cache data down to."""
+        return int(self.max_bytes * LOW_WATER_RATIO)
+
+    def _mark_used(self) -> None:
+        """
+        Update the mtimes of the data used recently to keep them in pruning
+        and tell other processes they were used.
+        """
+        used, self._used = self._used, set()
+        for path in used:
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+
+    def _list_files(self) -> typing.List[typing.Tuple[float, int, str]]:
+        """List (mtime, size, path) of the cache data files."""
+        res = []
+        for path in self.cache_dir.glob('*/*.json'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            res.append((stat.st_mtime, stat.st_size, str(path)))
+
+        return res
+
+    def size(self) -> int:
+        """Get the total size of the cache data."""
+        return sum(size for _mtime, size, _path in self._list_files())
+
+    def prune(self, max_bytes: typing.Optional[int] = None) -> int:
+        """Remove the least recently used data to fit in the limit.
+
+        :return: The total size of the cache data after pruned
+        """
+        if max_bytes is None:
+            max_bytes = self.max_bytes
+
+        self._mark_used()
+        files = sorted(self._list_files())
+        nbytes = sum(size for _mtime, size, _path in files)
+
+        for _mtime, size, path in files:
+            if nbytes <= max_bytes:
+                break
+            try:
+                os.remove(path)
+                nbytes -= size
+            except OSError:
+                pass
+
+        return nbytes
+
+
+_CACHES: typing.Dict[typing.Tuple[str, int], ResultCache] = {}
+
+
+def get_max_bytes(default: int = DEFAULT_MAX_BYTES) -> int:
+    """Get the max bytes of the cache from the environment variable.
+    """
+    return _config.get_env_int(E_MAX_BYTES_VAR, default)
+
+
+def get_cache() -> typing.Optional[ResultCache]:
+    """Get the cache object if the cache is enabled.
+    """
+    cache_dir = os.environ.get(E_CACHE_DIR_VAR)
+    if not cache_dir:
+        return None
+
+    key = (os.path.abspath(cache_dir), get_max_bytes())
+    cache = _CACHES.get(key)
+    if cache is None:
+        cache = _CACHES[key] = ResultCache(*key)
+
+    return cache
+
+# vim:sw=4:ts=4:et:
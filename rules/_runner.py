@@ -0,0 +1,658 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+"""Parallel runner of ansible-lint with the custom rules.
+
+ansible-lint runs the rules for all of the files found in one process. This
+runner partitions the files found by ansiblelint.utils.get_lintables and
+lints them in a pool of processes. Each worker process loads the rules once,
+and returns the errors found as compact picklable objects, and they are
+merged in the same order as ansible-lint does, so that its output is the
+same as the one of ansible-lint.
+
+Usage::
+
+    python -m rules._runner [-j JOBS] [ANSIBLE_LINT_OPTIONS ...] [LINTABLE ...]
+
+The files can be split into N shards to lint them in N nodes. Each node lints
+the files of its shard and saves the results as JSON, and the results are
+merged into one report later::
+
+    # In the K-th node of N nodes:
+    python -m rules._runner --shard K/N --shard-output shard-K.json ...
+
+    # Merge the results of all of the shards:
+    python -m rules._runner --merge shard-1.json ... --merge shard-N.json ...
+
+Or lint only the files changed since the merge base of a base ref and HEAD,
+and the roles of them::
+
+    python -m rules._runner --changed=origin/main ...
+
+.. seealso:: ansiblelint.runner.Runner
+.. seealso:: ansiblelint.__main__.main
+"""
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import operator
+import os
+import pathlib
+import subprocess
+import sys
+import typing
+import warnings
+
+import ansiblelint.__main__
+import ansiblelint.config
+import ansiblelint.errors
+import ansiblelint.rules
+import ansiblelint.runner
+import ansiblelint.utils
+from ansiblelint._internal.rules import LoadingFailureRule
+from ansiblelint.file_utils import Lintable
+from ansiblelint.rules.AnsibleSyntaxCheckRule import AnsibleSyntaxCheckRule
+
+if __package__:
+    from . import _config, _dispatch, _git, _memory, _metrics, _profile
+else:  # Run as a script.
+    from _ansiblelint_custom_rules_ex import (  # type: ignore
+        _config, _dispatch, _git, _memory, _metrics, _profile
+    )
+
+
+DEFAULT_JOBS: int = os.cpu_count() or 1
+
+# The private internals of ansible-lint this module depends on, which are
+# available in ansible-lint 5.x.
+INTERNALS: typing.Tuple[typing.Tuple[typing.Any, str], ...] = (
+    (ansiblelint.runner.Runner, '_emit_matches'),
+    (AnsibleSyntaxCheckRule, '_get_ansible_syntax_check_matches'),
+)
+
+
+def check_internals() -> None:
+    """
+    Check if the ansible-lint installed has the internals this module uses.
+
+    :raises: SystemExit if some of them are missing
+    """
+    missing = [f'{obj.__name__}.{name}' for obj, name in INTERNALS
+               if not callable(getattr(obj, name, None))]
+    if missing:
+        version = getattr(ansiblelint, '__version__', 'unknown')
+        raise SystemExit(f'ansible-lint {version} is not supported, '
+                         f'missing: {", ".join(missing)}')
+
+
+def report_outcome(app: typing.Any, result: typing.Any,
+                   options: argparse.Namespace) -> int:
+    """
+    Report the outcome and get the exit code.
+
+    ansible-lint >= 5.1 has App.report_outcome and older ones have
+    ansiblelint.__main__.report_outcome instead.
+    """
+    if callable(getattr(app, 'report_outcome', None)):
+        return app.report_outcome(result)
+
+    fun = getattr(ansiblelint.__main__, 'report_outcome')
+    return fun(result, options=options)
+
+
+class Target(typing.NamedTuple):
+    """A namedtuple object represents a file to lint in workers.
+    """
+    path: str
+    kind: typing.Optional[str]
+    size: int = 0
+    blob_id: typing.Optional[str] = None  # .. seealso:: rules._git
+
+
+class Result(typing.NamedTuple):
+    """A namedtuple object keeps a MatchError object in compact form.
+    """
+    filename: str
+    linenumber: int
+    column: typing.Optional[int]
+    rule_id: str
+    message: str
+    details: typing.Any
+    tag: typing.Any
+
+
+def dump_match(match: ansiblelint.errors.MatchError) -> Result:
+    """Convert a MatchError object to a Result object."""
+    return Result(
+        str(match.filename), match.linenumber, match.column,
+        str(getattr(match.rule, 'id', '')), str(match.message),
+        match.details, match.tag
+    )
+
+
+def load_match(result: Result,
+               rules: typing.Dict[str, ansiblelint.rules.BaseRule]
+               ) -> ansiblelint.errors.MatchError:
+    """Restore a MatchError object from a Result object.
+
+    :param rules: A mapping object of the IDs and the rules
+    """
+    rule = rules.get(result.rule_id)
+    match = ansiblelint.errors.MatchError(
+        message=result.message, linenumber=result.linenumber,
+        column=result.column, details=result.details,
+        rule=LoadingFailureRule() if rule is None else rule, tag=result.tag
+    )
+    match.filename = result.filename  # Keep it as it is.
+    return match
+
+
+def get_rules_by_id(rules: typing.Iterable[ansiblelint.rules.BaseRule]
+                    ) -> typing.Dict[str, ansiblelint.rules.BaseRule]:
+    """Make a mapping object of the IDs and the rules to restore errors."""
+    res: typing.Dict[str, ansiblelint.rules.BaseRule] = {
+        str(rule.id): rule
+        for rule in (AnsibleSyntaxCheckRule(), LoadingFailureRule())
+    }
+    res.update((str(rule.id), rule) for rule in rules)
+    return res
+
+
+def make_target(lintable: Lintable,
+                blob_ids: typing.Optional[typing.Dict[str, str]] = None
+                ) -> Target:
+    """Make a Target object from a Lintable object.
+
+    :param blob_ids: A mapping object of the paths and the IDs of the blobs
+    """
+    try:
+        size = lintable.path.stat().st_size
+    except OSError:
+        size = 0
+
+    path = str(lintable.filename)
+    return Target(path, lintable.kind, size, (blob_ids or {}).get(path))
+
+
+def to_lintable(target: Target) -> Lintable:
+    """Make a Lintable object from a Target object."""
+    return Lintable(target.path, kind=target.kind)  # type: ignore[arg-type]
+
+
+def partition(targets: typing.Iterable[Target], count: int,
+              key: typing.Callable[[Target], str] = operator.attrgetter('path')
+              ) -> typing.List[typing.List[Target]]:
+    """
+    Partition targets into ``count`` groups of the total sizes balanced.
+    Targets of the same size are ordered by ``key``.
+
+    >>> ts = [Target(n, 'tasks', s) for n, s in (('a', 3), ('b', 1),
+    ...                                          ('c', 2), ('d', 2))]
+    >>> [[t.path for t in g] for g in partition(ts, 2)]
+    [['a', 'b'], ['c', 'd']]
+    """
+    groups: typing.List[typing.List[Target]] = [[] for _ in range(count)]
+    sizes = [0] * count
+
+    # Assign the largest ones first to the group of the smallest total size.
+    for target in sorted(targets, key=lambda t: (-t.size, key(t))):
+        idx = sizes.index(min(sizes))
+        groups[idx].append(target)
+        sizes[idx] += max(target.size, 1)
+
+    return groups
+
+
+# The states of each worker process.
+_WORKER: typing.Dict[str, typing.Any] = {}
+
+
+def load_options(argv: typing.List[str]
+                 ) -> typing.Tuple[argparse.Namespace, typing.Any]:
+    """
+    Load the options of ansible-lint from the arguments and make an App
+    object normalizes some of them.
+
+    .. seealso:: ansiblelint.__main__.main
+    """
+    ansiblelint.__main__.initialize_options(argv)
+    options = ansiblelint.config.options
+    app = ansiblelint.__main__.App(options=options)
+
+    if isinstance(options.tags, str):
+        options.tags = options.tags.split(',')
+
+    # The configuration and the files it gives may be changed since loaded.
+    _config.invalidate()
+    return (options, app)
+
+
+def init_worker(argv: typing.List[str],
+                rules: typing.Optional[ansiblelint.rules.RulesCollection]
+                = None) -> None:
+    """Initialize a worker process to load the options and the rules once.
+    """
+    if rules is None:
+        options, _app = load_options(argv)
+        rules = ansiblelint.rules.RulesCollection(options.rulesdirs)
+
+    _WORKER['rules'] = _dispatch.Dispatcher(rules)
+
+
+def syntax_check(targets: typing.List[Target]) -> typing.List[Result]:
+    """Check the syntax of the playbooks.
+
+    .. seealso:: ansiblelint.runner.Runner.run
+    """
+    return [
+        dump_match(match) for target in targets
+        # pylint: disable=protected-access
+        for match in AnsibleSyntaxCheckRule._get_ansible_syntax_check_matches(
+            to_lintable(target)
+        )
+    ]
+
+
+def lint(targets: typing.List[Target]) -> typing.List[Result]:
+    """Lint the files with the rules loaded in the worker.
+    """
+    options = ansiblelint.config.options
+    rules = _WORKER['rules']
+    _git.register_blob_ids({t.path: t.blob_id for t in targets if t.blob_id})
+
+    return [
+        dump_match(match) for target in targets
+        for match in rules.run(to_lintable(target),
+                               tags=set(options.tags),
+                               skip_list=options.skip_list)
+    ]
+
+
+def run_in_pool(executor: typing.Optional[concurrent.futures.Executor],
+                fun: typing.Callable[[typing.List[Target]],
+                                     typing.List[Result]],
+                targets: typing.List[Target], jobs: int
+                ) -> typing.List[Result]:
+    """Run ``fun`` for the groups of the targets in the pool."""
+    groups = [g for g in partition(targets, jobs) if g]
+    if executor is None:
+        return [res for group in groups for res in fun(group)]
+
+    return [res for results in executor.map(fun, groups) for res in results]
+
+
+class Shard(typing.NamedTuple):
+    """A namedtuple object represents the K-th (1-based) of N shards.
+    """
+    number: int
+    total: int
+
+
+def parse_shard(spec: str) -> Shard:
+    """
+    Parse a string specifies a shard in the form of 'K/N'.
+
+    >>> parse_shard('2/3')
+    Shard(number=2, total=3)
+    >>> parse_shard('4/3')
+    Traceback (most recent call last):
+    ValueError: Invalid shard: 4/3
+    """
+    try:
+        index, count = (int(x) for x in spec.split('/'))
+    except ValueError:
+        raise ValueError(f'Invalid shard: {spec}') from None
+
+    if not 0 < index <= count:
+        raise ValueError(f'Invalid shard: {spec}')
+
+    return Shard(index, count)
+
+
+def shard_key(target: Target) -> str:
+    """
+    Get the stable hash of the path relative to the current dir of the
+    target to order the targets in the same way in any nodes.
+    """
+    relpath = os.path.relpath(os.path.abspath(target.path))
+    return hashlib.sha256(relpath.encode('utf-8')).hexdigest()
+
+
+def select_shard(targets: typing.Iterable[Target],
+                 shard: typing.Optional[Shard]) -> typing.List[Target]:
+    """Select the targets of the shard ``shard``."""
+    if shard is None:
+        return list(targets)
+
+    return partition(targets, shard.total, key=shard_key)[shard.number - 1]
+
+
+class Report(typing.NamedTuple):
+    """A namedtuple object keeps the results of a run in compact form.
+    """
+    syntax_errors: typing.List[Result]
+    matches: typing.List[Result]
+
+    # The names and the kinds of the files linted.
+    files: typing.List[typing.Tuple[str, typing.Optional[str]]]
+
+    # The mapping of the filenames to show as some other names.
+    renames: typing.Dict[str, str]
+
+
+def get_changed_lintables(base: str = 'HEAD'
+                          ) -> typing.Tuple[typing.List[Lintable],
+                                            typing.Dict[str, str]]:
+    """
+    Get the Lintable objects of the files changed since the merge base of
+    ``base`` and HEAD, and the roles of them and the files in the roles, and
+    the IDs of the blobs of them in the git index.
+
+    .. note::
+
+       The files include the changed files, e.g. the tasks files included
+       from the playbooks not in any roles, are not found.
+
+    .. seealso:: rules._git
+    """
+    changes = _git.changed_files(base)
+    roles = sorted(set(
+        role for role in (_git.find_role_dir(c.path) for c in changes)
+        if role and os.path.isdir(role)
+    ))
+    paths = set(c.path for c in changes if c.status != 'D')
+    paths.update(_git.list_files(roles))
+
+    lintables = [
+        lnt for lnt in (Lintable(p) for p in sorted(paths)
+                        if os.path.isfile(p))
+        if lnt.kind
+    ]
+    lintables.extend(Lintable(r, kind='role') for r in roles)
+
+    blob_ids = {c.path: c.blob_id for c in changes if c.blob_id}
+    blob_ids.update(_git.blob_ids(roles))
+
+    return (lintables, blob_ids)
+
+
+def is_excluded(path: str,
+                exclude_paths: typing.Iterable[typing.Union[str, os.PathLike]]
+                ) -> bool:
+    """
+    Test if the path ``path`` is excluded.
+
+    >>> is_excluded('roles/a/tasks/main.yml', ['roles/a'])
+    True
+    >>> is_excluded('roles/a/tasks/main.yml', [pathlib.Path('roles/a')])
+    True
+    >>> is_excluded('a.yml', ['*.yaml'])
+    False
+    >>> is_excluded('', ['.'])
+    False
+
+    .. seealso:: ansiblelint.runner.Runner.is_excluded
+    """
+    if not path:
+        return False
+
+    abs_path = os.path.abspath(path)
+    return any(
+        abs_path.startswith(os.path.abspath(epath)) or
+        pathlib.Path(path).match(os.fspath(epath))
+        for epath in exclude_paths
+    )
+
+
+def make_runner(rules: ansiblelint.rules.RulesCollection,
+                options: argparse.Namespace,
+                lintables: typing.List[Lintable], expand: bool = True
+                ) -> ansiblelint.runner.Runner:
+    """
+    Make a Runner object has the Lintable objects not excluded.
+
+    :param expand: Expand the dirs in ``lintables`` to the files in them
+    """
+    dirs = [] if expand else [lnt for lnt in lintables if lnt.path.is_dir()]
+    runner = ansiblelint.runner.Runner(
+        *(lnt for lnt in lintables if lnt not in dirs), rules=rules,
+        tags=options.tags, skip_list=options.skip_list,
+        exclude_paths=options.exclude_paths, verbosity=options.verbosity
+    )
+    runner.lintables.update(dirs)  # Add them after the expansion.
+    runner.lintables = set(
+        lintable for lintable in runner.lintables
+        if not runner.is_excluded(str(lintable.path.resolve()))
+    )
+    return runner
+
+
+def warn_if_instrumented() -> None:
+    """
+    Warn if the rules are profiled, measured or their memory is accounted,
+    because the results in the worker processes are not collected.
+
+    .. seealso:: rules._profile
+    .. seealso:: rules._metrics
+    .. seealso:: rules._memory
+    """
+    names = [name for name, mod in (('profiling', _profile),
+                                    ('metrics', _metrics),
+                                    ('memory accounting', _memory))
+             if mod.is_enabled()]
+    if names:
+        warnings.warn(f'The results of {", ".join(names)} in the worker '
+                      'processes are not collected. Run it with -j 1 to '
+                      'collect them.')
+
+
+def run(rules: ansiblelint.rules.RulesCollection,
+        options: argparse.Namespace, argv: typing.List[str],
+        jobs: int = DEFAULT_JOBS, shard: typing.Optional[Shard] = None,
+        lintables: typing.Optional[typing.List[Lintable]] = None,
+        blob_ids: typing.Optional[typing.Dict[str, str]] = None
+        ) -> Report:
+    """Lint the files in parallel.
+
+    :param rules: A RulesCollection object
+    :param options: The options of ansible-lint
+    :param argv: The arguments of ansible-lint to initialize workers
+    :param jobs: The number of worker processes; run in this process if < 2
+    :param shard: Lint only the files of this shard if given
+    :param lintables:
+        The Lintable objects to lint instead of the ones found by
+        ansiblelint.utils.get_lintables if given. The dirs in them are not
+        expanded to the files in them.
+    :param blob_ids: A mapping object of the paths and the IDs of the blobs
+
+    .. seealso:: ansiblelint.runner._get_matches
+    .. seealso:: ansiblelint.runner.Runner.run
+    """
+    expand = lintables is None
+    if lintables is None:
+        lintables = ansiblelint.utils.get_lintables(options=options,
+                                                    args=options.lintables)
+    runner = make_runner(rules, options, lintables, expand=expand)
+
+    executor: typing.Optional[concurrent.futures.Executor] = None
+    if jobs > 1:
+        warn_if_instrumented()
+        executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=jobs, initializer=init_worker, initargs=(argv, )
+        )
+    else:
+        init_worker(argv, rules)
+
+    try:
+        files = [lnt for lnt in runner.lintables if lnt.kind == 'playbook']
+        targets = select_shard((make_target(f, blob_ids) for f in files),
+                               shard)
+        syntax_errors = run_in_pool(executor, syntax_check, targets, jobs)
+
+        # Lint the files only if the syntax check passed as ansible-lint does.
+        results: typing.List[Result] = []
+        if not syntax_errors:
+            # Find the children of the files, e.g. the tasks files included.
+            results.extend(
+                dump_match(m) for m
+                in runner._emit_matches(files)  # pylint: disable=W0212
+            )
+
+            targets = select_shard(
+                (make_target(lnt, blob_ids) for lnt in runner.lintables
+                 if lnt.kind),
+                shard
+            )
+            results.extend(run_in_pool(executor, lint, targets, jobs))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    return Report(
+        [r for r in syntax_errors if not runner.is_excluded(r.filename)],
+        [r for r in results if not runner.is_excluded(r.filename)],
+        sorted((str(lnt.name), lnt.kind) for lnt in runner.lintables),
+        {str(lnt.filename): str(lnt.name) for lnt in lintables
+         if lnt.filename != lnt.name}
+    )
+
+
+def merge_reports(reports: typing.Iterable[Report]) -> Report:
+    """Merge the reports of the shards."""
+    syntax_errors: typing.List[Result] = []
+    matches: typing.List[Result] = []
+    files: typing.Set[typing.Tuple[str, typing.Optional[str]]] = set()
+    renames: typing.Dict[str, str] = {}
+
+    for report in reports:
+        syntax_errors.extend(report.syntax_errors)
+        matches.extend(report.matches)
+        files.update((name, kind) for name, kind in report.files)
+        renames.update(report.renames)
+
+    return Report(syntax_errors, matches,
+                  sorted(files, key=lambda f: (f[0], str(f[1]))), renames)
+
+
+def dump_report(report: Report, path: str) -> None:
+    """Save the report as JSON."""
+    with open(path, 'w', encoding='utf-8') as fobj:
+        json.dump(report._asdict(), fobj, default=str)
+
+
+def load_report(path: str) -> Report:
+    """Load the report saved as JSON."""
+    with open(path, encoding='utf-8') as fobj:
+        data = json.load(fobj)
+
+    return Report(
+        [Result(*r) for r in data['syntax_errors']],
+        [Result(*r) for r in data['matches']],
+        [(name, kind) for name, kind in data['files']],
+        data['renames']
+    )
+
+
+def to_lint_result(report: Report,
+                   rules: typing.Iterable[ansiblelint.rules.BaseRule]
+                   ) -> ansiblelint.runner.LintResult:
+    """
+    Restore the errors in the report and sort them as ansible-lint does.
+
+    .. seealso:: ansiblelint.runner._get_matches
+    """
+    rules_by_id = get_rules_by_id(rules)
+
+    # The errors other than the ones of the syntax check are ignored if any.
+    results = report.syntax_errors or report.matches
+    matches = sorted(set(load_match(r, rules_by_id) for r in results))
+    for match in matches:
+        match.filename = report.renames.get(match.filename, match.filename)
+
+    files = set(
+        to_lintable(Target(name, kind)) for name, kind in report.files
+    )
+    return ansiblelint.runner.LintResult(matches=matches, files=files)
+
+
+def get_matches(rules: ansiblelint.rules.RulesCollection,
+                options: argparse.Namespace, argv: typing.List[str],
+                jobs: int = DEFAULT_JOBS
+                ) -> ansiblelint.runner.LintResult:
+    """Lint the files in parallel.
+
+    .. seealso:: run
+    """
+    return to_lint_result(run(rules, options, argv, jobs), rules)
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> int:
+    """Entry point.
+
+    .. seealso:: ansiblelint.__main__.main
+    """
+    psr = argparse.ArgumentParser(add_help=False)
+    psr.add_argument('-j', '--jobs', type=int, default=DEFAULT_JOBS,
+                     help='The number of worker processes [%(default)s]')
+    psr.add_argument('--shard', type=parse_shard, metavar='K/N',
+                     help='Lint only the files of the K-th of N shards and '
+                          'save the results as JSON')
+    psr.add_argument('--shard-output', metavar='PATH',
+                     help='The path to save the results of the shard '
+                          '[ansible-lint-shard-K-of-N.json]')
+    psr.add_argument('--changed', nargs='?', const='HEAD', metavar='BASE',
+                     help='Lint only the files changed since the merge base '
+                          'of BASE and HEAD, and the roles of them. '
+                          'Give BASE as --changed=BASE [HEAD]')
+    psr.add_argument('--merge', action='append', metavar='PATH',
+                     help='Merge the results of the shards and report them '
+                          'instead of linting the files. It can be given '
+                          'multiple times.')
+    args, rest = psr.parse_known_args(sys.argv[1:] if argv is None else argv)
+    check_internals()
+
+    # pylint: disable=import-outside-toplevel
+    from ansiblelint.color import console_options, reconfigure
+
+    options, app = load_options(rest)
+    console_options['force_terminal'] = options.colored
+    reconfigure(console_options)
+    ansiblelint.__main__.initialize_logger(options.verbosity)
+
+    ansiblelint.__main__.prepare_environment()
+    ansiblelint.__main__.check_ansible_presence(exit_on_error=True)
+
+    rules = ansiblelint.rules.RulesCollection(options.rulesdirs)
+    if args.merge:
+        report = merge_reports(load_report(path) for path in args.merge)
+    elif args.changed:
+        try:
+            lintables, blob_ids = get_changed_lintables(args.changed)
+        except (OSError, subprocess.CalledProcessError) as exc:
+            raise SystemExit(
+                f'Failed to find the files changed: {exc!s} '
+                f'{getattr(exc, "stderr", "") or ""}'.rstrip()
+            )
+
+        report = run(rules, options, rest, args.jobs, args.shard,
+                     lintables=lintables, blob_ids=blob_ids)
+    else:
+        report = run(rules, options, rest, args.jobs, args.shard)
+
+    if args.shard:
+        shard = args.shard
+        dump_report(report, args.shard_output or
+                    f'ansible-lint-shard-{shard.number}-of-{shard.total}.json')
+        return 0
+
+    result = to_lint_result(report, rules)
+    app.render_matches(result.matches)
+
+    return report_outcome(app, result, options)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+# vim:sw=4:ts=4:et:
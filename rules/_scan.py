@@ -0,0 +1,288 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+"""Single pass line scanner shared by the line-oriented rules.
+
+Rules register the patterns of lines they look for with names, and all of the
+registered patterns are combined into one regex to scan each file only once
+for all of them. The file is scanned in chunks of lines with mmap without
+reading and decoding its whole content, and the lines are counted in the same
+pass.
+
+The scan stops as soon as the caller has its answer, e.g. the patterns it
+looks for were found or the number of lines exceeded the limit, and the state
+of the scan is kept keyed by the path, mtime and size of the file to resume it
+for other rules need more of the file later.
+
+The text of the file is scanned instead if ansible-lint or the shared content
+cache has loaded it already (.. seealso:: rules._content).
+
+Patterns must match from the beginning of lines, must not match newline
+characters and must consist of ASCII characters to match the bytes too.
+"""
+import collections
+import functools
+import mmap
+import os
+import re
+import threading
+import typing
+
+from . import _content
+
+
+# The size of chunks of the file to scan. Chunks are extended to the end of
+# the lines at the end of them.
+CHUNK_SIZE: int = 1024 * 1024
+
+# The max number of the states of the scans kept.
+MAX_STATES: int = 1024
+
+# The BOM of UTF-8 may be at the beginning of the data.
+BOM: str = '\ufeff'
+
+# Registered patterns: {name: pattern}
+PATTERNS: typing.Dict[str, str] = {}
+
+_LOCK = threading.Lock()
+
+
+class Result(typing.NamedTuple):
+    """A namedtuple object to keep the results of the scan.
+
+    ``nlines`` is the lower bound of the number of lines if ``exact`` is False
+    because the scan was stopped early. ``found`` maps the names of the
+    patterns to the line numbers (1-based) where each of them matched first
+    or None if not found.
+    """
+    nlines: int
+    exact: bool
+    found: typing.Dict[str, typing.Optional[int]]
+
+
+def register(name: str, pattern: str) -> None:
+    """Register the pattern ``pattern`` of lines with the name ``name``.
+
+    :param name: A name of the pattern, must be a valid python identifier
+    :param pattern: A regex pattern matches from the beginning of lines
+    :raises: ValueError if the name is invalid or used for other pattern
+    """
+    if not name.isidentifier():
+        raise ValueError(f'Invalid pattern name: {name}')
+
+    re.compile(pattern)  # Raise re.error early if it's invalid.
+    with _LOCK:
+        if PATTERNS.get(name, pattern) != pattern:
+            raise ValueError(f'Pattern named {name} was registered already')
+
+        PATTERNS[name] = pattern
+
+
+@functools.lru_cache(maxsize=None)
+def compile_patterns(names: typing.Tuple[str, ...], binary: bool = False
+                     ) -> typing.Tuple[typing.Pattern,
+                                       typing.Dict[str, typing.Pattern]]:
+    """Compile the patterns of ``names`` into one and each of them.
+
+    :param binary: Compile them to match bytes if True
+    """
+    pairs = [(name, f'^(?:{PATTERNS[name]})') for name in names]
+    combined = '|'.join(f'(?P<{name}>{pattern})' for name, pattern in pairs)
+
+    def _compile(pattern: str) -> typing.Pattern:
+        return re.compile(pattern.encode('ascii') if binary else pattern,
+                          re.MULTILINE)
+
+    return (_compile(combined),
+            {name: _compile(pattern) for name, pattern in pairs})
+
+
+class State:
+    """The state of the scan of a file may be resumed.
+    """
+    def __init__(self, names: typing.Iterable[str]) -> None:
+        """Initialize.
+
+        :param names: Names of the patterns to look for
+        """
+        self.lock = threading.Lock()
+        self.offset = 0
+        self.nlines = 0
+        self.done = False
+        self.found: typing.Dict[str, typing.Optional[int]] = {
+            name: None for name in names
+        }
+
+    def answered(self, names: typing.Iterable[str],
+                 limit: typing.Optional[int] = None,
+                 count: bool = False) -> bool:
+        """
+        Test if the scan has found all of the patterns ``names`` and counted
+        the lines enough.
+
+        :param limit: The scan can stop if the number of lines exceeded it
+        :param count: The lines must be counted if True
+        """
+        if self.done:
+            return True
+
+        if any(self.found[name] is None for name in names):
+            return False
+
+        return not count or (limit is not None and self.nlines > limit)
+
+    def result(self, names: typing.Iterable[str]) -> Result:
+        """Make the results of the scan of the patterns ``names``.
+        """
+        return Result(self.nlines, self.done,
+                      {name: self.found[name] for name in names})
+
+    def scan(self, data: typing.Any, size: int, names: typing.Iterable[str],
+             limit: typing.Optional[int] = None, count: bool = False
+             ) -> None:
+        """Scan the data ``data`` from the offset scanned already.
+
+        .. seealso:: State.answered
+        """
+        names = list(names)
+        binary = not isinstance(data, str)
+        newline: typing.Any = b'\n' if binary else '\n'
+
+        bom: typing.Any = BOM.encode('utf-8') if binary else BOM
+        if not self.offset and data[:len(bom)] == bom:
+            self.offset = len(bom)
+
+        while self.offset < size and not self.answered(names, limit, count):
+            start = self.offset
+            end = min(start + CHUNK_SIZE, size)
+            if end < size:
+                end = data.find(newline, end - 1) + 1 or size
+
+            chunk = data[start:end]
+            pending = tuple(n for n in self.found if self.found[n] is None)
+            if pending:
+                self._search(chunk, pending, binary, newline)
+
+            self.nlines += chunk.count(newline)
+            self.offset = end
+
+        if self.offset >= size and not self.done:
+            self.done = True
+            if size and data[size - 1:size] != newline:
+                self.nlines += 1  # The last line without a newline.
+
+    def _search(self, chunk: typing.Any, pending: typing.Tuple[str, ...],
+                binary: bool, newline: typing.Any) -> None:
+        """Search the lines match the patterns ``pending`` in the chunk.
+        """
+        (regex, regexes) = compile_patterns(pending, binary)
+        remains = set(pending)
+        (lineno, prev) = (self.nlines + 1, 0)
+
+        for match in regex.finditer(chunk):
+            start = match.start()
+            lineno += chunk.count(newline, prev, start)
+            prev = start
+
+            # The patterns other than the one matched may match the same line.
+            for name in list(remains):
+                if name == match.lastgroup or regexes[name].match(chunk,
+                                                                  start):
+                    self.found[name] = lineno
+                    remains.discard(name)
+
+            if not remains:
+                break
+
+
+_STATES: typing.Dict[typing.Tuple[str, int, int], State] = \
+    collections.OrderedDict()
+
+
+def scan_data(data: typing.Union[str, bytes],
+              names: typing.Iterable[str] = (),
+              limit: typing.Optional[int] = None, count: bool = False
+              ) -> Result:
+    r"""Scan the text or bytes ``data`` on memory.
+
+    >>> register('test_scan_data', r'[ ]*foo:')
+    >>> scan_data('a: 1\n  foo: 2\nfoo: 3\n', ['test_scan_data'])
+    Result(nlines=3, exact=True, found={'test_scan_data': 2})
+    >>> scan_data(b'a: 1\n  foo: 2\nfoo: 3', count=True)
+    Result(nlines=3, exact=True, found={})
+
+    .. seealso:: scan
+    """
+    names = list(names)
+    state = State(names)
+    state.scan(data, len(data), names, limit, count)
+
+    return state.result(names)
+
+
+def get_state(path: str, stat: os.stat_result,
+              names: typing.Iterable[str]) -> State:
+    """Get the state of the scan of the file kept or a new one.
+    """
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    with _LOCK:
+        state = _STATES.get(key)
+        if state is None or any(n not in state.found for n in names):
+            state = _STATES[key] = State(PATTERNS)
+            while len(_STATES) > MAX_STATES:
+                _STATES.popitem(last=False)  # type: ignore
+        else:
+            _STATES.move_to_end(key)  # type: ignore
+
+    return state
+
+
+def scan(file: '_content.PathOrLintable', names: typing.Iterable[str] = (),
+         limit: typing.Optional[int] = None, count: bool = False) -> Result:
+    """Scan the file ``file`` to find the lines match the patterns.
+
+    The file is scanned for all of the registered patterns at once, and the
+    scan stops as soon as all of the patterns ``names`` were found and the
+    lines were counted enough if ``count``.
+
+    :param file: A path or a Lintable object
+    :param names: Names of the patterns to look for
+    :param limit: The counting can stop if the number of lines exceeded it
+    :param count: Count the lines if True
+    :raises: OSError if failed to stat or read the file
+    """
+    names = list(names)
+
+    # .. seealso:: ansiblelint.file_utils.Lintable.content
+    text = getattr(file, '_content', None)
+    if isinstance(text, str):
+        return scan_data(text, names, limit, count)
+
+    content = _content.CACHE.peek(file)
+    if content is not None:
+        return scan_data(content.text, names, limit, count)
+
+    path = os.path.abspath(os.fspath(getattr(file, 'path', file)))
+    stat = os.stat(path)
+    state = get_state(path, stat, names)
+
+    with state.lock:
+        if not state.answered(names, limit, count):
+            if not stat.st_size:
+                state.scan(b'', 0, names, limit, count)
+            else:
+                with open(path, mode='rb') as fobj:
+                    with mmap.mmap(fobj.fileno(), 0,
+                                   access=mmap.ACCESS_READ) as fmap:
+                        state.scan(fmap, stat.st_size, names, limit, count)
+
+        return state.result(names)
+
+
+def clear() -> None:
+    """Clear the states of the scans kept.
+    """
+    with _LOCK:
+        _STATES.clear()
+
+# vim:sw=4:ts=4:et:
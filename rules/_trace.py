@@ -0,0 +1,184 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+"""Compact structured tracing of what ansible-lint gives the rules.
+
+The events are kept in a bounded ring buffer, that is, only the latest ones
+are kept if there are too many, and they are written at exit as JSON lines
+to a file or stderr. Each event looks like this::
+
+    {"ts":1634567890.1,"pid":123,"file":"roles/a/tasks/main.yml",
+     "kind":"tasks","hook":"matchtask","duration":0.0001,"size":4}
+
+Files are sampled at the rate given, and the events of the files not sampled
+are not recorded at all. The last line written is a summary of the numbers of
+events recorded, dropped from the buffer and files skipped by the sampling.
+
+.. seealso:: rules.DebugRule
+"""
+import atexit
+import collections
+import json
+import os
+import random
+import sys
+import threading
+import time
+import typing
+
+if typing.TYPE_CHECKING:
+    from ansiblelint.file_utils import Lintable
+
+
+DEFAULT_SAMPLE_RATE: float = 1.0
+DEFAULT_BUFFER_SIZE: int = 10000
+
+# The keys of the events.
+KEYS: typing.Tuple[str, ...] = ('ts', 'pid', 'file', 'kind', 'hook',
+                                'duration', 'size')
+
+
+def to_json(event: typing.Dict[str, typing.Any]) -> str:
+    """
+    Convert an event to a compact JSON string.
+
+    >>> to_json(dict(hook='matchtask', size=4))
+    '{"hook":"matchtask","size":4}'
+    """
+    return json.dumps(event, separators=(',', ':'), default=str)
+
+
+class Tracer:
+    """A tracer keeps the events in a ring buffer and writes them at once.
+    """
+    def __init__(self, path: typing.Optional[str] = None,
+                 sample_rate: float = DEFAULT_SAMPLE_RATE,
+                 buffer_size: int = DEFAULT_BUFFER_SIZE,
+                 seed: typing.Optional[int] = None):
+        """Initialize.
+
+        :param path: The path of the file to append the events or None to
+            write them to stderr
+        :param sample_rate: The rate of the files to trace in (0.0, 1.0]
+        :param buffer_size: The max number of the events to keep
+        :param seed: The seed of the sampling for tests
+        """
+        self.path = path
+        self.sample_rate = sample_rate
+        # The numbers of the events recorded, dropped from the buffer and the
+        # files skipped by the sampling.
+        self._counts: typing.Counter[str] = collections.Counter()
+        self._events: typing.Deque[typing.Tuple[typing.Any, ...]] = \
+            collections.deque(maxlen=buffer_size)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def buffer_size(self) -> int:
+        """The max number of the events to keep."""
+        return typing.cast(int, self._events.maxlen)
+
+    def sample(self) -> bool:
+        """Decide whether to trace the next file or not."""
+        if self.sample_rate >= 1.0 or \
+                self._random.random() < self.sample_rate:
+            return True
+
+        with self._lock:
+            self._counts['skipped'] += 1
+        return False
+
+    def add(self, file: 'Lintable', hook: str, duration: float,
+            size: typing.Optional[int] = None) -> None:
+        """Record an event of the hook ``hook`` called for ``file``."""
+        event = (time.time(), str(file.name), str(file.kind), hook, duration,
+                 size)
+        with self._lock:
+            if len(self._events) == self.buffer_size:
+                self._counts['dropped'] += 1
+            self._events.append(event)
+            self._counts['recorded'] += 1
+
+    def _events_unlocked(self) -> typing.List[typing.Dict[str, typing.Any]]:
+        """Get the events kept in the buffer without the lock."""
+        pid = os.getpid()
+        return [dict(zip(KEYS, event[:1] + (pid, ) + event[1:]))
+                for event in self._events]
+
+    def _summary_unlocked(self) -> typing.Dict[str, typing.Any]:
+        """Get the summary of the events without the lock."""
+        return {'ts': time.time(), 'pid': os.getpid(), 'hook': 'summary',
+                **{key: self._counts[key]
+                   for key in ('recorded', 'dropped', 'skipped')}}
+
+    def events(self) -> typing.List[typing.Dict[str, typing.Any]]:
+        """Get the events kept in the buffer."""
+        with self._lock:
+            return self._events_unlocked()
+
+    def summary(self) -> typing.Dict[str, typing.Any]:
+        """Get the summary of the events."""
+        with self._lock:
+            return self._summary_unlocked()
+
+    def flush(self) -> int:
+        """
+        Write the events kept and the summary, and clear the buffer.
+
+        The events and the summary are taken and cleared at once not to lose
+        the events recorded while writing them.
+
+        :return: The number of the events written
+        """
+        with self._lock:
+            events = self._events_unlocked()
+            if not events and not self._counts['skipped']:
+                return 0
+
+            summary = self._summary_unlocked()
+            self._events.clear()
+            self._counts.clear()
+
+        lines = [to_json(e) for e in events] + [to_json(summary)]
+        content = '\n'.join(lines) + '\n'
+        if self.path:
+            # Write at once to append not to be mixed with others' lines.
+            with open(self.path, mode='a', encoding='utf-8') as fobj:
+                fobj.write(content)
+        else:
+            sys.stderr.write(content)
+
+        return len(events)
+
+
+_TRACERS: typing.Dict[typing.Tuple[typing.Any, ...], Tracer] = {}
+_LOCK = threading.Lock()
+
+
+def get_tracer(path: typing.Optional[str] = None,
+               sample_rate: float = DEFAULT_SAMPLE_RATE,
+               buffer_size: int = DEFAULT_BUFFER_SIZE) -> Tracer:
+    """Get the tracer shared by the rules traces with the same options."""
+    key = (path, sample_rate, buffer_size)
+    with _LOCK:
+        tracer = _TRACERS.get(key)
+        if tracer is None:
+            if not _TRACERS:
+                atexit.register(flush_all)
+            tracer = _TRACERS[key] = Tracer(path, sample_rate, buffer_size)
+
+    return tracer
+
+
+def flush_all() -> None:
+    """Write the events of all of the tracers."""
+    with _LOCK:
+        tracers = list(_TRACERS.values())
+
+    for tracer in tracers:
+        try:
+            tracer.flush()
+        except OSError as exc:
+            sys.stderr.write(f'Failed to write the trace: {exc!s}\n')
+
+# vim:sw=4:ts=4:et:
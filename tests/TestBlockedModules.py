@@ -6,10 +6,75 @@
 # pylint: disable=missing-function-docstring
 """Test cases for the rule, BlockedModules.
 """
+import pytest
+
 from rules import BlockedModules as TT
 from tests import common
 
 
+def test_make_args_matcher():
+    with pytest.warns(UserWarning):
+        matcher = TT.make_args_matcher(['(', r'rm\s+-rf', 'curl'])
+
+    assert matcher.patterns == (r'rm\s+-rf', 'curl')
+    assert matcher.search('curl https://example.com') == 'curl'
+    assert matcher.search('ls /tmp') is None
+
+
+def test_make_args_matcher_no_valid_patterns():
+    with pytest.warns(UserWarning):
+        assert TT.make_args_matcher(['(']) is None
+
+
+@pytest.mark.parametrize(
+    'patterns,text,expected',
+    ((['(?i)rm -rf'], 'RM -RF /', '(?i)rm -rf'),
+     (['curl', r'(a)\1'], 'xaa', r'(a)\1'),
+     (['curl', r'(a)\1'], 'curl -O', 'curl'),
+     (['curl', r'(a)\1'], 'xa', None),
+     )
+)
+def test_make_args_matcher_not_combinable(patterns, text, expected):
+    matcher = TT.make_args_matcher(patterns)
+    assert matcher.regex is None
+    assert matcher.search(text) == expected
+
+
+@pytest.mark.parametrize(
+    'blocked_args,expected',
+    (({'shell': 'rm -rf'}, ('rm -rf', )),
+     ({'shell': ['rm -rf'], 'ansible.builtin.shell': 'curl'},
+      ('rm -rf', 'curl')),
+     )
+)
+def test_make_options_blocked_args(blocked_args, expected):
+    rule = TT.BlockedModules()
+    opts = rule.make_options({TT.C_BLOCKED_ARGS: blocked_args})
+    assert opts.args_matchers['ansible.builtin.shell'].patterns == expected
+
+
+def test_make_options_invalid_blocked_args():
+    rule = TT.BlockedModules()
+    with pytest.warns(UserWarning):
+        opts = rule.make_options({TT.C_BLOCKED_ARGS: {'shell': 1}})
+
+    assert not opts.args_matchers
+
+
+@pytest.mark.parametrize(
+    'action,expected',
+    ((dict(__ansible_module__='shell', _raw_params='ls', chdir='/tmp',
+           creates=None),
+      'ls\n/tmp'),
+     (dict(__ansible_module__='shell', __ansible_arguments__=['ls', '/tmp'],
+           chdir='/'),
+      'ls /tmp\n/'),
+     )
+)
+def test_get_args_text(action, expected):
+    assert TT.get_args_text(action) == expected
+
+
 class Base(common.Base):
     this_mod: common.MaybeModT = TT
 
@@ -6,14 +6,38 @@
 # pylint: disable=missing-function-docstring
 """Test cases for the rule, DebugRule.
 """
+import json
 import os
+import unittest
 import unittest.mock
 
+import ansiblelint.config
 import pytest
 
-from rules import DebugRule as TT
+from ansiblelint.file_utils import Lintable
+
+from rules import DebugRule as TT, _trace
 from tests import common
 
+# DebugRule does not report any errors.
+NO_FAILURES: str = 'DebugRule never fails'
+
+
+@pytest.fixture(autouse=True)
+def fixture_trace_path(tmp_path, monkeypatch):
+    """
+    Write the events traced to a file in ``tmp_path`` instead of stderr if
+    the path is not given in the test data, e.g. tests/res/DebugRule/ok/*/.
+
+    The path is given by the environment variable, and the configuration
+    too because the environment is replaced if the test data has env.json.
+    """
+    path = tmp_path / 'trace.jsonl'
+    monkeypatch.setenv(TT.E_PATH_VAR, str(path))
+    monkeypatch.setitem(ansiblelint.config.options.rules, TT.ID,
+                        {TT.C_PATH: str(path)})
+    return path
+
 
 @pytest.mark.parametrize(
     ('env', 'exp'),
@@ -27,6 +51,65 @@ def test_is_enabled(env, exp):
         assert TT.is_enabled() == exp
 
 
+@pytest.mark.parametrize(
+    ('config', 'exp'),
+    (({}, TT.Options(False)),
+     ({'enabled': True, 'path': 'a.jsonl', 'sample_rate': '0.5',
+       'buffer_size': 10},
+      TT.Options(True, 'a.jsonl', 0.5, 10)),
+     )
+)
+def test_make_options(config, exp):
+    assert TT.DebugRule().make_options(config) == exp
+
+
+@pytest.mark.parametrize(
+    'config',
+    ({'sample_rate': 0, 'buffer_size': -1},
+     {'sample_rate': 'x', 'buffer_size': 'y'},
+     )
+)
+def test_make_options_invalid_values(config):
+    with pytest.warns(UserWarning):
+        assert TT.DebugRule().make_options(config) == TT.Options(False)
+
+
+def test_getmatches(tmp_path, monkeypatch):
+    path = tmp_path / 'trace.jsonl'
+    monkeypatch.setenv(TT.E_ENABLED_VAR, '1')
+    monkeypatch.setenv(TT.E_PATH_VAR, str(path))
+
+    playbook = tmp_path / 'playbook.yml'
+    playbook.write_text("""\
+- hosts: localhost
+  tasks:
+    - name: Try ping
+      ping:
+""")
+    rule = TT.DebugRule()
+    assert rule.getmatches(Lintable(str(playbook), kind='playbook')) == []
+    assert rule.tracer().flush() > 1
+
+    events = [json.loads(line) for line in path.read_text().splitlines()]
+    hooks = [e['hook'] for e in events]
+    assert hooks[-2:] == ['getmatches', 'summary']
+    assert 'matchtask' in hooks
+    assert events[-2]['size'] == playbook.stat().st_size
+    assert all(e['kind'] == 'playbook' for e in events[:-1])
+
+
+def test_getmatches_disabled(tmp_path, monkeypatch):
+    monkeypatch.delenv(TT.E_ENABLED_VAR, raising=False)
+    monkeypatch.setenv(TT.E_PATH_VAR, str(tmp_path / 'trace.jsonl'))
+
+    rule = TT.DebugRule()
+    playbook = tmp_path / 'playbook.yml'
+    playbook.write_text('- hosts: localhost\n')
+    assert rule.getmatches(Lintable(str(playbook), kind='playbook')) == []
+    assert rule.tracer().events() == []
+    assert isinstance(rule.tracer(), _trace.Tracer)
+
+
 class Base(common.Base):
     this_mod: common.MaybeModT = TT
 
@@ -55,8 +138,23 @@ class RuleTestCase(common.RuleTestCase):
     def test_clear_fns(self):
         fns = self.base.clear_fns
         self.assertTrue(fns)
-        self.assertTrue(len(fns) > 1)
+
+    @unittest.skip(NO_FAILURES)
+    def test_failure_cases_only_with_the_rule(self):
+        pass
+
+    @unittest.skip(NO_FAILURES)
+    def test_failure_cases_with_other_rules(self):
+        pass
 
 
 class CliTestCase(common.CliTestCase):
     base_cls = Base
+
+    @unittest.skip(NO_FAILURES)
+    def test_failure_cases_only_with_the_rule(self):
+        pass
+
+    @unittest.skip(NO_FAILURES)
+    def test_failure_cases_with_other_rules(self):
+        pass
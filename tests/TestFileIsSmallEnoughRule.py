@@ -6,20 +6,79 @@
 # pylint: disable=missing-function-docstring
 """Test cases for the rule.
 """
+import ansiblelint.config
 import pytest
 
-from rules import FileIsSmallEnoughRule as TT
+from ansiblelint.file_utils import Lintable
+
+from rules import FileIsSmallEnoughRule as TT, _content, _scan
 from tests import common
 
 
 @pytest.mark.parametrize(
-    'max_lines,expected',
-    [(100000, False),
-     (1, True),
+    'content,limit,expected',
+    [('', None, TT.LineCount(0)),
+     ('a', None, TT.LineCount(1)),
+     ('a\nb\n', None, TT.LineCount(2)),
+     ('a\n' * 10 + 'b', None, TT.LineCount(11)),
+     ('a\n' * 10, 5, TT.LineCount(6, False)),
+     ('a\n' * 10, 9, TT.LineCount(10)),
+     ('a\n' * 10, 10, TT.LineCount(10)),
+     ]
+)
+def test_count_lines_in_chunks(content, limit, expected, tmp_path,
+                               monkeypatch):
+    monkeypatch.setattr(_scan, 'CHUNK_SIZE', 3)
+    path = tmp_path / 'a.yml'
+    path.write_text(content)
+
+    assert TT.count_lines(path, limit) == expected
+    assert TT.count_lines(str(path), limit) == expected
+    assert _content.CACHE.peek(path) is None  # Not read into the cache.
+
+
+@pytest.mark.parametrize(
+    'content,limit,expected',
+    [('', None, TT.LineCount(0)),
+     ('a\n' * 10 + 'b', None, TT.LineCount(11)),
+     ('a\n' * 10, 5, TT.LineCount(10)),
+     ]
+)
+def test_count_lines(content, limit, expected, tmp_path):
+    path = tmp_path / 'a.yml'
+    path.write_text(content)
+
+    assert TT.count_lines(path, limit) == expected
+    assert TT.count_lines(str(path), limit) == expected
+
+
+def test_count_lines_of_the_text_loaded(tmp_path, monkeypatch):
+    path = tmp_path / 'a.yml'
+    path.write_text('a\n' * 10)
+    monkeypatch.setattr(_scan.mmap, 'mmap', None)  # Must not be used.
+
+    _content.load(path)
+    assert TT.count_lines(path, 5) == TT.LineCount(10)
+
+    lintable = Lintable(str(tmp_path / 'b.yml'), content='a\nb\n')
+    assert TT.count_lines(lintable, 1) == TT.LineCount(2)
+
+
+@pytest.mark.parametrize(
+    'content,config,expected',
+    [('a: 1\n', {}, None),
+     ('a: 1\n' * 3, dict(max_lines=2), '3 lines > 2'),
+     ('a: 1\n' * 3, dict(max_bytes=10), '15 bytes > 10'),
+     ('a: 1\n' * 3, dict(max_lines=3, max_bytes=15), None),
      ]
 )
-def test_exceeds_max_lines(max_lines, expected):
-    assert TT.exceeds_max_lines(__file__, max_lines) == expected
+def test_check_size(content, config, expected, tmp_path, monkeypatch):
+    rule = TT.FileIsSmallEnoughRule()
+    monkeypatch.setitem(ansiblelint.config.options.rules, rule.id, config)
+    path = tmp_path / 'a.yml'
+    path.write_text(content)
+
+    assert rule.check_size(str(path)) == expected
 
 
 class Base(common.Base):
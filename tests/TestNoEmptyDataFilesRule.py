@@ -6,9 +6,13 @@
 # pylint: disable=missing-function-docstring
 """Test cases for the rule.
 """
+import unittest.mock
+
 import pytest
 
-from rules import NoEmptyDataFilesRule as TT
+from ansiblelint.file_utils import Lintable
+
+from rules import NoEmptyDataFilesRule as TT, _content
 from tests import common
 
 
@@ -17,7 +21,14 @@ from tests import common
     (('', False),
      ('---\n', False),
      ('---\n{}\n', False),
+     ('---\n[]\n', False),
+     ('---\n# comment\n\n...\n', False),
+     ('---\nfalse\n', False),
      ('---\na: 1\n', True),
+     ('---\n- a\n', True),
+     ('---\nfoo\n', True),
+     ('---\n- a\n---\n- b\n', True),
+     ('---\na: [\n', True),  # Innocent until proven guilty.
      )
 )
 def test_yml_file_has_some_data(content, expected, tmp_path):
@@ -25,7 +36,28 @@ def test_yml_file_has_some_data(content, expected, tmp_path):
     path.write_text(content)
 
     assert TT.yml_file_has_some_data(str(path)) == expected
-    TT.yml_file_has_some_data.cache_clear()
+    assert _content.CACHE.peek(path) is None  # Not read into the cache.
+
+
+@pytest.mark.parametrize(
+    ('content', 'expected'),
+    (('---\n{}\n', False),
+     ('---\na: 1\n', True),
+     )
+)
+def test_yml_file_has_some_data_of_the_text_loaded(content, expected,
+                                                   tmp_path):
+    path = tmp_path / 'test.yml'
+    path.write_text('---\n# The content on disk is not used.\n')
+
+    lintable = Lintable(str(path), content=content)
+    assert TT.yml_file_has_some_data(lintable) == expected
+
+
+def test_matchlines_skipped_without_match():
+    file = unittest.mock.MagicMock()
+    assert TT.NoEmptyDataFilesRule().matchlines(file) == []
+    file.content.split.assert_not_called()
 
 
 class Base(common.Base):
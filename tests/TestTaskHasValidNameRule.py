@@ -39,6 +39,58 @@ def test_is_invalid_task_name(name, evalue, expected, monkeypatch):
     assert rule.is_invalid_task_name(name) == expected
 
 
+@pytest.mark.parametrize(
+    ('name', 'expected'),
+    (('Ensure foo is installed', True),
+     ('ENSURE foo is installed', True),
+     ('ensure  foo', True),
+     ('', False),
+     ('Ensure', False),
+     ('Ensures foo is installed', False),
+     (' Ensure foo is installed', False),
+     ('Ensure foo is installed ', False),
+     )
+)
+def test_starts_with_verb(name, expected):
+    assert TT.starts_with_verb(name) == expected
+
+
+def test_load_verbs(tmp_path):
+    path = tmp_path / 'verbs.txt'
+    path.write_text('# Verbs\nFoo bar\n  baz\n')
+
+    assert TT.load_verbs(str(path)) == frozenset('foo bar baz'.split())
+
+    path.write_bytes('Überprüfe\n'.encode('utf-8'))
+    assert TT.load_verbs(str(path)) == frozenset(['überprüfe'])
+
+
+@pytest.mark.parametrize(
+    ('name', 'expected'),
+    (('Foo the bar', False),
+     ('Ensure foo is installed', True),
+     )
+)
+def test_is_invalid_task_name_with_verbs_file(name, expected, tmp_path,
+                                              monkeypatch):
+    path = tmp_path / 'verbs.txt'
+    path.write_text('foo bar\n')
+    monkeypatch.setitem(
+        ansiblelint.config.options.rules, TT.ID,
+        dict(verbs_file=str(path))
+    )
+    assert Base().rule.is_invalid_task_name(name) == expected
+
+
+def test_is_invalid_task_name_with_missing_verbs_file(tmp_path, monkeypatch):
+    monkeypatch.setitem(
+        ansiblelint.config.options.rules, TT.ID,
+        dict(verbs_file=str(tmp_path / 'not_exist.txt'))
+    )
+    with pytest.warns(UserWarning):
+        assert not Base().rule.is_invalid_task_name(VALID_NAME_0)
+
+
 class Base(common.Base):
     this_mod: common.MaybeModT = TT
 
@@ -6,10 +6,72 @@
 # pylint: disable=too-few-public-methods
 """Test cases for the rule, VarsInVarsFilesHaveValidNamesRule.
 """
+import ansiblelint.config
+import pytest
+import yaml
+
+from ansiblelint.file_utils import Lintable
+
 from rules import VarsInVarsFilesHaveValidNamesRule as TT
 from tests import common
 
 
+VARS_0 = """\
+---
+a: 1
+b:
+  c: {d: 1}
+  e:
+    - f: 1
+      g: [1, 2]
+? [h, i]
+: 1
+base: &base
+  j: 1
+k:
+  <<: *base
+  l: 2
+"""
+
+
+@pytest.mark.parametrize(
+    ('max_depth', 'expected'),
+    ((1, [('a', 2), ('b', 3), ('base', 10), ('k', 12)]),
+     (2, [('a', 2), ('b', 3), ('c', 4), ('e', 5), ('base', 10), ('j', 11),
+          ('k', 12), ('l', 14)]),
+     (0, [('a', 2), ('b', 3), ('c', 4), ('d', 4), ('e', 5), ('f', 6),
+          ('g', 7), ('base', 10), ('j', 11), ('k', 12), ('l', 14)]),
+     )
+)
+def test_each_keys_in_stream(max_depth, expected):
+    assert list(TT.each_keys_in_stream(VARS_0, max_depth)) == expected
+
+
+def test_each_keys_in_stream_errors():
+    with pytest.raises(yaml.YAMLError):
+        list(TT.each_keys_in_stream('a: [\n'))
+
+
+@pytest.mark.parametrize(
+    ('config', 'nmatches', 'last_details'),
+    ((dict(), 2, 'foo.0'),
+     (dict(max_errors=0), 2, 'foo.0'),
+     (dict(max_errors=1), 2, '1 more invalid names'),
+     )
+)
+def test_matchyaml(config, nmatches, last_details, tmp_path, monkeypatch):
+    path = tmp_path / 'group_vars' / 'all.yml'
+    path.parent.mkdir()
+    path.write_text('foo.1: 1\nfoo.0: {foo.1: 0}\nfoo_2: 2\n')
+    monkeypatch.setitem(ansiblelint.config.options.rules, TT.ID,
+                        dict(config, max_depth=0))
+
+    matches = Base().rule.matchyaml(Lintable(str(path), kind='vars'))
+    assert len(matches) == nmatches
+    assert last_details in matches[-1].details
+    assert matches[0].linenumber == 1
+
+
 class Base(common.Base):
     this_mod: common.MaybeModT = TT
     default_skip_list = ['vars_should_not_be_used']
@@ -6,29 +6,135 @@
 # pylint: disable=missing-function-docstring
 """Test cases for the rule, VarsShouldNotBeUsedRule.
 """
+import ansiblelint.utils
 import pytest
 
+from ansiblelint.file_utils import Lintable
+
 from rules import VarsShouldNotBeUsedRule as TT
 from tests import common
 
 
-RES_DIR = common.TESTS_RES_DIR / 'VarsShouldNotBeUsedRule'
-
-
 class Base(common.Base):
     this_mod: common.MaybeModT = TT
 
 
+PLAYBOOK_0 = """\
+- hosts: localhost
+  tasks:
+    - name: Ping
+      ping:
+      vars:
+        a: 1
+  vars_files:
+    - vars.yml
+"""
+
+
+def test_each_vars_keys():
+    data = [
+        {'hosts': 'localhost', TT.LINE_KEY: 1,
+         'tasks': [{'name': 'Ping', 'ping': None, 'vars': {'a': 1},
+                    TT.LINE_KEY: 3}],
+         'vars_files': ['vars.yml']}
+    ]
+    res = [(key, mapping[TT.LINE_KEY])
+           for key, mapping in TT.each_vars_keys(data[0])]
+
+    assert res == [('vars_files', 1), ('vars', 3)]
+
+
+PLAYBOOK_1 = """\
+- hosts: localhost
+  roles:
+    - common
+    - role: ping
+      vars:
+        a: 1
+  tasks:
+    - name: Include a role
+      include_role:
+        name: ping
+        apply:
+          vars:
+            b: 1
+"""
+
+
+def test_each_vars_keys_of_roles():
+    data = {
+        'hosts': 'localhost', TT.LINE_KEY: 1,
+        'roles': ['common', {'role': 'ping', 'vars': {'a': 1},
+                             TT.LINE_KEY: 4}],
+        'tasks': [{'name': 'Include a role', TT.LINE_KEY: 8,
+                   'include_role': {'name': 'ping', TT.LINE_KEY: 10,
+                                    'apply': {'vars': {'b': 1},
+                                              TT.LINE_KEY: 12}}}],
+    }
+    res = [(key, mapping[TT.LINE_KEY])
+           for key, mapping in TT.each_vars_keys(data)]
+
+    assert res == [('vars', 4), ('vars', 12)]
+
+
+PLAYBOOK_2 = """\
+- hosts: localhost
+  tasks:
+    - name: Flow style
+      ping: {}
+      vars: {a: 1}
+    - name: Include vars
+      include_vars: vars.yml
+"""
+
+
+@pytest.mark.parametrize(
+    ('kind', 'expected'),
+    (('playbook', [3]),
+     ('meta', []),
+     )
+)
+def test_matchplay_with_the_lines_parsed(kind, expected, tmp_path):
+    path = tmp_path / 'a.yml'
+    path.write_text(PLAYBOOK_2)
+    lintable = Lintable(str(path), kind=kind)
+    data = ansiblelint.utils.parse_yaml_linenumbers(lintable)
+
+    rule = Base().rule
+    matches = rule.matchplay(lintable, data[0])
+    assert [m.linenumber for m in matches] == expected
+
+
+@pytest.mark.parametrize(
+    ('kind', 'expected'),
+    (('tasks', True),
+     ('handlers', True),
+     ('meta', False),
+     )
+)
+def test_match_by_kinds(kind, expected, tmp_path):
+    path = tmp_path / 'main.yml'
+    path.write_text('- name: Ping\n  ping:\n  vars:\n    a: 1\n')
+    lintable = Lintable(str(path), kind=kind)
+    data = ansiblelint.utils.parse_yaml_linenumbers(lintable)
+    task = dict(action=dict(__ansible_module__='include_vars'))
+
+    rule = Base().rule
+    assert bool(rule.matchplay(lintable, data[0])) == expected
+    assert bool(rule.matchtask(task, file=lintable)) == expected
+
+
 @pytest.mark.parametrize(
-    ('path', 'expected'),
-    ((str(RES_DIR / 'ok/0/plays_ok_0.yml'), False),
-     (str(RES_DIR / 'ng/0/playbook.yml'), True),
-     (str(RES_DIR / 'ng/1/playbook.yml'), True),
+    ('mod', 'expected'),
+    (('include_vars', True),
+     ('ansible.builtin.include_vars', True),
+     ('ansible.legacy.include_vars', True),
+     ('ping', False),
      )
 )
-def test_contains_vars_directive(path, expected):
-    assert TT.contains_vars_directive(path) == expected
-    TT.contains_vars_directive.cache_clear()
+def test_matchtask(mod, expected):
+    task = dict(action=dict(__ansible_module__=mod))
+    assert bool(Base().rule.matchtask(task)) == expected
 
 
 class RuleTestCase(common.RuleTestCase):
@@ -11,6 +11,8 @@ import re
 import types
 import typing
 
+from rules import _memo
+
 from . import constants, runner, utils
 
 
@@ -117,6 +119,7 @@ class Base:
         self.clear_fns = list(
             each_lru_cache_clear_fns(self.this_mod, self.rule_class)
         )
+        self.clear_fns.append(functools.partial(_memo.clear, self.rule))
 
         args = (self.rule, constants.RULES_DIR)
         kwargs = dict(
@@ -131,8 +134,8 @@ class Base:
 
         .. note::
 
-           It depends on each_lru_cache_clear_fns entirely. It might need to
-           call utis.clear_all_lru_cache instead.
+           It depends on each_lru_cache_clear_fns and rules._memo.clear
+           entirely. It might need to call utis.clear_all_lru_cache instead.
         """
         for clear_fn in self.clear_fns:
             clear_fn()  # pylint: disable=not-callable
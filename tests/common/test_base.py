@@ -4,6 +4,8 @@
 # pylint: disable=missing-function-docstring
 """Test cases of tests.common.base.
 """
+from ansiblelint.rules import AnsibleLintRule
+
 from rules import DebugRule  # This depends on it.
 from tests.common import base as TT
 
@@ -25,7 +27,11 @@ def test_each_lru_cache_clear_fns():
     clear_fns = list(TT.each_lru_cache_clear_fns(DebugRule))
     assert not clear_fns  # No lru_cache-ed in module level.
 
+    # Rules memoize with rules._memo instead of lru_cache.
     clear_fns = list(TT.each_lru_cache_clear_fns(DebugRule.DebugRule))
+    assert not clear_fns
+
+    clear_fns = list(TT.each_lru_cache_clear_fns(AnsibleLintRule))
     assert clear_fns  # lru_cache-ed are in class level.
 
 # vim:sw=4:ts=4:et:
@@ -9,7 +9,7 @@ import sys
 import pytest
 
 from ansiblelint.rules.DeprecatedModuleRule import DeprecatedModuleRule
-from rules.BlockedModules import ID as OTHER_CUSTOM_RULE_ID_EX
+from rules.BlockedModules import BlockedModules, ID as OTHER_CUSTOM_RULE_ID_EX
 from rules.DebugRule import DebugRule
 from tests.common import constants, datatypes, runner as TT, utils
 
@@ -43,8 +43,8 @@ def test_get_lintables_failure(tmp_path):
 @pytest.mark.parametrize(
     ('workdir', 'conf', 'env'),
     ((constants.TESTS_RES_DIR / 'DebugRule/ok/0', False, False),
-     (constants.TESTS_RES_DIR / 'DebugRule/ng/1', True, False),
-     (constants.TESTS_RES_DIR / 'DebugRule/ng/2', False, True),
+     (constants.TESTS_RES_DIR / 'DebugRule/ok/4', True, False),
+     (constants.TESTS_RES_DIR / 'DebugRule/ok/5', False, True),
      )
 )
 def test_make_context(workdir, conf, env):
@@ -112,18 +112,21 @@ def test_RuleRunner_get_skip_list(rules_dir, skip_list, isolated):
 
 DEBUG_RES_DIR = constants.TESTS_RES_DIR / 'DebugRule'
 
+# DebugRule does not report any errors.
+BLOCKED_RES_DIR = constants.TESTS_RES_DIR / 'BlockedModules'
 
-# see tests/res/DebugRule/{ok,ng}/...
+
+# see tests/res/DebugRule/ok/... and tests/res/BlockedModules/ng/...
 @pytest.mark.parametrize(
-    ('workdir', 'isolated', 'success'),
-    ((DEBUG_RES_DIR / 'ok/0', True, True),
-     (DEBUG_RES_DIR / 'ok/0', False, True),
-     (DEBUG_RES_DIR / 'ng/0', True, False),
-     (DEBUG_RES_DIR / 'ng/0', False, False),
+    ('rule_cls', 'workdir', 'isolated', 'success'),
+    ((DebugRule, DEBUG_RES_DIR / 'ok/0', True, True),
+     (DebugRule, DEBUG_RES_DIR / 'ok/0', False, True),
+     (BlockedModules, BLOCKED_RES_DIR / 'ng/0', True, False),
+     (BlockedModules, BLOCKED_RES_DIR / 'ng/0', False, False),
      )
 )
-def test_RuleRunner_run(workdir, isolated, success):
-    runner = TT.RuleRunner(DebugRule(), constants.RULES_DIR)
+def test_RuleRunner_run(rule_cls, workdir, isolated, success):
+    runner = TT.RuleRunner(rule_cls(), constants.RULES_DIR)
     res = runner.run(workdir, isolated=isolated)
     if success:
         assert not res.result, res.result
@@ -148,13 +151,13 @@ def test_CliRunner__init__(enable_default):
 
 
 @pytest.mark.parametrize(
-    ('workdir', 'success'),
-    ((DEBUG_RES_DIR / 'ok/0', True),
-     (DEBUG_RES_DIR / 'ng/0', False),
+    ('rule_cls', 'workdir', 'success'),
+    ((DebugRule, DEBUG_RES_DIR / 'ok/0', True),
+     (BlockedModules, BLOCKED_RES_DIR / 'ng/0', False),
      )
 )
-def test_CliRunner_run(workdir, success):
-    runner = TT.CliRunner(DebugRule(), constants.RULES_DIR)
+def test_CliRunner_run(rule_cls, workdir, success):
+    runner = TT.CliRunner(rule_cls(), constants.RULES_DIR)
     res = runner.run(workdir)
     if success:
         assert res.result.returncode == 0
@@ -68,10 +68,10 @@ def test_get_env(updates, safe_list):
                if v in os.environ and v not in updates), env
 
 
-# see: tests/res/DebugRule/ng/**/*.*
+# see: tests/res/DebugRule/ok/**/*.*
 @pytest.mark.parametrize(
     ('path', 'warn', 'exp'),
-    ((constants.TESTS_RES_DIR / 'DebugRule/ng/2/env.json', False, True),
+    ((constants.TESTS_RES_DIR / 'DebugRule/ok/5/env.json', False, True),
      (constants.TESTS_RES_DIR / 'not_exist.json', False, False),
      (constants.TESTS_RES_DIR / 'not_exist.json', True, False),
      )
@@ -92,8 +92,8 @@ def test_load_data(path, warn, exp):
 @pytest.mark.parametrize(
     ('workdir', 'conf', 'env'),
     ((constants.TESTS_RES_DIR / 'DebugRule/ok/0', False, False),
-     (constants.TESTS_RES_DIR / 'DebugRule/ng/1', True, False),
-     (constants.TESTS_RES_DIR / 'DebugRule/ng/2', False, True),
+     (constants.TESTS_RES_DIR / 'DebugRule/ok/4', True, False),
+     (constants.TESTS_RES_DIR / 'DebugRule/ok/5', False, True),
      )
 )
 def test_load_sub_ctx_data_in_dir(workdir, conf, env):
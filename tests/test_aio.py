@@ -0,0 +1,144 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+# pylint: disable=missing-function-docstring
+"""Test cases of rules._aio.
+"""
+import asyncio
+import copy
+import time
+
+import ansiblelint.config
+import pytest
+
+from rules import _aio as TT
+
+
+TASKS = """\
+- name: Run a command
+  shell: ls
+"""
+
+BLOCKED_PING = dict(rules=dict(blocked_modules=dict(blocked=['ping'])))
+
+
+@pytest.fixture(name='workdir')
+def fixture_workdir(tmp_path):
+    (tmp_path / 'roles/r1/tasks').mkdir(parents=True)
+    (tmp_path / 'roles/r1/tasks/main.yml').write_text(TASKS)
+    (tmp_path / 'roles/r1/tasks/a.yml').write_text('- name: x\n  ping:\n')
+
+    # The linter applies the configuration of the rules globally.
+    saved = copy.deepcopy(vars(ansiblelint.config.options))
+    yield tmp_path
+    vars(ansiblelint.config.options).clear()
+    vars(ansiblelint.config.options).update(saved)
+
+
+@pytest.fixture(name='linter')
+def fixture_linter():
+    linter = TT.Linter(max_workers=2)
+    yield linter
+    linter.close()
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+async def collect(linter, paths, config=None, **kwargs):
+    return sorted([
+        (str(m.filename).rsplit('/', 1)[-1], m.rule.id)
+        async for m in linter.lint_paths(paths, config, **kwargs)
+    ])
+
+
+def test_get_rules():
+    assert TT.get_rules() is TT.get_rules([TT.RULES_DIR])
+    assert TT.get_linter() is TT.get_linter()
+
+
+def test_find_lintables(workdir):
+    (workdir / 'roles/r1/.x/y.yml').parent.mkdir()
+    (workdir / 'roles/r1/.x/y.yml').write_text('a: 1\n')
+
+    res = TT.find_lintables([str(workdir / 'roles')],
+                            [str(workdir / 'roles/r1/tasks/a.yml')])
+    assert sorted(lnt.kind for lnt in res) == ['role', 'tasks']
+
+
+def test_lint_paths(linter, workdir):
+    paths = [str(workdir / 'roles/r1')]
+    assert run(collect(linter, paths)) == [
+        ('a.yml', 'task_has_valid_name'), ('main.yml', 'blocked_modules')
+    ]
+    assert run(collect(linter, paths, dict(skip_list=['blocked_modules']))
+               ) == [('a.yml', 'task_has_valid_name')]
+
+
+def test_lint_paths_of_different_configs(linter, workdir):
+    paths = [str(workdir / 'roles/r1/tasks/a.yml')]
+
+    async def lint_at_once():
+        return await asyncio.gather(collect(linter, paths),
+                                    collect(linter, paths, BLOCKED_PING),
+                                    collect(linter, paths))
+
+    default, blocked, default_2 = run(lint_at_once())
+    assert default == default_2 == [('a.yml', 'task_has_valid_name')]
+    assert blocked == [('a.yml', 'blocked_modules'),
+                       ('a.yml', 'task_has_valid_name')]
+    assert linter.gate.active == 0
+
+
+def test_lint_paths_timeout_and_cancel(linter, workdir, monkeypatch):
+    run_rules = linter.rules.run
+    actives = []
+
+    def _run(*args, **kwargs):
+        time.sleep(0.2)
+        actives.append(linter.gate.active)
+        return run_rules(*args, **kwargs)
+
+    monkeypatch.setattr(linter.rules, 'run', _run)
+    paths = [str(workdir / 'roles/r1')]
+    with pytest.raises(asyncio.TimeoutError):
+        run(collect(linter, paths, timeout=0.1))
+
+    async def cancel():
+        task = asyncio.ensure_future(collect(linter, paths))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    run(cancel())
+    assert linter.gate.active == 0
+    assert actives and all(actives)  # Kept until the running ones finished.
+
+
+def test_config_gate_enters_in_order(workdir):
+    gate = TT.ConfigGate()
+    order = []
+
+    async def request(name, config, delay=0.0):
+        await asyncio.sleep(delay)
+        await gate.acquire(config)
+        order.append((name, ansiblelint.config.options.rules))
+        await asyncio.sleep(0.05)
+        gate.release()
+
+    async def requests():
+        await asyncio.gather(request('a', {}), request('b', {'x': 1}, 0.01),
+                             request('c', {}, 0.02),
+                             request('d', {'x': 1}, 0.03))
+
+    run(requests())
+    assert order == [('a', {}), ('b', {'x': 1}), ('d', {'x': 1}), ('c', {})]
+    assert gate.active == 0
+
+# vim:sw=4:ts=4:et:
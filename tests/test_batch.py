@@ -0,0 +1,94 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+# pylint: disable=missing-function-docstring
+"""Test cases of rules._batch.
+"""
+import copy
+import json
+import subprocess
+
+import ansiblelint.config
+import ansiblelint.rules
+import pytest
+
+from rules import _batch as TT
+from tests import common
+
+
+RULES_DIR = common.TESTS_RES_DIR.parent.parent / 'rules'
+
+TASKS = """\
+- name: Run a command
+  shell: ls
+- name: Check the connection
+  ping:
+"""
+CONFIG = 'rules:\n  blocked_modules:\n    blocked: [ping]\n'
+
+
+@pytest.fixture(name='repos')
+def fixture_repos(tmp_path):
+    repos = [tmp_path / name for name in ('a', 'b', 'c')]
+    for repo in repos:
+        (repo / 'roles/r1/tasks').mkdir(parents=True)
+        (repo / 'roles/r1/tasks/main.yml').write_text(TASKS)
+        if repo.name != 'a':
+            (repo / '.ansible-lint').write_text(CONFIG)
+
+        subprocess.run(['git', 'init', '-q', '.'], cwd=repo, check=True)
+        subprocess.run(['git', 'add', '.'], cwd=repo, check=True)
+
+    saved = copy.deepcopy(vars(ansiblelint.config.options))
+    yield repos
+    vars(ansiblelint.config.options).clear()
+    vars(ansiblelint.config.options).update(saved)
+
+
+def blocked(record):
+    return [(m['filename'], m['message']) for m in record['matches']
+            if m['rule_id'] == 'blocked_modules']
+
+
+def test_clear_caches(monkeypatch):
+    rule = ansiblelint.rules.AnsibleLintRule()
+    rule.id = 'test_clear_caches'
+    monkeypatch.setitem(ansiblelint.config.options.rules, rule.id,
+                        dict(a=1))
+    assert rule.get_config('a') == 1
+
+    monkeypatch.setitem(ansiblelint.config.options.rules, rule.id,
+                        dict(a=2))
+    TT.clear_caches()
+    assert rule.get_config('a') == 2
+
+
+def test_main(repos, tmp_path):
+    output = tmp_path / 'out.jsonl'
+    (tmp_path / 'repos.txt').write_text(
+        '# comment\n' + ''.join(f'{r!s}\n' for r in repos[1:])
+    )
+    rcode = TT.main(['--repo', str(repos[0]), '--repo', str(tmp_path / 'x'),
+                     '--repos-from', str(tmp_path / 'repos.txt'),
+                     '-o', str(output), '-r', str(RULES_DIR)])
+    assert rcode == 1
+
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [r['repo'] for r in records] == [
+        str(repos[0]), str(tmp_path / 'x'), str(repos[1]), str(repos[2])
+    ]
+    assert records[1]['error']
+    assert all(set(r['timings']) == {'load', 'lint', 'total'}
+               for r in records if not r['error'])
+
+    (a_res, _x_res, b_res, c_res) = records
+    assert blocked(a_res) == [
+        ('roles/r1/tasks/main.yml', 'Blocked modules: shell')
+    ]
+    assert blocked(b_res) == [
+        ('roles/r1/tasks/main.yml', 'Blocked modules: ping')
+    ]
+    assert b_res['config'] == c_res['config'] != a_res['config']
+    assert b_res['matches'] == c_res['matches']
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,216 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+# pylint: disable=missing-function-docstring,missing-class-docstring
+# pylint: disable=too-few-public-methods
+"""Test cases of rules._config.
+"""
+import ansiblelint.config
+import pytest
+
+from rules import _config as TT
+from rules.FileIsSmallEnoughRule import (
+    DEFAULT_MAX_LINES, FileIsSmallEnoughRule
+)
+from rules.TaskHasValidNameRule import TaskHasValidNameRule
+
+
+class FakeRule:
+    id = 'fake_rule'
+
+    def __init__(self):
+        self.ncalls = 0
+
+    @property
+    def rule_config(self):
+        return ansiblelint.config.options.rules.get(self.id, {})
+
+    def make_options(self, config):
+        self.ncalls += 1
+        return frozenset(config)
+
+
+def test_digest():
+    assert TT.digest({}) != TT.digest({'a': 1})
+    assert TT.digest({'a': [1, 2]}) == TT.digest({'a': [1, 2]})
+
+
+@pytest.mark.parametrize(
+    'value,minimum,expected',
+    ((None, 0, 10),
+     ('0', 0, 0),
+     ('0', 1, 10),
+     ('-1', 0, 10),
+     ('foo', 0, 10),
+     ('20', 1, 20),
+     )
+)
+def test_get_env_int(value, minimum, expected, monkeypatch):
+    name = '_ANSIBLE_LINT_RULE_TEST_GET_ENV_INT'
+    if value is None:
+        monkeypatch.delenv(name, raising=False)
+    else:
+        monkeypatch.setenv(name, value)
+
+    assert TT.get_env_int(name, 10, minimum) == expected
+
+
+def test_snapshot_is_immutable():
+    snapshot = TT.Snapshot({'a': 1})
+    with pytest.raises(AttributeError):
+        snapshot.version = 0
+
+    assert snapshot.config == {'a': 1}
+    assert snapshot.options is None
+
+
+def test_get_snapshot_rebuilt_only_if_changed(monkeypatch):
+    rule = FakeRule()
+    snapshot = TT.get_snapshot(rule)
+    assert TT.get_snapshot(rule) is snapshot
+    assert rule.ncalls == 1
+
+    # The configuration of the same values.
+    monkeypatch.setitem(ansiblelint.config.options.rules, rule.id, {})
+    assert TT.get_snapshot(rule) is snapshot
+
+    monkeypatch.setitem(ansiblelint.config.options.rules, rule.id,
+                        {'a': 1})
+    new_snapshot = TT.get_snapshot(rule)
+    assert new_snapshot.version > snapshot.version
+    assert new_snapshot.digest != snapshot.digest
+    assert new_snapshot.options == frozenset(['a'])
+    assert rule.ncalls == 2
+
+
+def test_get_snapshot_rebuilt_if_changed_in_place(monkeypatch):
+    rule = FakeRule()
+    config = {'a': 1}
+    monkeypatch.setitem(ansiblelint.config.options.rules, rule.id, config)
+    snapshot = TT.get_snapshot(rule)
+
+    config['b'] = 2
+    assert TT.get_snapshot(rule) is snapshot  # Not checked until invalidated.
+
+    TT.invalidate()
+    new_snapshot = TT.get_snapshot(rule)
+    assert new_snapshot is not snapshot
+    assert new_snapshot.options == frozenset(['a', 'b'])
+
+
+def test_get_snapshot_reused_if_changed_back(monkeypatch):
+    rule = FakeRule()
+    monkeypatch.setitem(ansiblelint.config.options.rules, rule.id,
+                        {'a': 1})
+    snapshot = TT.get_snapshot(rule)
+
+    monkeypatch.setitem(ansiblelint.config.options.rules, rule.id,
+                        {'b': 1})
+    assert TT.get_snapshot(rule) is not snapshot
+
+    monkeypatch.setitem(ansiblelint.config.options.rules, rule.id,
+                        {'a': 1})
+    assert TT.get_snapshot(rule) is snapshot
+    assert rule.ncalls == 2
+
+    monkeypatch.setattr(TT, 'MAX_SNAPSHOTS', 1)
+    monkeypatch.setitem(ansiblelint.config.options.rules, rule.id,
+                        {'b': 1})
+    TT.get_snapshot(rule)
+    monkeypatch.setitem(ansiblelint.config.options.rules, rule.id,
+                        {'a': 1})
+    assert TT.get_snapshot(rule) is not snapshot
+
+
+class FakeFileRule(FakeRule):
+    config_files = frozenset(['file'])
+
+    def make_options(self, config):
+        self.ncalls += 1
+        with open(config['file']) as fobj:
+            return fobj.read()
+
+
+def test_get_snapshot_with_files(monkeypatch, tmp_path):
+    rule = FakeFileRule()
+    for name in ('a', 'b'):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / 'f.txt').write_text(name)
+
+    monkeypatch.setitem(ansiblelint.config.options.rules, rule.id,
+                        {'file': 'f.txt'})
+    monkeypatch.chdir(tmp_path / 'a')
+    snapshot = TT.get_snapshot(rule)
+    assert snapshot.config == {'file': str(tmp_path / 'a/f.txt')}
+    assert snapshot.options == 'a'
+    assert TT.get_snapshot(rule) is snapshot
+
+    # The same configuration gives the other file.
+    monkeypatch.chdir(tmp_path / 'b')
+    TT.invalidate()
+    assert TT.get_snapshot(rule).options == 'b'
+    assert TT.get_snapshot(rule).digest != snapshot.digest
+
+    # The content of the file was changed.
+    monkeypatch.chdir(tmp_path / 'a')
+    (tmp_path / 'a/f.txt').write_text('aa')
+    assert TT.get_snapshot(rule).options == 'b'  # Not checked yet.
+
+    TT.invalidate()
+    new_snapshot = TT.get_snapshot(rule)
+    assert new_snapshot.options == 'aa'
+    assert new_snapshot.digest != snapshot.digest
+    assert rule.ncalls == 3
+
+    # The files are not checked until invalidated.
+    monkeypatch.setattr(TT, 'stat_files', None)
+    assert TT.get_snapshot(rule) is new_snapshot
+
+
+def test_get_snapshot_with_files_relative_to_config_dir(monkeypatch,
+                                                        tmp_path):
+    rule = FakeFileRule()
+    (tmp_path / 'a').mkdir()
+    (tmp_path / 'a/f.txt').write_text('a')
+
+    monkeypatch.setitem(ansiblelint.config.options.rules, rule.id,
+                        {'file': 'f.txt'})
+    monkeypatch.setattr(ansiblelint.config.options, 'config_file',
+                        str(tmp_path / 'a/.ansible-lint'), raising=False)
+    monkeypatch.chdir(tmp_path)
+    snapshot = TT.get_snapshot(rule)
+    assert snapshot.config == {'file': str(tmp_path / 'a/f.txt')}
+    assert snapshot.options == 'a'
+
+
+def test_options_of_rules(monkeypatch):
+    rule = TaskHasValidNameRule()
+    assert rule.options.name_re is None
+
+    monkeypatch.setitem(ansiblelint.config.options.rules, rule.id,
+                        dict(name=r'^\S+$'))
+    assert not rule.options.name_re.match('Ensure foo is installed')
+
+
+@pytest.mark.parametrize(
+    'config,expected',
+    [({}, DEFAULT_MAX_LINES),
+     ({'max_lines': 10}, 10),
+     ({'max_lines': '10'}, 10),
+     ]
+)
+def test_options_of_file_is_small_enough_rule(config, expected, monkeypatch):
+    rule = FileIsSmallEnoughRule()
+    monkeypatch.setitem(ansiblelint.config.options.rules, rule.id, config)
+    assert rule.max_lines() == expected
+
+
+@pytest.mark.parametrize('value', ['a', 0, -1])
+def test_options_of_file_is_small_enough_rule_invalid(value, monkeypatch):
+    rule = FileIsSmallEnoughRule()
+    monkeypatch.setitem(ansiblelint.config.options.rules, rule.id,
+                        {'max_lines': value})
+    with pytest.warns(UserWarning):
+        assert rule.max_lines() == DEFAULT_MAX_LINES
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,140 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+# pylint: disable=missing-function-docstring
+"""Test cases of rules._content.
+"""
+import os
+import unittest.mock
+
+import pytest
+
+from ansiblelint.file_utils import Lintable
+
+from rules import _content as TT
+
+
+@pytest.mark.parametrize(
+    ('text', 'offsets', 'lines'),
+    (('', [], []),
+     ('\n', [0], ['\n']),
+     ('a', [0], ['a']),
+     ('a\n', [0], ['a\n']),
+     ('a\nbc', [0, 2], ['a\n', 'bc']),
+     ('a\n\nbc\n', [0, 2, 3], ['a\n', '\n', 'bc\n']),
+     )
+)
+def test_content_offsets_and_lines(text, offsets, lines):
+    content = TT.Content('a.yml', 0, 0, text.encode('utf-8'))
+    assert content.nlines == len(lines)  # Counted without the offsets.
+    assert content.text == text
+    assert content.offsets == offsets
+    assert content.nlines == len(lines)
+    assert list(content.lines()) == lines
+
+
+def test_content_linenumber():
+    content = TT.Content('a.yml', 0, 0, b'a\nbc\nd\n')
+    assert content.linenumber(0) == 1
+    assert content.linenumber(2) == 2
+    assert content.linenumber(4) == 2
+    assert content.linenumber(5) == 3
+
+
+@pytest.mark.parametrize(
+    ('env', 'exp'),
+    (({}, TT.DEFAULT_MAX_BYTES),
+     ({TT.E_MAX_BYTES_VAR: '100'}, 100),
+     ({TT.E_MAX_BYTES_VAR: 'foo'}, TT.DEFAULT_MAX_BYTES),
+     ({TT.E_MAX_BYTES_VAR: '-1'}, TT.DEFAULT_MAX_BYTES),
+     )
+)
+def test_get_max_bytes(env, exp):
+    with unittest.mock.patch.dict(os.environ, env, clear=True):
+        assert TT.get_max_bytes() == exp
+
+
+def test_content_cache_get_reads_once(tmp_path):
+    path = tmp_path / 'a.yml'
+    path.write_text('a: 1\n')
+
+    cache = TT.ContentCache(100)
+    first = cache.get(str(path))
+    assert first.data == b'a: 1\n'
+    assert cache.get(path) is first
+    assert cache.stats().misses == 1
+    assert cache.stats().hits == 1
+
+
+def test_content_cache_get_invalidated_by_changes(tmp_path):
+    path = tmp_path / 'a.yml'
+    path.write_text('a: 1\n')
+
+    cache = TT.ContentCache(100)
+    first = cache.get(str(path))
+
+    path.write_text('a: 1\nb: 2\n')
+    second = cache.get(str(path))
+    assert second is not first
+    assert second.nlines == 2
+    assert cache.stats().nbytes == len(second.data)
+
+
+def test_content_cache_peek(tmp_path):
+    path = tmp_path / 'a.yml'
+    path.write_text('a: 1\n')
+
+    cache = TT.ContentCache(100)
+    assert cache.peek(path) is None
+    assert cache.stats().entries == 0
+
+    content = cache.get(path)
+    assert cache.peek(str(path)) is content
+
+    path.write_text('a: 1\nb: 2\n')
+    assert cache.peek(path) is None
+
+
+def test_content_cache_get_from_lintable(tmp_path):
+    path = tmp_path / 'a.yml'
+    path.write_bytes(b'a: 1\r\nb: 2\r\n')
+
+    lintable = Lintable(str(path))
+    assert lintable.content == 'a: 1\nb: 2\n'
+
+    content = TT.ContentCache(100).get(lintable)
+    assert content.text is lintable.content  # Not decoded again.
+    assert content.data == path.read_bytes()
+    assert content.size == len(content.data)
+
+
+def test_content_cache_evicts_by_size(tmp_path):
+    paths = [tmp_path / f'{idx}.yml' for idx in range(3)]
+    for path in paths:
+        path.write_text('a: 1\n')  # 5 bytes.
+
+    cache = TT.ContentCache(10)
+    for path in paths:
+        cache.get(str(path))
+
+    stats = cache.stats()
+    assert stats.entries == 2
+    assert stats.nbytes == 10
+    assert stats.evictions == 1
+
+    cache.get(str(paths[0]))  # Evicted already.
+    assert cache.stats().misses == 4
+
+    cache.clear()
+    assert cache.stats() == TT.Stats(0, 0, 0, 0, 0)
+
+
+def test_content_cache_does_not_keep_too_large_ones(tmp_path):
+    path = tmp_path / 'a.yml'
+    path.write_text('a: 1\n' * 10)
+
+    cache = TT.ContentCache(10)
+    assert cache.get(str(path)).nlines == 10
+    assert cache.stats().entries == 0
+
+# vim:sw=4:ts=4:et:
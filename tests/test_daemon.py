@@ -0,0 +1,197 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+# pylint: disable=missing-function-docstring
+"""Test cases of rules._daemon.
+"""
+import copy
+import subprocess
+import threading
+import time
+
+import ansiblelint.config
+import pytest
+
+from rules import _daemon as TT
+from tests import common
+
+
+RULES_DIR = common.TESTS_RES_DIR.parent.parent / 'rules'
+
+TASKS = """\
+- name: Run a command
+  shell: ls
+"""
+
+
+@pytest.fixture(name='workdir')
+def fixture_workdir(tmp_path, monkeypatch):
+    (tmp_path / 'roles/r1/tasks').mkdir(parents=True)
+    (tmp_path / 'roles/r1/tasks/main.yml').write_text(TASKS)
+    (tmp_path / 'roles/r1/tasks/a.yml').write_text('- name: x\n  ping:\n')
+
+    subprocess.run(['git', 'init', '-q', '.'], cwd=tmp_path, check=True)
+    subprocess.run(['git', 'add', '.'], cwd=tmp_path, check=True)
+    monkeypatch.chdir(tmp_path)
+
+    # The daemon loads the options of ansible-lint globally.
+    saved = copy.deepcopy(vars(ansiblelint.config.options))
+    ansiblelint.config.options.rules = {}
+    yield tmp_path
+    vars(ansiblelint.config.options).clear()
+    vars(ansiblelint.config.options).update(saved)
+
+
+@pytest.fixture(name='daemon')
+def fixture_daemon(workdir):
+    daemon = TT.Daemon(['-r', str(RULES_DIR)])
+    daemon.scan()
+    return daemon
+
+
+def rule_ids(daemon, path):
+    return sorted(r.rule_id for r in daemon.matches([path]))
+
+
+def test_scan_and_update(daemon, workdir):
+    assert sorted(daemon.lintables) == [
+        'roles/r1', 'roles/r1/tasks/a.yml', 'roles/r1/tasks/main.yml'
+    ]
+    assert rule_ids(daemon, 'roles/r1/tasks/main.yml') == ['blocked_modules']
+    assert rule_ids(daemon, 'roles/r1/tasks/a.yml') == ['task_has_valid_name']
+
+    (workdir / 'roles/r1/tasks/a.yml').write_text(TASKS)
+    (workdir / 'roles/r1/tasks/b.yml').write_text(TASKS)
+    linted = daemon.update({'roles/r1/tasks/a.yml', 'roles/r1/tasks/b.yml'})
+
+    # The files in the same role are linted again also.
+    assert 'roles/r1/tasks/main.yml' in linted
+    for path in ('roles/r1/tasks/a.yml', 'roles/r1/tasks/b.yml'):
+        assert rule_ids(daemon, path) == ['blocked_modules']
+
+    (workdir / 'roles/r1/tasks/b.yml').unlink()
+    daemon.update({'roles/r1/tasks/b.yml'})
+    assert 'roles/r1/tasks/b.yml' not in daemon.lintables
+    assert len(daemon.matches()) == 2
+
+
+def test_update_with_errors(daemon, workdir, monkeypatch):
+    (workdir / 'roles/r1/tasks/a.yml').write_text(TASKS)
+    run_by_rules = daemon.rules.run_by_rules
+
+    def _run_by_rules(lintable, **kwargs):
+        if str(lintable.name) == 'roles/r1/tasks/main.yml':
+            raise RuntimeError('A rule failed')
+        return run_by_rules(lintable, **kwargs)
+
+    def _listdir(path):
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(daemon.rules, 'run_by_rules', _run_by_rules)
+    monkeypatch.setattr(TT.os, 'listdir', _listdir)
+    with pytest.warns(UserWarning):
+        linted = daemon.update({'roles/r1/tasks', 'roles/r1/tasks/a.yml'})
+
+    # The other files are linted even if failed to lint some.
+    assert 'roles/r1/tasks/main.yml' in linted
+    assert rule_ids(daemon, 'roles/r1/tasks/a.yml') == ['blocked_modules']
+    assert rule_ids(daemon, 'roles/r1/tasks/main.yml') == []
+
+
+def test_update_excluded(workdir):
+    (workdir / 'roles/r1/tasks/x.yml').write_text(TASKS)
+    daemon = TT.Daemon(['-r', str(RULES_DIR),
+                        '--exclude', 'roles/r1/tasks/x.yml'])
+    daemon.scan()
+    assert 'roles/r1/tasks/x.yml' not in daemon.lintables
+
+    (workdir / 'roles/r1/tasks/x.yml').write_text(TASKS + TASKS)
+    linted = daemon.update({'roles/r1/tasks/x.yml'})
+
+    assert 'roles/r1/tasks/x.yml' not in linted
+    assert 'roles/r1/tasks/x.yml' not in daemon.lintables
+    assert not daemon.matches(['roles/r1/tasks/x.yml'])
+
+
+def test_reload(daemon, workdir, monkeypatch):
+    (workdir / '.ansible-lint').write_text(
+        'rules:\n  blocked_modules:\n    blocked: [ping]\n'
+    )
+    calls = []
+    run_by_rules = daemon.rules.run_by_rules
+
+    def _run_by_rules(*args, **kwargs):
+        calls.append(kwargs.get('ids'))
+        return run_by_rules(*args, **kwargs)
+
+    monkeypatch.setattr(daemon.rules, 'run_by_rules', _run_by_rules)
+    daemon.update({'.ansible-lint'})
+
+    # Only the rule of which configuration was changed ran.
+    assert calls and all(ids == {'blocked_modules'} for ids in calls)
+    assert rule_ids(daemon, 'roles/r1/tasks/main.yml') == []
+    assert rule_ids(daemon, 'roles/r1/tasks/a.yml') == [
+        'blocked_modules', 'task_has_valid_name'
+    ]
+
+
+@pytest.mark.parametrize('watcher_cls',
+                         (TT.InotifyWatcher, TT.PollingWatcher))
+def test_watchers(watcher_cls, tmp_path):
+    (tmp_path / 'a').mkdir()
+    watcher = watcher_cls(str(tmp_path))
+    try:
+        time.sleep(0.01)  # Make mtimes differ.
+        (tmp_path / 'a/b.yml').write_text('a: 1\n')
+        (tmp_path / '.git').mkdir()
+        assert watcher.wait(1.0)
+        assert 'a/b.yml' in watcher.read()
+    finally:
+        watcher.close()
+
+
+def test_server(daemon, workdir):
+    path = str(workdir / 'test.sock')
+    server = TT.Server(path, daemon, TT.make_watcher(str(workdir)))
+    thread = threading.Thread(target=server.serve, daemon=True)
+    thread.start()
+
+    res = TT.request(path, 'lint', paths=['roles/r1/tasks/main.yml'])
+    assert [m['rule_id'] for m in res['matches']] == ['blocked_modules']
+
+    assert TT.request(path, 'stats')['files'] == 3
+    assert 'error' in TT.request(path, 'unknown')
+
+    def _matches(*_args):
+        raise RuntimeError('Failed')
+
+    daemon.matches = _matches
+    assert 'error' in TT.request(path, 'lint')
+
+    assert TT.request(path, 'stop') == dict(stopped=True)
+    thread.join(5)
+    assert not thread.is_alive()
+
+
+def test_server_watch_continues_on_errors(daemon, workdir, monkeypatch):
+    server = TT.Server(str(workdir / 'test.sock'), daemon,
+                       TT.PollingWatcher(str(workdir)))
+    calls = []
+
+    def _sync():
+        calls.append(1)
+        if len(calls) > 1:
+            server._stopped.set()  # pylint: disable=protected-access
+        raise OSError('A file was removed')
+
+    monkeypatch.setattr(server.watcher, 'wait', lambda timeout: True)
+    monkeypatch.setattr(server, 'sync', _sync)
+    try:
+        with pytest.warns(UserWarning):
+            server.watch()
+    finally:
+        server.server_close()
+
+    assert len(calls) == 2
+
+# vim:sw=4:ts=4:et:
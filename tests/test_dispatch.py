@@ -0,0 +1,80 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+# pylint: disable=missing-function-docstring
+"""Test cases of rules._dispatch.
+"""
+import ansiblelint.rules
+import pytest
+
+from ansiblelint.file_utils import Lintable
+
+from rules import _dispatch as TT
+from tests import common
+
+
+RULES_DIR = common.TESTS_RES_DIR.parent.parent / 'rules'
+WORKDIR = common.TESTS_RES_DIR / 'VarsInVarsFilesHaveValidNamesRule/ng/0'
+
+
+@pytest.fixture(name='collection', scope='module')
+def fixture_collection():
+    return ansiblelint.rules.RulesCollection([str(RULES_DIR)])
+
+
+def to_tuples(matches):
+    return sorted((m.rule.id, m.filename, m.linenumber, m.message)
+                  for m in matches)
+
+
+def test_rules_for(collection):
+    dispatcher = TT.Dispatcher(collection)
+    vars_rules = [r.id for r in dispatcher.rules_for('vars')]
+
+    assert 'vars_in_vars_files_have_valid_names' in vars_rules
+    assert 'task_has_valid_name' not in vars_rules
+    assert 'debug' in vars_rules  # It tests files of any kinds.
+
+    # Rules not subscribe any kinds explicitly are called for unknown kinds.
+    assert all(TT.get_kinds(r) is None
+               for r in dispatcher.rules_for('unknown_kind'))
+    assert len(dispatcher) == len(collection)
+
+
+def test_run(collection, monkeypatch):
+    monkeypatch.chdir(WORKDIR)
+    dispatcher = TT.Dispatcher(collection)
+
+    for path in ('playbook.yml', 'group_vars/localhost.yml'):
+        lintable = Lintable(path)
+        assert to_tuples(dispatcher.run(lintable)) == \
+            to_tuples(collection.run(Lintable(path)))
+
+    stats = dispatcher.stats()
+    assert stats.calls > 0
+    assert stats.avoided > 0
+    assert stats.avoided == sum(stats.avoided_by_rules.values())
+    assert stats.avoided_by_rules['task_has_valid_name'] == 1
+
+
+def test_run_by_rules_with_ids(collection, monkeypatch):
+    monkeypatch.chdir(WORKDIR)
+    dispatcher = TT.Dispatcher(collection)
+    dispatcher.run_by_rules(Lintable('group_vars/localhost.yml'),
+                            ids=['task_has_valid_name', 'debug'])
+
+    # The rules excluded by the IDs are not counted as avoided.
+    assert dispatcher.stats().avoided_by_rules == {'task_has_valid_name': 1}
+
+
+def test_run_with_skip_list(collection, monkeypatch):
+    monkeypatch.chdir(WORKDIR)
+    dispatcher = TT.Dispatcher(collection)
+    lintable = Lintable('group_vars/localhost.yml')
+
+    assert dispatcher.run(lintable)
+    assert not dispatcher.run(
+        lintable, skip_list=['vars_in_vars_files_have_valid_names']
+    )
+
+# vim:sw=4:ts=4:et:
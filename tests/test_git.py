@@ -0,0 +1,82 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+# pylint: disable=missing-function-docstring
+"""Test cases of rules._git.
+"""
+import subprocess
+
+import pytest
+
+from rules import _git as TT
+
+
+def git(workdir, *args):
+    subprocess.run(['git', '-c', 'user.name=a', '-c', 'user.email=a@b.c',
+                    *args], cwd=workdir, check=True, stdout=subprocess.PIPE)
+
+
+@pytest.fixture(name='workdir')
+def fixture_workdir(tmp_path):
+    for path in ('roles/r1/tasks/main.yml', 'roles/r1/tasks/a.yml',
+                 'roles/r2/tasks/main.yml', 'playbook.yml'):
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_text('- hosts: localhost\n')
+
+    git(tmp_path, 'init', '-q', '.')
+    git(tmp_path, 'add', '.')
+    git(tmp_path, 'commit', '-q', '-m', 'init')
+
+    # Staged, changed in the working tree, deleted and not tracked.
+    (tmp_path / 'roles/r1/tasks/a.yml').write_text('- debug: msg=a\n')
+    git(tmp_path, 'add', 'roles/r1/tasks/a.yml')
+    (tmp_path / 'roles/r1/tasks/main.yml').write_text('- debug: msg=b\n')
+    (tmp_path / 'playbook.yml').unlink()
+    (tmp_path / 'roles/r2/tasks/b.yml').write_text('- debug: msg=c\n')
+
+    return tmp_path
+
+
+def test_changed_files(workdir):
+    changes = {c.path: c for c in TT.changed_files(cwd=str(workdir))}
+
+    assert sorted(changes) == [
+        'playbook.yml', 'roles/r1/tasks/a.yml', 'roles/r1/tasks/main.yml',
+        'roles/r2/tasks/b.yml'
+    ]
+    assert changes['playbook.yml'].status == 'D'
+    assert changes['roles/r2/tasks/b.yml'].status == '??'
+
+    # Only the blob of the file staged is same as the one in the tree.
+    assert [p for p, c in changes.items() if c.blob_id] == \
+        ['roles/r1/tasks/a.yml']
+    assert TT.blob_ids(['roles/r1'], cwd=str(workdir)) == {
+        'roles/r1/tasks/a.yml': changes['roles/r1/tasks/a.yml'].blob_id
+    }
+
+
+def test_changed_files_in_subdir(workdir):
+    changes = TT.changed_files(cwd=str(workdir / 'roles/r2'))
+    assert changes == [TT.Change('tasks/b.yml', '??')]
+
+
+def test_list_files(workdir):
+    assert TT.list_files(['roles/r2'], cwd=str(workdir)) == [
+        'roles/r2/tasks/b.yml', 'roles/r2/tasks/main.yml'
+    ]
+    assert TT.list_files([], cwd=str(workdir)) == []
+
+
+def test_changed_files_not_in_repo(tmp_path):
+    with pytest.raises(subprocess.CalledProcessError):
+        TT.changed_files(cwd=str(tmp_path))
+
+
+def test_register_and_get_blob_id(tmp_path, monkeypatch):
+    monkeypatch.setattr(TT, 'BLOB_IDS', {})
+    TT.register_blob_ids({'a.yml': 'a' * 40}, cwd=str(tmp_path))
+
+    assert TT.get_blob_id(tmp_path / 'a.yml') == 'a' * 40
+    assert TT.get_blob_id(tmp_path / 'b.yml') is None
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,100 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+# pylint: disable=missing-function-docstring,missing-class-docstring
+# pylint: disable=too-few-public-methods
+"""Test cases of rules._memo.
+"""
+import gc
+import weakref
+
+import ansiblelint.config
+
+from rules import _config, _memo as TT
+from rules.TaskHasValidNameRule import TaskHasValidNameRule
+
+
+class FakeRule:
+    id = 'fake_rule'
+    cache_size = 2
+
+    def __init__(self):
+        self.ncalls = 0
+
+    @property
+    def rule_config(self):
+        return ansiblelint.config.options.rules.get(self.id, {})
+
+    @TT.memoize
+    def double(self, val):
+        self.ncalls += 1
+        return val * 2
+
+
+def test_memo_call():
+    memo = TT.Memo(lambda x: x * 2, 2)
+    assert memo.call(1) == 2
+    assert memo.call(2) == 4
+    assert memo.call(1) == 2  # 1 is recently used than 2.
+    memo.call(3)
+    assert memo.stats() == TT.Stats(1, 3, 2, 2)
+
+    memo.clear()
+    assert memo.stats() == TT.Stats(0, 0, 0, 2)
+
+
+def test_memo_call_disabled():
+    memo = TT.Memo(lambda x: x * 2, 0)
+    assert memo.call(1) == 2
+    assert memo.call(1) == 2
+    assert memo.stats() == TT.Stats(0, 2, 0, 0)
+
+
+def test_memoize():
+    rule = FakeRule()
+    assert rule.double(1) == 2
+    assert rule.double(1) == 2
+    assert rule.ncalls == 1
+
+    stats = TT.stats(rule)['double']
+    assert (stats.hits, stats.misses, stats.maxsize) == (1, 1, 2)
+
+    TT.clear(rule)
+    assert not TT.stats(rule)
+
+
+def test_memoize_invalidated_by_config_changes(monkeypatch):
+    rule = FakeRule()
+    rule.double(1)
+
+    monkeypatch.setitem(ansiblelint.config.options.rules, FakeRule.id,
+                        {TT.C_CACHE_SIZE: 10})
+    rule.double(1)
+    assert rule.ncalls == 1  # Not checked until the snapshot is got.
+
+    _config.get_snapshot(rule)
+    rule.double(1)
+    assert rule.ncalls == 2
+    assert TT.stats(rule)['double'].maxsize == 10
+
+
+def test_memoize_does_not_keep_rules_alive():
+    rule = FakeRule()
+    rule.double(1)
+    ref = weakref.ref(rule)
+
+    del rule
+    gc.collect()
+    assert ref() is None
+
+
+def test_memoize_in_rules(monkeypatch):
+    rule = TaskHasValidNameRule()
+    assert not rule.is_invalid_task_name('Ensure foo is installed')
+
+    monkeypatch.setitem(ansiblelint.config.options.rules, rule.id,
+                        dict(name=r'^\S+$'))
+    rule.snapshot()
+    assert rule.is_invalid_task_name('Ensure foo is installed')
+
+# vim:sw=4:ts=4:et:
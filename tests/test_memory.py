@@ -0,0 +1,100 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+# pylint: disable=missing-function-docstring
+"""Test cases of rules._memory.
+"""
+import json
+import tracemalloc
+
+import pytest
+
+from ansiblelint.file_utils import Lintable
+
+from rules import _memory as TT
+from rules.NoEmptyDataFilesRule import NoEmptyDataFilesRule
+from rules.TaskHasValidNameRule import TaskHasValidNameRule
+
+
+TASKS = """\
+- name: Run a command
+  shell: ls
+- name: x
+  command: ls
+"""
+
+
+@pytest.fixture(name='accounts')
+def fixture_accounts(monkeypatch):
+    accounts = TT.Accounts()
+    monkeypatch.setattr(TT, 'ENABLED', True)
+    monkeypatch.setattr(TT, 'ACCOUNTS', accounts)
+    monkeypatch.setattr(TT, '_RULE_IDS', set())
+
+    tracing = tracemalloc.is_tracing()
+    yield accounts
+    if not tracing:
+        tracemalloc.stop()
+
+
+@pytest.fixture(name='files')
+def fixture_files(tmp_path):
+    (tmp_path / 'main.yml').write_text(TASKS)
+    (tmp_path / 'vars.yml').write_text('a: 1\nb: [1, 2]\n')
+    return [Lintable(str(tmp_path / 'main.yml'), kind='tasks'),
+            Lintable(str(tmp_path / 'vars.yml'), kind='vars')]
+
+
+def test_not_accounted_if_disabled(monkeypatch):
+    monkeypatch.setattr(TT, 'ENABLED', False)
+    rule = TaskHasValidNameRule()
+    assert TT.ACCOUNTED_ATTR not in rule.__dict__
+    assert 'getmatches' not in rule.__dict__
+
+
+def test_account():
+    account = TT.Account()
+    account.add(100, 10)
+    account.add(50, -5)
+    other = TT.Account()
+    other.merge(account)
+    assert other.to_dict() == dict(calls=2, peak_max=100, peak_total=150,
+                                   retained=5)
+
+
+def test_wrap(accounts):
+    accounts.start()
+    wrapped = accounts.wrap('a', lambda file: len(bytearray(1024 * 1024)))
+    wrapped(Lintable('a.yml', kind='tasks'))
+
+    data = accounts.by_rules()['a']
+    assert data['calls'] == 1
+    assert data['peak_max'] >= 1024 * 1024
+    assert data['kinds']['tasks']['retained'] < data['peak_max']
+
+
+def test_collect_and_dump(accounts, files, tmp_path, capsys):
+    # pylint: disable=unused-argument
+    TT.dump()
+    assert not capsys.readouterr().err  # Nothing was accounted.
+
+    rules = [TaskHasValidNameRule(), NoEmptyDataFilesRule()]
+    for file in files:
+        for rule in rules:
+            rule.getmatches(file)
+
+    report = TT.collect()
+    assert sorted(report['rules']) == ['no-empty-data-files',
+                                       'task_has_valid_name']
+    assert sorted(report['rules']['no-empty-data-files']['kinds']) == \
+        ['tasks', 'vars']
+    assert all(not site['site'].startswith('..')  # In rules/.
+               for site in report['sites'])
+    assert report['traced']['peak'] > 0
+
+    path = tmp_path / 'memory.json'
+    TT.dump(str(path))
+    assert 'Memory of the rules' in capsys.readouterr().err
+    assert json.loads(path.read_text())['top_peak']
+
+# vim:sw=4:ts=4:et:
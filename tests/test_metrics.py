@@ -0,0 +1,137 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+# pylint: disable=missing-function-docstring
+"""Test cases of rules._metrics.
+"""
+import json
+
+import pytest
+
+from ansiblelint.file_utils import Lintable
+
+from rules import _dispatch, _metrics as TT
+from rules.BlockedModules import BlockedModules
+from rules.TaskHasValidNameRule import TaskHasValidNameRule
+
+
+TASKS = """\
+- name: Run a command
+  shell: ls
+- name: x
+  command: ls
+"""
+
+
+@pytest.fixture(name='enabled')
+def fixture_enabled(monkeypatch):
+    monkeypatch.setattr(TT, 'ENABLED', True)
+    monkeypatch.setattr(TT, 'RULES', [])
+
+
+@pytest.fixture(name='files')
+def fixture_files(tmp_path):
+    (tmp_path / 'tasks').mkdir()
+    (tmp_path / 'tasks/main.yml').write_text(TASKS)
+    (tmp_path / 'tasks/a.yml').write_text('- name: x\n  ping:\n')
+    return [Lintable(str(tmp_path / 'tasks/main.yml'), kind='tasks'),
+            Lintable(str(tmp_path / 'tasks/a.yml'), kind='tasks'),
+            Lintable(str(tmp_path / 'tasks/a.yml'), kind='vars')]
+
+
+def test_not_instrumented_if_disabled(monkeypatch):
+    monkeypatch.setattr(TT, 'ENABLED', False)
+    rule = TaskHasValidNameRule()
+    assert TT.METRICS_ATTR not in rule.__dict__
+    assert 'getmatches' not in rule.__dict__
+
+
+def test_histogram():
+    hist = TT.Histogram()
+    assert hist.to_dict() == dict(calls=0, total=0.0, mean=0.0, p50=0.0,
+                                  p99=0.0)
+    for _idx in range(99):
+        hist.observe(1e-6)
+    hist.observe(100.0)  # Out of the buckets.
+    assert hist.quantile(0.5) <= 1e-6
+    assert hist.quantile(1.0) == TT.BUCKETS[-1]
+
+    other = TT.Histogram()
+    other.merge(hist)
+    assert other.counts == hist.counts
+    assert other.to_dict()['calls'] == 100
+
+
+def test_collect(enabled, files):  # pylint: disable=unused-argument
+    rules = _dispatch.Dispatcher(
+        [TaskHasValidNameRule(), BlockedModules(), BlockedModules()]
+    )
+    for file in files:
+        rules.run(file)
+
+    metrics = TT.collect()
+    assert sorted(metrics['rules']) == ['blocked_modules',
+                                        'task_has_valid_name']
+
+    # The metrics of the instances of the same rule are merged.
+    blocked = metrics['rules']['blocked_modules']
+    assert blocked['hooks']['getmatches']['calls'] == 4
+    assert blocked['hooks']['matchtask']['calls'] == 4
+    assert blocked['skipped'] == dict(kind=2, prefilter=2)
+
+    task_name = metrics['rules']['task_has_valid_name']
+    assert task_name['hooks']['matchtask']['calls'] == 3
+    assert task_name['hooks']['matchtask']['p99'] > 0
+    assert task_name['caches']['memo:is_invalid_task_name']['hits'] == 1
+
+    data = json.loads(TT.to_json(metrics))
+    assert 'histograms' not in data['rules']['task_has_valid_name']
+    assert data['content_cache']['hit_rate'] >= 0
+
+
+def test_dispatcher_counts_skipped(enabled, files):
+    # pylint: disable=unused-argument
+    rule = TaskHasValidNameRule()
+    rules = _dispatch.Dispatcher([rule])
+    rules.run(files[2])
+    assert rule.__dict__[TT.METRICS_ATTR].counters['skipped_kind'] == 1
+
+
+def test_to_prometheus(enabled, files):  # pylint: disable=unused-argument
+    rule = TaskHasValidNameRule()
+    rule.getmatches(files[0])
+
+    text = TT.to_prometheus(TT.collect())
+    lines = text.splitlines()
+    assert '# TYPE ansible_lint_rule_hook_seconds histogram' in lines
+    assert ('ansible_lint_rule_hook_seconds_bucket{rule="task_has_valid_name"'
+            ',hook="matchtask",le="+Inf"} 2') in lines
+    assert ('ansible_lint_rule_hook_seconds_count{rule="task_has_valid_name"'
+            ',hook="getmatches"} 1') in lines
+    assert ('ansible_lint_rule_files_skipped_total'
+            '{rule="task_has_valid_name",reason="kind"} 0') in lines
+
+    # Every sample line has a name, labels and a value.
+    assert all(len(line.rsplit(' ', 1)) == 2 for line in lines)
+
+
+def test_dump(enabled, files, tmp_path, monkeypatch):
+    # pylint: disable=unused-argument
+    json_path = tmp_path / 'out/metrics.json'
+    prom_path = tmp_path / 'out/metrics.prom'
+    json_path.parent.mkdir()
+    monkeypatch.setenv(TT.E_JSON_VAR, str(json_path))
+    monkeypatch.setenv(TT.E_PROM_VAR, str(prom_path))
+
+    TT.dump()
+    assert not json_path.exists()  # Nothing was instrumented.
+
+    TaskHasValidNameRule().getmatches(files[0])
+    TT.dump()
+    assert 'task_has_valid_name' in json.loads(json_path.read_text())['rules']
+    assert 'ansible_lint_rule_hook_seconds_sum' in prom_path.read_text()
+    assert sorted(p.name for p in json_path.parent.iterdir()) == [
+        'metrics.json', 'metrics.prom'
+    ]
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,102 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+# pylint: disable=missing-function-docstring
+"""Test cases of rules._modules.
+"""
+import json
+import pathlib
+
+import pytest
+
+from rules import _modules as TT
+
+
+BUILTIN_RUNTIME = """\
+plugin_routing:
+  modules:
+    docker_container:
+      redirect: community.docker.docker_container
+    a_tombstone:
+      tombstone:
+        removal_version: "2.10"
+"""
+
+COLL_RUNTIME = """\
+plugin_routing:
+  modules:
+    old_foo:
+      redirect: ns.coll.foo
+    loop_a:
+      redirect: ns.coll.loop_b
+    loop_b:
+      redirect: ns.coll.loop_a
+"""
+
+
+@pytest.fixture(name='roots')
+def fixture_roots(tmp_path):
+    builtin = tmp_path / 'ansible_builtin_runtime.yml'
+    builtin.write_text(BUILTIN_RUNTIME)
+
+    cdir = tmp_path / 'collections' / 'ansible_collections' / 'ns' / 'coll'
+    (cdir / 'meta').mkdir(parents=True)
+    (cdir / 'meta' / 'runtime.yml').write_text(COLL_RUNTIME)
+    (cdir / 'MANIFEST.json').write_text(
+        json.dumps(dict(collection_info=dict(version='1.0.0')))
+    )
+    return ([str(tmp_path / 'collections')], str(builtin))
+
+
+def test_find_collections(roots):
+    colls = TT.find_collections(roots[0] + ['/not_exist'])
+    assert [(c.name, c.version) for c in colls] == [('ns.coll', '1.0.0')]
+    assert colls[0].runtime.endswith('runtime.yml')
+
+
+@pytest.mark.parametrize(
+    'name,expected',
+    (('shell', 'ansible.builtin.shell'),
+     ('ansible.builtin.shell', 'ansible.builtin.shell'),
+     ('ansible.legacy.shell', 'ansible.builtin.shell'),
+     ('docker_container', 'community.docker.docker_container'),
+     ('ansible.legacy.docker_container', 'community.docker.docker_container'),
+     ('a_tombstone', 'ansible.builtin.a_tombstone'),
+     ('ns.coll.old_foo', 'ns.coll.foo'),
+     ('ns.coll.loop_a', 'ns.coll.loop_a'),
+     )
+)
+def test_module_index_canonical(name, expected, roots):
+    index = TT.build_index(*roots)
+    assert index.canonical(name) == expected
+    assert index.canonical(name) == expected  # Memoized.
+
+
+def test_module_index_aliases(roots):
+    index = TT.build_index(*roots)
+    assert index.aliases(['ns.coll.foo', 'shell']) == frozenset([
+        'ns.coll.foo', 'ns.coll.old_foo', 'ansible.builtin.shell'
+    ])
+
+
+def test_build_index_with_cache(roots, tmp_path, monkeypatch):
+    cache_dir = tmp_path / 'cache'
+    monkeypatch.setenv(TT.E_CACHE_DIR_VAR, str(cache_dir))
+
+    index = TT.build_index(*roots)
+    files = list(cache_dir.glob('module_index_*.json'))
+    assert len(files) == 1
+
+    # The index is loaded from the cache file.
+    monkeypatch.setattr(TT, 'load_redirects', None)
+    assert TT.build_index(*roots).redirects == index.redirects
+
+    # The key changes if the collections were updated.
+    manifest = pathlib.Path(roots[0][0]) / 'ansible_collections/ns/coll'
+    (manifest / 'MANIFEST.json').write_text(
+        json.dumps(dict(collection_info=dict(version='1.0.1')))
+    )
+    with pytest.raises(TypeError):
+        TT.build_index(*roots)
+
+# vim:sw=4:ts=4:et:
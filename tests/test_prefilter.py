@@ -0,0 +1,78 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+# pylint: disable=missing-function-docstring
+"""Test cases of rules._prefilter.
+"""
+import unittest.mock
+
+import pytest
+
+from ansiblelint.file_utils import Lintable
+
+from rules import _content as TC, _prefilter as TT
+from rules.BlockedModules import BlockedModules
+from rules.LoopIsRecommendedRule import LoopIsRecommendedRule
+
+
+@pytest.mark.parametrize(
+    'data,tokens,expected',
+    ((b'', [b'a'], {b'a': False}),
+     (b'a: 1\n', [], {}),
+     (b'with_items: []\n', [b'with_', b'vars'],
+      {b'with_': True, b'vars': False}),
+     # Shorter tokens are parts of longer ones matched.
+     (b'include_vars: a.yml\n', [b'vars', b'include_vars', b'include'],
+      {b'vars': True, b'include_vars': True, b'include': True}),
+     # Tokens overlap the one matched.
+     (b'shellx', [b'shell', b'llx'], {b'shell': True, b'llx': True}),
+     (b'- shell: a\n', [b'shell', b'll:', b'x'],
+      {b'shell': True, b'll:': True, b'x': False}),
+     )
+)
+def test_search_tokens(data, tokens, expected):
+    assert TT.search_tokens(data, tokens) == expected
+
+
+def test_find_tokens(tmp_path):
+    path = tmp_path / 'a.yml'
+    path.write_text('- shell: ls\n')
+
+    assert TT.find_tokens(path, ['shell', b'with_']) == {
+        b'shell': True, b'with_': False
+    }
+    # The results were kept with the content for every tokens known.
+    assert set(TT.TOKENS) <= set(TC.load(path).found_tokens)
+
+    path.write_text('- debug:\n  with_items: [1]\n')
+    assert TT.find_tokens(path, ['shell', 'with_']) == {
+        b'shell': False, b'with_': True
+    }
+
+
+def test_getmatches_skipped(tmp_path, monkeypatch):
+    path = tmp_path / 'tasks' / 'main.yml'
+    path.parent.mkdir()
+    path.write_text('- name: Run a command\n  command: ls\n')
+    file = Lintable(str(path), kind='tasks')
+
+    for rule in (LoopIsRecommendedRule(), BlockedModules()):
+        assert not TT.may_match(rule, file)
+        matchtasks = unittest.mock.Mock(return_value=[])
+        monkeypatch.setattr(rule, 'matchtasks', matchtasks)
+        assert rule.getmatches(file) == []
+        matchtasks.assert_not_called()
+
+    # The tokens are in the file now.
+    path.write_text('- name: Run a command\n  shell: ls\n')
+    assert TT.may_match(BlockedModules(), Lintable(str(path), kind='tasks'))
+
+
+def test_may_match_disabled(tmp_path, monkeypatch):
+    path = tmp_path / 'a.yml'
+    path.write_text('a: 1\n')
+
+    monkeypatch.setenv(TT.E_ENABLED_VAR, '0')
+    assert TT.may_match(LoopIsRecommendedRule(), path)
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,114 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+# pylint: disable=missing-function-docstring
+"""Test cases of rules._profile.
+"""
+import pstats
+import time
+
+import pytest
+
+from ansiblelint.file_utils import Lintable
+
+from rules import _profile as TT
+from rules.TaskHasValidNameRule import TaskHasValidNameRule
+
+
+TASKS = """\
+- name: Run a command
+  shell: ls
+- name: x
+  command: ls
+"""
+
+
+@pytest.fixture(name='profiler')
+def fixture_profiler(monkeypatch):
+    sampler = TT.Sampler(0.0001)
+    monkeypatch.setattr(TT, 'ENABLED', True)
+    monkeypatch.setattr(TT, 'PROFILES', TT.Profiles())
+    monkeypatch.setattr(TT, 'SAMPLER', sampler)
+    monkeypatch.setattr(TT, '_RULE_IDS', set())
+    yield sampler
+    sampler.stop()
+
+
+@pytest.fixture(name='file')
+def fixture_file(tmp_path):
+    path = tmp_path / 'main.yml'
+    path.write_text(TASKS)
+    return Lintable(str(path), kind='tasks')
+
+
+def test_get_modes(monkeypatch):
+    monkeypatch.setenv(TT.E_MODE_VAR, 'sample, unknown')
+    assert TT.get_modes() == frozenset(('sample', ))
+
+
+@pytest.mark.parametrize(
+    ('value', 'exp'),
+    (('0.01', 0.01), ('0', TT.DEFAULT_INTERVAL), ('x', TT.DEFAULT_INTERVAL))
+)
+def test_get_interval(monkeypatch, value, exp):
+    monkeypatch.setenv(TT.E_INTERVAL_VAR, value)
+    assert TT.get_interval() == exp
+
+
+def test_not_profiled_if_disabled(monkeypatch):
+    monkeypatch.setattr(TT, 'ENABLED', False)
+    rule = TaskHasValidNameRule()
+    assert TT.PROFILED_ATTR not in rule.__dict__
+    assert 'matchtask' not in rule.__dict__
+
+
+def test_sampler(profiler):
+    def slow():
+        time.sleep(0.05)
+
+    wrapped = profiler.wrap('a', slow)
+    wrapped()
+    wrapped()
+
+    lines = profiler.folded('a')
+    assert lines
+    assert all(line.startswith('slow (test_profile.py:') for line in lines)
+    assert all(line.startswith('a;slow ') for line in profiler.folded())
+    assert sum(int(line.rsplit(' ', 1)[1]) for line in lines) == \
+        profiler.nsamples
+
+
+def test_dump(profiler, file, tmp_path,  # pylint: disable=unused-argument
+              monkeypatch):
+    assert TT.dump(str(tmp_path / 'none')) == []  # Nothing was profiled.
+
+    for _idx in range(3):
+        TaskHasValidNameRule().getmatches(file)
+
+    TT.PROFILES.wrap('another', time.sleep)(0)
+    rule_stats = TT.PROFILES.stats()
+    before = {rid: dict(stat.stats)  # type: ignore
+              for rid, stat in rule_stats.items()}
+    monkeypatch.setattr(TT.PROFILES, 'stats', lambda: rule_stats)
+
+    outdir = tmp_path / 'out'
+    paths = TT.dump(str(outdir))
+    names = sorted(p.name for p in paths)
+    assert 'task_has_valid_name.pstats' in names
+    assert 'rules.pstats' in names
+
+    stats = pstats.Stats(str(outdir / 'task_has_valid_name.pstats'))
+    calls = [val[1] for key, val in stats.stats.items()  # type: ignore
+             if key[2] == 'matchtask']
+    assert calls == [6]  # Aggregated for all of the rule instances.
+
+    # The stats of each rule are not changed by merging them.
+    assert {rid: stat.stats  # type: ignore
+            for rid, stat in rule_stats.items()} == before
+
+    if 'rules.folded' in names:
+        assert all(line.startswith('task_has_valid_name;')
+                   for line in (outdir / 'rules.folded').read_text()
+                   .splitlines())
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,201 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+# pylint: disable=missing-function-docstring
+"""Test cases of rules._result_cache.
+"""
+import os
+import unittest.mock
+
+import ansiblelint.config
+import pytest
+
+from ansiblelint.file_utils import Lintable
+
+from rules import _result_cache as TT
+from rules.FileHasValidNameRule import FileHasValidNameRule
+from rules.DebugRule import DebugRule
+
+
+CONTENT = """\
+- hosts: localhost
+  tasks: []
+"""
+
+
+@pytest.fixture
+def lintable(tmp_path):
+    path = tmp_path / 'play-0.yml'
+    path.write_text(CONTENT)
+
+    return Lintable(str(path), kind='playbook')
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    cache_dir = tmp_path / 'cache'
+    monkeypatch.setenv(TT.E_CACHE_DIR_VAR, str(cache_dir))
+
+    return cache_dir
+
+
+def test_get_cache(monkeypatch, tmp_path):
+    monkeypatch.delenv(TT.E_CACHE_DIR_VAR, raising=False)
+    assert TT.get_cache() is None
+
+    monkeypatch.setenv(TT.E_CACHE_DIR_VAR, str(tmp_path))
+    monkeypatch.setenv(TT.E_MAX_BYTES_VAR, '100')
+    cache = TT.get_cache()
+    assert cache is not None
+    assert cache.max_bytes == 100
+    assert TT.get_cache() is cache
+
+
+def test_get_rule_file():
+    assert TT.get_rule_file(DebugRule).endswith('DebugRule.py')
+    assert TT.get_rule_file(object) == ''
+
+
+def test_make_key(lintable, monkeypatch):
+    rule = FileHasValidNameRule()
+    key = TT.make_key(rule, lintable, b'')
+
+    assert key == TT.make_key(rule, lintable, b'')
+    assert key != TT.make_key(rule, lintable, b'a')
+    assert key != TT.make_key(DebugRule(), lintable, b'')
+
+    # The IDs of the git blobs are used instead of the content if given.
+    bkey = TT.make_key(rule, lintable, None, 'a' * 40)
+    assert bkey == TT.make_key(rule, lintable, b'b', 'a' * 40)
+    assert bkey not in (key, TT.make_key(rule, lintable, None, 'b' * 40))
+
+    monkeypatch.setitem(ansiblelint.config.options.rules, rule.id,
+                        dict(name=r'\S+'))
+    assert key != TT.make_key(rule, lintable, b'')
+
+    monkeypatch.delitem(ansiblelint.config.options.rules, rule.id)
+    monkeypatch.setenv('_ANSIBLE_LINT_RULE_FOO', '1')
+    assert key != TT.make_key(rule, lintable, b'')
+
+
+def test_make_key_with_cache_key_data(lintable, monkeypatch):
+    rule = FileHasValidNameRule()
+    key = TT.make_key(rule, lintable, b'')
+
+    monkeypatch.setattr(rule, 'cache_key_data', lambda: 'verbs-0')
+    assert key != TT.make_key(rule, lintable, b'')
+
+
+def test_get_helpers_hash(tmp_path):
+    helper = tmp_path / '_helper.py'
+    helper.write_text('A = 1\n')
+    (tmp_path / 'SomeRule.py').write_text('B = 1\n')
+    hsh = TT.get_helpers_hash(str(tmp_path))
+
+    (tmp_path / 'SomeRule.py').write_text('B = 2\n')
+    TT.get_helpers_hash.cache_clear()
+    TT.get_code_hash.cache_clear()
+    assert TT.get_helpers_hash(str(tmp_path)) == hsh
+
+    helper.write_text('A = 2\n')
+    TT.get_helpers_hash.cache_clear()
+    TT.get_code_hash.cache_clear()
+    assert TT.get_helpers_hash(str(tmp_path)) != hsh
+
+
+def test_dump_and_load_matches(lintable):
+    rule = FileHasValidNameRule()
+    matches = [
+        rule.create_matcherror(message='foo', linenumber=2, details='bar',
+                               filename=lintable),
+        rule.create_matcherror(message='baz', filename='other.yml',
+                               tag='qux'),
+    ]
+    data = TT.dump_matches(matches, lintable)
+    assert 'filename' not in data[0]
+    assert data[1]['filename'] == 'other.yml'
+
+    assert TT.load_matches(rule, lintable, data) == matches
+
+
+def test_result_cache_get_and_set(tmp_path):
+    cache = TT.ResultCache(tmp_path)
+    key = 'a' * 64
+    assert cache.get(key) is None
+
+    cache.set(key, [dict(message='foo')])
+    assert cache.get(key) == [dict(message='foo')]
+    assert cache.path(key).parent.name == 'aa'
+
+
+def test_result_cache_prune(tmp_path):
+    cache = TT.ResultCache(tmp_path, max_bytes=1000)
+    keys = [str(idx) * 64 for idx in range(3)]
+    for idx, key in enumerate(keys):
+        cache.set(key, [dict(message='x' * 100)])
+        os.utime(cache.path(key), (idx, idx))
+
+    size = cache.size()
+    assert size > 0
+
+    assert cache.prune(size - 1) < size
+    assert cache.get(keys[0]) is None  # The oldest one was removed.
+    assert cache.get(keys[2]) is not None
+
+
+def test_result_cache_prune_keeps_used(tmp_path):
+    cache = TT.ResultCache(tmp_path, max_bytes=1000)
+    keys = [str(idx) * 64 for idx in range(3)]
+    for idx, key in enumerate(keys):
+        cache.set(key, [dict(message='x' * 100)])
+        os.utime(cache.path(key), (idx, idx))
+
+    assert cache.get(keys[0]) is not None
+    assert cache.path(keys[0]).stat().st_mtime == 0  # Not updated yet.
+
+    cache.prune(cache.size() - 1)
+    assert cache.get(keys[0]) is not None  # It was used recently.
+    assert cache.get(keys[1]) is None
+
+
+def test_result_cache_set_keeps_size(tmp_path):
+    cache = TT.ResultCache(tmp_path, max_bytes=1000)
+    keys = [str(idx) * 64 for idx in range(3)]
+    for key in keys:
+        cache.set(key, [dict(message='x' * 100)])
+
+    cache.set(keys[0], [dict(message='x')])  # Replaced with smaller one.
+    assert cache._nbytes == cache.size()  # pylint: disable=protected-access
+
+
+def test_result_cache_set_prunes_to_low_water(tmp_path):
+    cache = TT.ResultCache(tmp_path, max_bytes=1000)
+    keys = [f'{idx:02d}' * 32 for idx in range(9)]  # It exceeds at last.
+    for idx, key in enumerate(keys):
+        cache.set(key, [dict(message='x' * 100)])
+        os.utime(cache.path(key), (idx, idx))
+
+    size = cache.size()
+    assert size <= cache.low_water()
+    assert cache._nbytes == size  # pylint: disable=protected-access
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[-1]) is not None
+
+
+def test_custom_rule_getmatches_uses_cache(lintable, cache_dir):
+    rule = FileHasValidNameRule()
+    matches = rule.getmatches(lintable)
+    assert matches
+    assert list(cache_dir.glob('*/*.json'))
+
+    target = 'ansiblelint.rules.AnsibleLintRule.getmatches'
+    with unittest.mock.patch(target) as getmatches:
+        assert rule.getmatches(lintable) == matches
+        assert not getmatches.called
+
+
+def test_custom_rule_getmatches_not_cacheable(lintable, cache_dir):
+    DebugRule().getmatches(lintable)
+    assert not list(cache_dir.glob('*/*.json'))
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,208 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+# pylint: disable=missing-function-docstring
+"""Test cases of rules._runner.
+"""
+import subprocess
+import sys
+import warnings
+
+import pytest
+
+from ansiblelint.errors import MatchError
+from ansiblelint.file_utils import Lintable
+
+from rules import _memory, _metrics, _profile, _runner as TT
+from rules.LoopIsRecommendedRule import LoopIsRecommendedRule
+from tests import common
+
+
+RULES_DIR = common.TESTS_RES_DIR.parent.parent / 'rules'
+
+TASKS = """\
+- name: x
+  shell: ls
+  with_items: [1]
+
+- include_vars: a.yml
+"""
+
+PLAYBOOK = """\
+- hosts: localhost
+  vars:
+    a: 1
+  tasks:
+    - name: Show a message
+      debug:
+        msg: a
+      with_items: [1]
+"""
+
+
+@pytest.fixture(name='workdir')
+def fixture_workdir(tmp_path):
+    (tmp_path / 'roles/r1/tasks').mkdir(parents=True)
+    (tmp_path / 'roles/r1/tasks/main.yml').write_text(TASKS)
+    (tmp_path / 'roles/r1/tasks/a.yml').write_text('a: 1\n')
+    (tmp_path / 'playbook.yml').write_text(PLAYBOOK)
+
+    # ansible-lint finds the files tracked by git.
+    subprocess.run(['git', 'init', '-q', '.'], cwd=tmp_path, check=True)
+    subprocess.run(['git', 'add', '.'], cwd=tmp_path, check=True)
+    return tmp_path
+
+
+def test_dump_and_load_match():
+    rule = LoopIsRecommendedRule()
+    rules = TT.get_rules_by_id([rule])
+    match = MatchError(message='foo', linenumber=2, details='bar',
+                       filename=Lintable('a.yml'), rule=rule)
+
+    res = TT.load_match(TT.dump_match(match), rules)
+    assert res == match
+    assert res.rule is rule
+
+    # Unknown rules.
+    res = TT.load_match(TT.dump_match(match)._replace(rule_id='x'), rules)
+    assert res.rule.id == 'load-failure'
+
+
+def test_check_internals(monkeypatch):
+    TT.check_internals()
+
+    monkeypatch.setattr(TT, 'INTERNALS', ((TT.Target, '_not_exist'), ))
+    with pytest.raises(SystemExit, match='Target._not_exist'):
+        TT.check_internals()
+
+
+@pytest.mark.parametrize(
+    ('var', 'exp'),
+    ((_profile.E_DIR_VAR, 'profiling'),
+     (_metrics.E_JSON_VAR, 'metrics'),
+     (_memory.E_PATH_VAR, 'memory accounting'),
+     )
+)
+def test_warn_if_instrumented(var, exp, tmp_path, monkeypatch):
+    for evar in (_profile.E_DIR_VAR, _metrics.E_JSON_VAR, _metrics.E_PROM_VAR,
+                 _memory.E_PATH_VAR):
+        monkeypatch.delenv(evar, raising=False)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        TT.warn_if_instrumented()
+
+    monkeypatch.setenv(var, str(tmp_path / 'out'))
+    with pytest.warns(UserWarning, match=exp):
+        TT.warn_if_instrumented()
+
+
+def test_report_outcome():
+    class App:
+        def report_outcome(self, result):
+            return len(result)
+
+    assert TT.report_outcome(App(), [1, 2], None) == 2
+
+
+def test_partition():
+    targets = [TT.Target(str(i), 'tasks', i % 3) for i in range(10)]
+    groups = TT.partition(targets, 3)
+
+    assert sorted(t for g in groups for t in g) == sorted(targets)
+    assert groups == TT.partition(reversed(targets), 3)
+    assert TT.partition(targets[:1], 3) == [targets[:1], [], []]
+
+
+def test_select_shard():
+    targets = [TT.Target(f'roles/r{i}/tasks/main.yml', 'tasks', i % 3)
+               for i in range(10)]
+    shards = [TT.select_shard(targets, TT.Shard(k, 3)) for k in (1, 2, 3)]
+
+    assert sorted(t for s in shards for t in s) == sorted(targets)
+    assert TT.select_shard(targets, None) == targets
+
+    # The shards do not depend on the order of the targets.
+    assert TT.select_shard(reversed(targets), TT.Shard(2, 3)) == shards[1]
+
+
+@pytest.mark.parametrize('spec', ('1', '0/2', '3/2', 'a/b'))
+def test_parse_shard_errors(spec):
+    with pytest.raises(ValueError):
+        TT.parse_shard(spec)
+
+
+def run(workdir, *args, runner=True):
+    env = common.utils.get_env(
+        dict(PYTHONPATH=str(RULES_DIR.parent))
+    )
+    cmd = [sys.executable, '-m', 'rules._runner'] if runner else \
+        ['ansible-lint']
+
+    # pylint: disable=subprocess-run-check
+    return subprocess.run(
+        cmd + ['-p', '-r', str(RULES_DIR)] + list(args),
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False,
+        cwd=str(workdir), env=env, universal_newlines=True
+    )
+
+
+@pytest.fixture(name='expected')
+def fixture_expected(workdir):
+    res = run(workdir, runner=False)
+    assert res.stdout
+    return res
+
+
+@pytest.mark.parametrize('jobs', ('1', '2'))
+def test_main_same_as_ansible_lint(workdir, expected, jobs):
+    res = run(workdir, '-j', jobs)
+    assert res.stdout == expected.stdout
+    assert res.returncode == expected.returncode
+
+
+def test_main_shards_merged(workdir, expected, tmp_path_factory):
+    outdir = tmp_path_factory.mktemp('shards')
+    outputs = [str(outdir / f'{k}.json') for k in (1, 2, 3)]
+    for idx, output in enumerate(outputs, 1):
+        res = run(workdir, '-j', '1', '--shard', f'{idx}/3',
+                  '--shard-output', output)
+        assert res.returncode == 0
+        assert not res.stdout
+
+    args = [a for output in outputs for a in ('--merge', output)]
+    res = run(workdir, *args)
+    assert res.stdout == expected.stdout
+    assert res.returncode == expected.returncode
+
+
+@pytest.fixture(name='changed')
+def fixture_changed(workdir):
+    subprocess.run(['git', '-c', 'user.name=a', '-c', 'user.email=a@b.c',
+                    'commit', '-q', '-m', 'init'], cwd=workdir, check=True)
+    (workdir / 'roles/r1/tasks/a.yml').write_text('a: 2\n')
+    return workdir
+
+
+def test_get_changed_lintables(changed, monkeypatch):
+    monkeypatch.chdir(changed)
+    lintables, blob_ids = TT.get_changed_lintables()
+
+    assert sorted(str(lnt.name) for lnt in lintables) == [
+        'roles/r1', 'roles/r1/tasks/a.yml', 'roles/r1/tasks/main.yml'
+    ]
+    # The file changed in the working tree does not have the blob ID.
+    assert list(blob_ids) == ['roles/r1/tasks/main.yml']
+
+
+def test_main_changed(changed):
+    res = run(changed, '-j', '1', '--changed')
+    assert 'roles/r1/tasks/main.yml' in res.stdout
+    assert 'playbook.yml' not in res.stdout
+    assert res.returncode == 2
+
+    res = run(changed, '--changed=not_exist')
+    assert res.returncode == 1
+    assert 'Failed to find the files changed' in res.stderr
+
+# vim:sw=4:ts=4:et:
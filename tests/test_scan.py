@@ -0,0 +1,99 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+# pylint: disable=missing-function-docstring
+"""Test cases of rules._scan.
+"""
+import re
+
+import pytest
+
+from ansiblelint.file_utils import Lintable
+
+from rules import _content as TC, _scan as TT
+
+
+TT.register('test_scan_foo', r'[ \t]*foo:')
+TT.register('test_scan_bar', r'[ \t]*(?:foo|bar):')
+
+NAMES = ['test_scan_foo', 'test_scan_bar']
+
+
+@pytest.mark.parametrize(
+    'name,pattern',
+    (('not an identifier', r'a'),
+     ('test_scan_foo', r'another pattern'),
+     )
+)
+def test_register_errors(name, pattern):
+    with pytest.raises(ValueError):
+        TT.register(name, pattern)
+
+
+def test_register_invalid_pattern():
+    with pytest.raises(re.error):
+        TT.register('test_scan_invalid', r'(')
+
+
+@pytest.mark.parametrize(
+    'text,expected',
+    (('', dict(test_scan_foo=None, test_scan_bar=None)),
+     ('a: 1\n', dict(test_scan_foo=None, test_scan_bar=None)),
+     ('a: 1\nbar: 2\n', dict(test_scan_foo=None, test_scan_bar=2)),
+     # Both of them match the same line.
+     ('a: 1\n\n  foo: 2\nbar: 3\n', dict(test_scan_foo=3, test_scan_bar=3)),
+     ('bar: 1\n# foo: 2\nfoo: 3\n', dict(test_scan_foo=3, test_scan_bar=1)),
+     ('\ufefffoo: 1\n', dict(test_scan_foo=1, test_scan_bar=1)),
+     # Patterns must not match across lines.
+     ('\n\nfoo\n:\n', dict(test_scan_foo=None, test_scan_bar=None)),
+     )
+)
+def test_scan_data(text, expected, monkeypatch):
+    monkeypatch.setattr(TT, 'CHUNK_SIZE', 4)
+    assert TT.scan_data(text, NAMES).found == expected
+    assert TT.scan_data(text.encode('utf-8'), NAMES).found == expected
+
+
+@pytest.mark.parametrize(
+    'text,limit,expected',
+    (('', None, (0, True)),
+     ('a\n' * 10 + 'b', None, (11, True)),
+     ('a\n' * 10, 5, (6, False)),
+     ('a\n' * 10, 9, (10, True)),
+     )
+)
+def test_scan_data_count(text, limit, expected, monkeypatch):
+    monkeypatch.setattr(TT, 'CHUNK_SIZE', 3)
+    res = TT.scan_data(text.encode('utf-8'), limit=limit, count=True)
+    assert (res.nlines, res.exact) == expected
+
+
+def test_scan_stops_early_and_resumes(tmp_path, monkeypatch):
+    monkeypatch.setattr(TT, 'CHUNK_SIZE', 4)
+    path = tmp_path / 'a.yml'
+    path.write_text('a: 1\nbar: 2\n' + 'b: 3\n' * 10 + 'foo: 4\nc: 5\n')
+
+    assert TT.scan(path, ['test_scan_bar']) == TT.Result(
+        2, False, dict(test_scan_bar=2)
+    )
+    # The scan is resumed from where it stopped for the other pattern.
+    assert TT.scan(str(path), ['test_scan_foo'], limit=1, count=True) == \
+        TT.Result(13, False, dict(test_scan_foo=13))
+    assert TT.scan(path, count=True) == TT.Result(14, True, {})
+    assert TC.CACHE.peek(path) is None  # Not read into the cache.
+
+    # The file is changed and scanned again.
+    path.write_text('a: 1\n  foo: 2\n')
+    assert TT.scan(path, ['test_scan_foo']).found == dict(test_scan_foo=2)
+
+
+def test_scan_text_loaded(tmp_path):
+    path = tmp_path / 'a.yml'
+    path.write_text('a: 1\n')
+
+    lintable = Lintable(str(path), content='a: 1\nfoo: 2\n')
+    assert TT.scan(lintable, ['test_scan_foo'], count=True) == TT.Result(
+        2, True, dict(test_scan_foo=2)
+    )
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,59 @@
+# Copyright (C) 2021 Satoru SATOH <satoru.satoh@gmail.com>
+# SPDX-License-Identifier: MIT
+#
+# pylint: disable=missing-function-docstring
+"""Test cases of rules._trace.
+"""
+import json
+
+from ansiblelint.file_utils import Lintable
+
+from rules import _trace as TT
+
+
+def test_tracer_ring_buffer(tmp_path):
+    path = tmp_path / 'trace.jsonl'
+    file = Lintable('tasks/main.yml', kind='tasks')
+    tracer = TT.Tracer(str(path), buffer_size=3)
+    for idx in range(5):
+        tracer.add(file, 'matchtask', 0.1, idx)
+
+    events = tracer.events()
+    assert [e['size'] for e in events] == [2, 3, 4]
+    assert set(events[0]) == set(TT.KEYS)
+    assert tracer.summary()['dropped'] == 2
+
+    assert tracer.flush() == 3
+    lines = path.read_text().splitlines()
+    assert len(lines) == 4
+    assert json.loads(lines[0])['file'] == 'tasks/main.yml'
+    assert json.loads(lines[-1])['recorded'] == 5
+    assert ' ' not in lines[0]  # Compact.
+
+    assert tracer.flush() == 0  # Cleared.
+    assert len(path.read_text().splitlines()) == 4
+
+
+def test_tracer_sample():
+    tracer = TT.Tracer(sample_rate=0.5, seed=1)
+    sampled = sum(tracer.sample() for _idx in range(1000))
+    assert 400 < sampled < 600
+    assert tracer.summary()['skipped'] == 1000 - sampled
+
+    assert all(TT.Tracer().sample() for _idx in range(10))
+
+
+def test_tracer_flush_to_stderr(capsys):
+    tracer = TT.Tracer()
+    tracer.add(Lintable('site.yml', kind='playbook'), 'getmatches', 0.1, 10)
+    assert tracer.flush() == 1
+    assert '"hook":"summary"' in capsys.readouterr().err
+
+
+def test_get_tracer(tmp_path):
+    path = str(tmp_path / 'trace.jsonl')
+    tracer = TT.get_tracer(path, 1.0, 10)
+    assert TT.get_tracer(path, 1.0, 10) is tracer
+    assert TT.get_tracer(path, 0.5, 10) is not tracer
+
+# vim:sw=4:ts=4:et: